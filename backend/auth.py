@@ -6,6 +6,7 @@ from typing import Optional
 import jwt
 import os
 from models import User, UserType
+from services.request_cache import current_scope
 
 # Make OAuth2PasswordBearer not auto-error if no token
 oauth2_scheme_optional = OAuth2PasswordBearer(tokenUrl="/api/auth/login", auto_error=False)
@@ -68,16 +69,34 @@ async def get_current_user(token: str = Depends(oauth2_scheme)):
         headers={"WWW-Authenticate": "Bearer"},
     )
     
+    current_user = decode_user_token(token)
+    if current_user is None:
+        raise credentials_exception
+    return current_user
+
+def decode_user_token(token: str) -> Optional[dict]:
+    """User claims from a JWT, or None if it is invalid.
+    
+    Inside a request scope (e.g. a /batch call) the result is cached so
+    sub-requests sharing a token decode it once.
+    """
+    scope = current_scope()
+    cache_key = ("auth", token)
+    if scope is not None and cache_key in scope:
+        return scope[cache_key]
+    
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        email: str = payload.get("sub")
-        user_type: str = payload.get("user_type")
-        user_id: str = payload.get("user_id")
-        if email is None:
-            raise credentials_exception
-        return {"email": email, "user_type": user_type, "user_id": user_id}
     except jwt.PyJWTError:
-        raise credentials_exception
+        return None
+    email: str = payload.get("sub")
+    user_type: str = payload.get("user_type")
+    user_id: str = payload.get("user_id")
+    current_user = {"email": email, "user_type": user_type, "user_id": user_id} if email else None
+    
+    if scope is not None and current_user is not None:
+        scope[cache_key] = current_user
+    return current_user
 
 async def get_current_professional(current_user: dict = Depends(get_current_user)):
     """Ensure current user is a professional."""
@@ -97,18 +116,18 @@ async def get_current_admin(current_user: dict = Depends(get_current_user)):
         )
     return current_user
 
+async def get_current_partner(current_user: dict = Depends(get_current_user)):
+    """Ensure current user is a lead partner (admins are allowed too)."""
+    if current_user["user_type"] not in (UserType.PARTNER.value, UserType.ADMIN.value):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Access forbidden: Partner access required"
+        )
+    return current_user
+
 async def get_current_user_optional(token: Optional[str] = Depends(oauth2_scheme_optional)):
     """Get current user from JWT token, but allow None if no token provided."""
     if token is None:
         return None
-        
-    try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        email: str = payload.get("sub")
-        user_type: str = payload.get("user_type")
-        user_id: str = payload.get("user_id")
-        if email is None:
-            return None
-        return {"email": email, "user_type": user_type, "user_id": user_id}
-    except jwt.PyJWTError:
-        return None
\ No newline at end of file
+    
+    return decode_user_token(token)
\ No newline at end of file
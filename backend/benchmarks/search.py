@@ -0,0 +1,134 @@
+"""Benchmark the in-process search index against a Mongo text index.
+
+Run from the backend directory:
+
+    python -m benchmarks.search --count 200000 --queries 200
+
+The Mongo half needs MONGO_URL and writes to a throwaway database
+(niwi_search_benchmark) that is dropped afterwards; pass --skip-mongo to
+benchmark only the in-process index.
+"""
+import argparse
+import asyncio
+import os
+import random
+import time
+import uuid
+
+from services.search import InvertedIndex, REQUEST_FIELD_WEIGHTS
+from models import ServiceCategory
+
+WORDS = (
+    "kitchen bathroom basement roof deck fence furnace boiler heat pump panel wiring outlet "
+    "leak drain sewer faucet toilet shower tile drywall paint window door insulation attic "
+    "garage driveway patio lawn garden tree hedge snow mortgage refinance condo house listing "
+    "wedding photos portrait social media marketing campaign investigator counselling therapy "
+    "urgent estimate quote replace install repair renovate upgrade inspect clean remove new old "
+    "small large commercial residential weekend evening budget permit licensed insured"
+).split()
+
+
+# Domain words first, then a long tail, drawn with Zipf-like frequencies
+VOCABULARY = WORDS + [f"{word}{suffix}" for suffix in range(1, 60) for word in WORDS[:80]]
+CUMULATIVE_WEIGHTS = []
+_total = 0.0
+for _rank in range(len(VOCABULARY)):
+    _total += 1.0 / (_rank + 1)
+    CUMULATIVE_WEIGHTS.append(_total)
+
+
+def _words(rng, count):
+    return " ".join(rng.choices(VOCABULARY, cum_weights=CUMULATIVE_WEIGHTS, k=count))
+
+
+def synthetic_corpus(count: int, seed: int = 11):
+    rng = random.Random(seed)
+    categories = [category.value for category in ServiceCategory]
+    for _ in range(count):
+        yield {
+            "id": str(uuid.uuid4()),
+            "title": _words(rng, rng.randint(3, 7)),
+            "description": _words(rng, rng.randint(15, 80)),
+            "service_category": rng.choice(categories),
+            "status": "pending",
+        }
+
+
+def synthetic_queries(count: int, seed: int = 12):
+    rng = random.Random(seed)
+    return [_words(rng, rng.randint(1, 3)) for _ in range(count)]
+
+
+def _summary(label: str, timings):
+    timings = sorted(timings)
+    p50 = timings[len(timings) // 2] * 1000
+    p95 = timings[int(len(timings) * 0.95) - 1] * 1000
+    print(f"{label:<28} p50 {p50:8.2f} ms   p95 {p95:8.2f} ms")
+
+
+def bench_memory(corpus, queries, limit):
+    index = InvertedIndex(REQUEST_FIELD_WEIGHTS)
+    started = time.perf_counter()
+    for doc in corpus:
+        index.add(doc["id"], doc, [doc["service_category"]])
+    print(f"in-process build             {time.perf_counter() - started:8.2f} s for {len(index)} docs")
+
+    timings = []
+    for query in queries:
+        started = time.perf_counter()
+        index.search(query, limit=limit)
+        timings.append(time.perf_counter() - started)
+    _summary("in-process search", timings)
+
+
+async def bench_mongo(corpus, queries, limit):
+    from motor.motor_asyncio import AsyncIOMotorClient
+    from pymongo import TEXT
+
+    client = AsyncIOMotorClient(os.environ["MONGO_URL"])
+    db = client["niwi_search_benchmark"]
+    try:
+        collection = db.customer_requests
+        started = time.perf_counter()
+        for offset in range(0, len(corpus), 5000):
+            await collection.insert_many(corpus[offset:offset + 5000], ordered=False)
+        await collection.create_index(
+            [(field, TEXT) for field in REQUEST_FIELD_WEIGHTS],
+            weights=REQUEST_FIELD_WEIGHTS
+        )
+        print(f"mongo load + text index      {time.perf_counter() - started:8.2f} s")
+
+        timings = []
+        for query in queries:
+            started = time.perf_counter()
+            await collection.find(
+                {"$text": {"$search": query}},
+                {"_id": 0, "id": 1, "score": {"$meta": "textScore"}}
+            ).sort([("score", {"$meta": "textScore"})]).limit(limit).to_list(limit)
+            timings.append(time.perf_counter() - started)
+        _summary("mongo $text search", timings)
+    finally:
+        await client.drop_database("niwi_search_benchmark")
+        client.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--count", type=int, default=200000)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--limit", type=int, default=20)
+    parser.add_argument("--skip-mongo", action="store_true")
+    args = parser.parse_args()
+
+    corpus = list(synthetic_corpus(args.count))
+    queries = synthetic_queries(args.queries)
+
+    bench_memory(corpus, queries, args.limit)
+    if args.skip_mongo or "MONGO_URL" not in os.environ:
+        print("mongo benchmark skipped (set MONGO_URL to enable)")
+        return
+    asyncio.run(bench_mongo(corpus, queries, args.limit))
+
+
+if __name__ == "__main__":
+    main()
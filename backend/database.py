@@ -0,0 +1,19 @@
+import os
+from pathlib import Path
+from typing import Tuple
+
+from dotenv import load_dotenv
+from motor.motor_asyncio import AsyncIOMotorClient, AsyncIOMotorDatabase
+
+ROOT_DIR = Path(__file__).parent
+load_dotenv(ROOT_DIR / '.env')
+
+
+def connect() -> Tuple[AsyncIOMotorClient, AsyncIOMotorDatabase]:
+    """Mongo client and database from MONGO_URL and DB_NAME.
+
+    Shared by the API and the command line tools so both always talk to the
+    same database.
+    """
+    client = AsyncIOMotorClient(os.environ['MONGO_URL'])
+    return client, client[os.environ.get('DB_NAME', 'niwi_platform')]
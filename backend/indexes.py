@@ -0,0 +1,148 @@
+import logging
+from typing import Dict, List, Tuple
+
+from pymongo import ASCENDING, DESCENDING, GEOSPHERE, TEXT, IndexModel
+
+from services.archive import LEADS_ARCHIVE_COLLECTION, REQUESTS_ARCHIVE_COLLECTION
+from services.idempotency import IDEMPOTENCY_COLLECTION, IDEMPOTENCY_KEY_TTL
+from services.lead_previews import LEAD_PREVIEWS_COLLECTION, PREVIEW_FIELDS
+from services.search import PROFILE_FIELD_WEIGHTS, REQUEST_FIELD_WEIGHTS
+
+logger = logging.getLogger(__name__)
+
+
+def _covering(*leading: Tuple[str, int]) -> List[Tuple[str, int]]:
+    """Index keys led by ``leading`` and followed by every other preview field."""
+    leading_names = {name for name, _ in leading}
+    return list(leading) + [(field, ASCENDING) for field in PREVIEW_FIELDS if field not in leading_names]
+
+
+# Index definitions per collection, created at startup
+INDEXES: Dict[str, List[IndexModel]] = {
+    IDEMPOTENCY_COLLECTION: [
+        IndexModel(
+            [("created_at", ASCENDING)],
+            name="created_at_ttl",
+            expireAfterSeconds=int(IDEMPOTENCY_KEY_TTL.total_seconds())
+        ),
+    ],
+    LEAD_PREVIEWS_COLLECTION: [
+        IndexModel([("id", ASCENDING)], name="id_unique", unique=True),
+        # Covering indexes for the lead board, with and without a category filter
+        IndexModel(_covering(("created_at", DESCENDING)), name="board_recent_covering"),
+        IndexModel(
+            _covering(("service_category", ASCENDING), ("created_at", DESCENDING)),
+            name="board_category_covering"
+        ),
+        IndexModel(_covering(("score", DESCENDING)), name="board_score_covering"),
+        IndexModel(
+            _covering(("service_category", ASCENDING), ("score", DESCENDING)),
+            name="board_category_score_covering"
+        ),
+    ],
+    "business_profiles": [
+        # Profile lookups by owner, singly and in batches
+        IndexModel([("user_id", ASCENDING)], name="user_id"),
+        IndexModel([("rank_score", DESCENDING)], name="rank_score"),
+        # Category search ordered by rank; location and verification filters
+        # are applied to index keys before documents are fetched
+        IndexModel(
+            [
+                ("service_categories", ASCENDING),
+                ("rank_score", DESCENDING),
+                ("city_key", ASCENDING),
+                ("province_key", ASCENDING),
+                ("is_verified", ASCENDING),
+            ],
+            name="category_rank_location"
+        ),
+        IndexModel(
+            [(field, TEXT) for field in PROFILE_FIELD_WEIGHTS],
+            name="profile_text",
+            weights=PROFILE_FIELD_WEIGHTS
+        ),
+        # Radius search and request-to-professional matching; profiles
+        # without a geocoded postal code are left out of the index
+        IndexModel(
+            [("geo_point", GEOSPHERE), ("service_categories", ASCENDING)],
+            name="geo_point_category"
+        ),
+    ],
+    "leads": [
+        # One lead per request and professional
+        IndexModel(
+            [("customer_request_id", ASCENDING), ("professional_id", ASCENDING)],
+            name="request_professional_unique",
+            unique=True
+        ),
+        # Cursor-paginated lead listings, per professional and for admins
+        IndexModel(
+            [("professional_id", ASCENDING), ("created_at", DESCENDING), ("id", DESCENDING)],
+            name="professional_created_at"
+        ),
+        IndexModel([("created_at", DESCENDING), ("id", DESCENDING)], name="created_at"),
+    ],
+    # Archive tier: only what history reads need
+    REQUESTS_ARCHIVE_COLLECTION: [
+        IndexModel([("id", ASCENDING)], name="id"),
+        IndexModel([("customer_id", ASCENDING), ("created_at", DESCENDING)], name="customer_created_at"),
+        IndexModel([("created_at", DESCENDING)], name="created_at"),
+    ],
+    LEADS_ARCHIVE_COLLECTION: [
+        IndexModel([("customer_request_id", ASCENDING)], name="customer_request_id"),
+        IndexModel(
+            [("professional_id", ASCENDING), ("created_at", DESCENDING), ("id", DESCENDING)],
+            name="professional_created_at"
+        ),
+        IndexModel([("created_at", DESCENDING), ("id", DESCENDING)], name="created_at"),
+    ],
+    "payment_transactions": [
+        IndexModel([("session_id", ASCENDING)], name="session_id"),
+        # Stale checkout sessions for the payment sweeper, oldest first;
+        # also finds settled rows due for archival
+        IndexModel([("payment_status", ASCENDING), ("created_at", ASCENDING)], name="payment_status_created_at"),
+    ],
+    "credit_balances": [
+        # One balance per owner, so concurrent upserts can't create a second one;
+        # also serves batched eligibility checks
+        IndexModel([("user_id", ASCENDING)], name="user_id_unique", unique=True),
+    ],
+    "customer_requests": [
+        # Oldest pending requests first, for the assignment worker
+        IndexModel([("status", ASCENDING), ("created_at", ASCENDING)], name="status_created_at"),
+        # Rejects the same guest submission twice within one dedupe window
+        IndexModel(
+            [("dedupe_key", ASCENDING)],
+            name="dedupe_key_unique",
+            unique=True,
+            partialFilterExpression={"dedupe_key": {"$type": "string"}}
+        ),
+        IndexModel(
+            [("fingerprint", ASCENDING), ("created_at", DESCENDING)],
+            name="fingerprint_created_at",
+            partialFilterExpression={"fingerprint": {"$type": "string"}}
+        ),
+        IndexModel(
+            [(field, TEXT) for field in REQUEST_FIELD_WEIGHTS],
+            name="request_text",
+            weights=REQUEST_FIELD_WEIGHTS
+        ),
+        IndexModel(
+            [("geo_point", GEOSPHERE), ("status", ASCENDING)],
+            name="geo_point_status"
+        ),
+    ],
+}
+
+
+async def ensure_indexes(db) -> List[Tuple[str, List[str]]]:
+    """Create all declared indexes. Existing indexes are left untouched."""
+    created = []
+    for collection_name, indexes in INDEXES.items():
+        try:
+            names = await db[collection_name].create_indexes(indexes)
+            created.append((collection_name, names))
+        except Exception as e:
+            # Don't block startup on a conflicting index definition
+            logger.error(f"Failed to create indexes on {collection_name}: {str(e)}")
+    return created
@@ -0,0 +1,63 @@
+import os
+from typing import List
+
+from services.archive import (
+    ARCHIVE_AFTER_DAYS, REQUEST_AUTO_CANCEL_DAYS, archive_requests, cancel_stale_requests
+)
+from services.auto_assignment import AUTO_ASSIGN_ENABLED, AUTO_ASSIGN_INTERVAL_SECONDS, assign_pending_backlog
+from services.lead_previews import rescore_pending_leads
+from services.lead_scoring import LEAD_RESCORE_SECONDS
+from services.payments import (
+    PAYMENT_ARCHIVE_AFTER_DAYS, PAYMENT_SWEEP_INTERVAL_SECONDS, archive_terminal_payments, sweep_stale_payments
+)
+from services.scheduler import Interval, Job, parse_schedule
+
+# Jobs that must run on one worker at a time, registered with the scheduler at
+# startup. Per-worker cache refreshes (pending leads index, search corpora,
+# location suggestions) stay plain background tasks in server.py.
+JOBS: List[Job] = [
+    Job(
+        "lead_rescore",
+        rescore_pending_leads,
+        parse_schedule(os.environ.get("LEAD_RESCORE_SCHEDULE", str(LEAD_RESCORE_SECONDS))),
+        timeout_seconds=600,
+        jitter_seconds=10
+    ),
+    Job(
+        "auto_assignment",
+        assign_pending_backlog,
+        Interval(AUTO_ASSIGN_INTERVAL_SECONDS),
+        timeout_seconds=300,
+        jitter_seconds=5,
+        enabled=AUTO_ASSIGN_ENABLED
+    ),
+    Job(
+        "payment_sweep",
+        sweep_stale_payments,
+        Interval(PAYMENT_SWEEP_INTERVAL_SECONDS),
+        timeout_seconds=240,
+        jitter_seconds=5
+    ),
+    Job(
+        "payment_archive",
+        archive_terminal_payments,
+        parse_schedule(os.environ.get("PAYMENT_ARCHIVE_SCHEDULE", "15 3 * * *")),
+        timeout_seconds=1800,
+        enabled=PAYMENT_ARCHIVE_AFTER_DAYS > 0
+    ),
+    Job(
+        "request_auto_cancel",
+        cancel_stale_requests,
+        Interval(3600),
+        timeout_seconds=600,
+        jitter_seconds=30,
+        enabled=REQUEST_AUTO_CANCEL_DAYS > 0
+    ),
+    Job(
+        "request_archive",
+        archive_requests,
+        parse_schedule(os.environ.get("ARCHIVE_SCHEDULE", "30 2 * * *")),
+        timeout_seconds=3600,
+        enabled=ARCHIVE_AFTER_DAYS > 0
+    ),
+]
@@ -0,0 +1,24 @@
+"""Derived search fields on business profiles: rank score, location keys and geo point.
+
+Replaces the unthrottled backfill that used to run in every worker at startup.
+"""
+from typing import Any, Dict
+
+from services.ranking import rank_fields
+
+COLLECTION = "business_profiles"
+FILTER = {"$or": [
+    {"rank_score": {"$exists": False}},
+    {"city_key": {"$exists": False}},
+    {"province_key": {"$exists": False}},
+    {"geo_point": {"$exists": False}},
+]}
+
+
+def migrate(doc: Dict[str, Any]) -> Dict[str, Any]:
+    return rank_fields(doc)
+
+
+def verify(doc: Dict[str, Any]) -> bool:
+    fields = rank_fields(doc)
+    return all(doc.get(name) == value for name, value in fields.items())
@@ -0,0 +1,16 @@
+"""Geo points on customer requests submitted with a postal code before requests were geocoded."""
+from typing import Any, Dict
+
+from services.geo import geo_point
+
+COLLECTION = "customer_requests"
+FILTER = {"postal_code": {"$type": "string"}, "geo_point": {"$exists": False}}
+PROJECTION = {"_id": 1, "postal_code": 1, "geo_point": 1}
+
+
+def migrate(doc: Dict[str, Any]) -> Dict[str, Any]:
+    return {"geo_point": geo_point(doc["postal_code"])}
+
+
+def verify(doc: Dict[str, Any]) -> bool:
+    return not doc.get("postal_code") or doc.get("geo_point") == geo_point(doc["postal_code"])
@@ -0,0 +1,15 @@
+"""Versioned data migrations, run with ``python -m migrations``.
+
+Each migration is a module named ``NNNN_description.py`` in this package
+defining:
+
+- ``COLLECTION``: the collection it updates
+- ``FILTER``: documents that still need it (must not constrain ``_id``)
+- ``migrate(doc)`` returning the fields to ``$set`` (or None to skip), or
+  ``async migrate_batch(db, docs)`` returning a list of write operations
+- optionally ``PROJECTION``, ``DESCRIPTION`` and ``verify(doc) -> bool``
+
+Migrations must be idempotent: a document they have handled should no
+longer match ``FILTER``. See runner.py for batching, checkpoints and
+throttling.
+"""
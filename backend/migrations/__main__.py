@@ -0,0 +1,76 @@
+"""python -m migrations [status|run|verify] ..."""
+import argparse
+import asyncio
+import json
+import sys
+
+from database import connect
+from migrations.runner import (
+    COMPLETED, MIGRATION_BATCH_SIZE, MIGRATION_MAX_OPS_PER_SECOND, PENDING,
+    load_migrations, migration_states, run_migration, verify_migration
+)
+
+
+def _print(payload):
+    print(json.dumps(payload, default=str), flush=True)
+
+
+async def main(args) -> int:
+    client, db = connect()
+    try:
+        migrations = load_migrations()
+        if args.only is not None:
+            migrations = [migration for migration in migrations if migration.version == args.only]
+            if not migrations:
+                print(f"No migration {args.only}", file=sys.stderr)
+                return 2
+        states = await migration_states(db)
+
+        if args.command == "status":
+            for migration in migrations:
+                state = states.get(migration.version, {})
+                _print({
+                    "version": migration.version,
+                    "name": migration.name,
+                    "collection": migration.collection,
+                    "status": state.get("status", PENDING),
+                    "scanned": state.get("scanned", 0),
+                    "updated": state.get("updated", 0),
+                    "finished_at": state.get("finished_at"),
+                })
+            return 0
+
+        if args.command == "verify":
+            results = [await verify_migration(db, migration, args.batch_size) for migration in migrations]
+            for result in results:
+                _print(result)
+            return 0 if all(result["ok"] for result in results) else 1
+
+        for migration in migrations:
+            state = states.get(migration.version, {})
+            if state.get("status") == COMPLETED and not args.restart and args.only is None:
+                continue
+            progress = (lambda update: print(json.dumps(update, default=str), file=sys.stderr)) if args.verbose else None
+            _print(await run_migration(
+                db, migration,
+                dry_run=args.dry_run,
+                restart=args.restart,
+                batch_size=args.batch_size,
+                max_ops_per_second=args.max_ops,
+                progress=progress
+            ))
+        return 0
+    finally:
+        client.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(prog="python -m migrations", description="Run versioned data migrations")
+    parser.add_argument("command", choices=["status", "run", "verify"])
+    parser.add_argument("--only", type=int, help="Only this migration version")
+    parser.add_argument("--dry-run", action="store_true", help="Compute changes without writing")
+    parser.add_argument("--restart", action="store_true", help="Ignore the checkpoint and start from the first document")
+    parser.add_argument("--batch-size", type=int, default=MIGRATION_BATCH_SIZE)
+    parser.add_argument("--max-ops", type=float, default=MIGRATION_MAX_OPS_PER_SECOND, help="Upper bound on writes per second")
+    parser.add_argument("-v", "--verbose", action="store_true", help="Report progress after every batch on stderr")
+    sys.exit(asyncio.run(main(parser.parse_args())))
@@ -0,0 +1,256 @@
+import asyncio
+import importlib
+import os
+import pkgutil
+import re
+import socket
+import time
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, List, Optional
+
+from pymongo import ReturnDocument, UpdateOne
+from pymongo.errors import DuplicateKeyError
+
+MIGRATIONS_COLLECTION = "schema_migrations"
+MIGRATION_BATCH_SIZE = int(os.environ.get("MIGRATION_BATCH_SIZE", "500"))
+MIGRATION_START_OPS_PER_SECOND = float(os.environ.get("MIGRATION_START_OPS_PER_SECOND", "500"))
+MIGRATION_MIN_OPS_PER_SECOND = float(os.environ.get("MIGRATION_MIN_OPS_PER_SECOND", "50"))
+MIGRATION_MAX_OPS_PER_SECOND = float(os.environ.get("MIGRATION_MAX_OPS_PER_SECOND", "5000"))
+# A batch slower than this, or latency drifting past SLOWDOWN_FACTOR times
+# the fastest batch seen, means Mongo is under pressure and the rate backs off
+MIGRATION_MAX_BATCH_MS = float(os.environ.get("MIGRATION_MAX_BATCH_MS", "500"))
+SLOWDOWN_FACTOR = 2.0
+# A running migration's lock lapses if it stops checkpointing for this long
+MIGRATION_LOCK_SECONDS = 300
+
+PENDING = "pending"
+RUNNING = "running"
+COMPLETED = "completed"
+
+_MODULE_NAME = re.compile(r"^(\d{4})_(\w+)$")
+
+
+class Migration:
+    def __init__(self, version: int, name: str, module):
+        self.version = version
+        self.name = name
+        self.module = module
+        self.collection: str = module.COLLECTION
+        self.filter: Dict[str, Any] = getattr(module, "FILTER", {})
+        self.projection: Optional[Dict[str, Any]] = getattr(module, "PROJECTION", None)
+        self.description: str = getattr(module, "DESCRIPTION", "") or (module.__doc__ or "").strip()
+        self.verify: Optional[Callable[[Dict[str, Any]], bool]] = getattr(module, "verify", None)
+
+    async def operations(self, db, docs: List[Dict[str, Any]]) -> List[Any]:
+        if hasattr(self.module, "migrate_batch"):
+            return await self.module.migrate_batch(db, docs)
+        operations = []
+        for doc in docs:
+            fields = self.module.migrate(doc)
+            if fields:
+                operations.append(UpdateOne({"_id": doc["_id"]}, {"$set": fields}))
+        return operations
+
+
+def load_migrations() -> List[Migration]:
+    """All migration modules in this package, by version."""
+    package = importlib.import_module("migrations")
+    migrations = []
+    for info in pkgutil.iter_modules(package.__path__):
+        match = _MODULE_NAME.match(info.name)
+        if not match:
+            continue
+        module = importlib.import_module(f"migrations.{info.name}")
+        migrations.append(Migration(int(match.group(1)), match.group(2), module))
+    versions = [migration.version for migration in migrations]
+    if len(versions) != len(set(versions)):
+        raise RuntimeError("Duplicate migration version")
+    return sorted(migrations, key=lambda migration: migration.version)
+
+
+class AdaptiveThrottle:
+    """Caps write operations per second, adjusted from observed write latency.
+
+    Additive-increase/multiplicative-decrease: the rate grows by 10% after
+    each healthy batch and halves when a batch is slow, either in absolute
+    terms or relative to the fastest batch seen so far.
+    """
+
+    def __init__(self, start: float = MIGRATION_START_OPS_PER_SECOND, maximum: float = MIGRATION_MAX_OPS_PER_SECOND):
+        self.maximum = maximum
+        self.rate = min(start, maximum)
+        self.baseline_ms: Optional[float] = None
+        self.average_ms: Optional[float] = None
+        self._next_at = time.monotonic()
+
+    def observe(self, latency_ms: float):
+        self.baseline_ms = latency_ms if self.baseline_ms is None else min(self.baseline_ms, latency_ms)
+        self.average_ms = latency_ms if self.average_ms is None else 0.8 * self.average_ms + 0.2 * latency_ms
+        slow = latency_ms > MIGRATION_MAX_BATCH_MS or self.average_ms > SLOWDOWN_FACTOR * max(self.baseline_ms, 1.0)
+        if slow:
+            self.rate = max(MIGRATION_MIN_OPS_PER_SECOND, self.rate / 2)
+        else:
+            self.rate = min(self.maximum, self.rate * 1.1)
+
+    async def wait(self, operations: int):
+        """Sleep long enough that ``operations`` stay within the current rate."""
+        self._next_at = max(self._next_at, time.monotonic()) + operations / self.rate
+        delay = self._next_at - time.monotonic()
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+
+def _owner() -> str:
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+async def migration_states(db) -> Dict[int, Dict[str, Any]]:
+    docs = await db[MIGRATIONS_COLLECTION].find({}).to_list(None)
+    return {doc["_id"]: doc for doc in docs}
+
+
+async def _acquire(db, migration: Migration, restart: bool) -> Optional[Dict[str, Any]]:
+    """Lock a migration for this process. Returns its state, or None if another process holds it."""
+    now = datetime.utcnow()
+    update: Dict[str, Any] = {
+        "$set": {
+            "name": migration.name,
+            "collection": migration.collection,
+            "status": RUNNING,
+            "owner": _owner(),
+            "lock_expires_at": now + timedelta(seconds=MIGRATION_LOCK_SECONDS),
+            "started_at": now,
+        },
+    }
+    # An interrupted run keeps its checkpoint and counters; a completed one
+    # has no checkpoint left and starts over
+    if restart:
+        update["$set"].update({"last_id": None, "scanned": 0, "updated": 0})
+    try:
+        return await db[MIGRATIONS_COLLECTION].find_one_and_update(
+            {"_id": migration.version, "$or": [{"status": {"$ne": RUNNING}}, {"lock_expires_at": {"$lte": now}}]},
+            update,
+            upsert=True,
+            return_document=ReturnDocument.AFTER
+        )
+    except DuplicateKeyError:
+        return None
+
+
+async def run_migration(
+    db,
+    migration: Migration,
+    dry_run: bool = False,
+    restart: bool = False,
+    batch_size: int = MIGRATION_BATCH_SIZE,
+    max_ops_per_second: float = MIGRATION_MAX_OPS_PER_SECOND,
+    progress: Optional[Callable[[Dict[str, Any]], None]] = None
+) -> Dict[str, Any]:
+    """Apply a migration in ``_id`` order, checkpointing after every batch.
+
+    An interrupted run resumes after the last checkpointed ``_id``; a
+    completed one starts over, relying on ``FILTER`` to skip what's done.
+    A dry run reads and computes the same batches but writes nothing,
+    including the checkpoint.
+    """
+    states = await migration_states(db)
+    if dry_run:
+        state = {} if restart else states.get(migration.version, {})
+    else:
+        state = await _acquire(db, migration, restart)
+        if state is None:
+            raise RuntimeError(f"Migration {migration.version} is already running elsewhere")
+
+    collection = db[migration.collection]
+    throttle = AdaptiveThrottle(maximum=max_ops_per_second)
+    last_id = state.get("last_id")
+    result = {
+        "version": migration.version,
+        "name": migration.name,
+        "dry_run": dry_run,
+        "scanned": 0,
+        "updated": 0,
+        "batches": 0,
+    }
+    started = time.monotonic()
+    while True:
+        query = {**migration.filter, "_id": {"$gt": last_id}} if last_id is not None else migration.filter
+        docs = await collection.find(query, migration.projection).sort("_id", 1) \
+            .limit(batch_size).to_list(batch_size)
+        if not docs:
+            break
+        operations = await migration.operations(db, docs)
+        updated = len(operations)
+        if operations and not dry_run:
+            write_started = time.monotonic()
+            written = await collection.bulk_write(operations, ordered=False)
+            throttle.observe((time.monotonic() - write_started) * 1000)
+            updated = written.modified_count + written.upserted_count
+        last_id = docs[-1]["_id"]
+        result["scanned"] += len(docs)
+        result["updated"] += updated
+        result["batches"] += 1
+        if not dry_run:
+            await db[MIGRATIONS_COLLECTION].update_one(
+                {"_id": migration.version},
+                {
+                    "$set": {
+                        "last_id": last_id,
+                        "lock_expires_at": datetime.utcnow() + timedelta(seconds=MIGRATION_LOCK_SECONDS),
+                    },
+                    "$inc": {"scanned": len(docs), "updated": updated},
+                }
+            )
+        if progress:
+            progress({**result, "ops_per_second": round(throttle.rate, 1)})
+        if len(docs) < batch_size:
+            break
+        await throttle.wait(max(len(operations), 1))
+
+    result["seconds"] = round(time.monotonic() - started, 3)
+    if not dry_run:
+        await db[MIGRATIONS_COLLECTION].update_one(
+            {"_id": migration.version},
+            {"$set": {"status": COMPLETED, "finished_at": datetime.utcnow(), "owner": None, "last_id": None}}
+        )
+    return result
+
+
+async def verify_migration(db, migration: Migration, batch_size: int = MIGRATION_BATCH_SIZE, sample: int = 10) -> Dict[str, Any]:
+    """Count documents still matching the filter and, if the migration has
+    ``verify``, check every document in the collection with it."""
+    collection = db[migration.collection]
+    remaining = await collection.count_documents(migration.filter)
+    checked = 0
+    failed: List[Any] = []
+    failures = 0
+    if migration.verify:
+        throttle = AdaptiveThrottle()
+        last_id = None
+        while True:
+            query = {"_id": {"$gt": last_id}} if last_id is not None else {}
+            read_started = time.monotonic()
+            docs = await collection.find(query, migration.projection).sort("_id", 1) \
+                .limit(batch_size).to_list(batch_size)
+            throttle.observe((time.monotonic() - read_started) * 1000)
+            if not docs:
+                break
+            for doc in docs:
+                if not migration.verify(doc):
+                    failures += 1
+                    if len(failed) < sample:
+                        failed.append(doc["_id"])
+            checked += len(docs)
+            last_id = docs[-1]["_id"]
+            if len(docs) < batch_size:
+                break
+            await throttle.wait(len(docs))
+    return {
+        "version": migration.version,
+        "name": migration.name,
+        "remaining": remaining,
+        "checked": checked,
+        "failures": failures,
+        "failed_ids": [str(doc_id) for doc_id in failed],
+        "ok": remaining == 0 and failures == 0,
+    }
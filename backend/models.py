@@ -8,6 +8,7 @@ class UserType(str, Enum):
     PROFESSIONAL = "professional"
     CUSTOMER = "customer"
     ADMIN = "admin"
+    PARTNER = "partner"
 
 class ServiceCategory(str, Enum):
     CONTRACTOR = "contractor"
@@ -138,6 +139,12 @@ class BusinessProfile(BaseModel):
     review_count: int = 0
     is_featured: bool = False
     is_verified: bool = False
+    service_radius_km: float = 50.0
+    # Derived for search, see services/ranking.py
+    rank_score: float = 0.0
+    city_key: str = ""
+    province_key: str = ""
+    geo_point: Optional[Dict[str, Any]] = None  # GeoJSON point from postal_code, see services/geo.py
     created_at: datetime = Field(default_factory=datetime.utcnow)
     updated_at: datetime = Field(default_factory=datetime.utcnow)
 
@@ -156,6 +163,7 @@ class BusinessProfileCreate(BaseModel):
     postal_code: str
     hourly_rate_min: Optional[float] = None
     hourly_rate_max: Optional[float] = None
+    service_radius_km: float = Field(50.0, gt=0, le=500)
 
 class CustomerRequest(BaseModel):
     id: str = Field(default_factory=lambda: str(uuid.uuid4()))
@@ -166,6 +174,8 @@ class CustomerRequest(BaseModel):
     location: str
     city: str
     province: str
+    postal_code: Optional[str] = None
+    geo_point: Optional[Dict[str, Any]] = None  # GeoJSON point from postal_code, see services/geo.py
     budget_min: Optional[float] = None
     budget_max: Optional[float] = None
     timeline: str  # e.g., "ASAP", "Within 1 week", "Within 1 month"
@@ -175,6 +185,8 @@ class CustomerRequest(BaseModel):
     square_footage: Optional[int] = None
     additional_details: Dict[str, Any] = {}
     status: LeadStatus = LeadStatus.PENDING
+    fingerprint: Optional[str] = None  # set on guest requests for duplicate detection
+    dedupe_key: Optional[str] = None  # fingerprint + time bucket, unique
     created_at: datetime = Field(default_factory=datetime.utcnow)
     updated_at: datetime = Field(default_factory=datetime.utcnow)
 
@@ -185,6 +197,7 @@ class CustomerRequestCreate(BaseModel):
     location: str
     city: str
     province: str
+    postal_code: Optional[str] = None
     budget_min: Optional[float] = None
     budget_max: Optional[float] = None
     timeline: str
@@ -194,6 +207,25 @@ class CustomerRequestCreate(BaseModel):
     square_footage: Optional[int] = None
     additional_details: Dict[str, Any] = {}
 
+class QuickRequestCreate(BaseModel):
+    """Guest request as submitted by the landing page or a lead partner feed."""
+    email: EmailStr
+    phone: str
+    service_category: ServiceCategory
+    title: str
+    description: str
+    city: str
+    province: str
+    postal_code: Optional[str] = None
+    location: Optional[str] = None
+    budget_min: Optional[float] = None
+    budget_max: Optional[float] = None
+    timeline: str = "ASAP"
+    urgency: LeadPriority = LeadPriority.MEDIUM
+    contact_preference: str = "either"
+    first_name: str = ""
+    last_name: str = ""
+
 class Lead(BaseModel):
     id: str = Field(default_factory=lambda: str(uuid.uuid4()))
     customer_request_id: str
@@ -210,6 +242,7 @@ class Lead(BaseModel):
     # Credit system integration
     credits_used: int = 1  # Default 1 credit per lead view
     viewed_at: Optional[datetime] = None
+    auto_assigned: bool = False  # created by the assignment worker, see services/auto_assignment.py
     created_at: datetime = Field(default_factory=datetime.utcnow)
     updated_at: datetime = Field(default_factory=datetime.utcnow)
 
@@ -217,6 +250,17 @@ class LeadCreate(BaseModel):
     customer_request_id: str
     professional_id: str
 
+class LeadStatusUpdate(BaseModel):
+    status: Optional[LeadStatus] = None
+    notes: Optional[str] = None
+    quote_amount: Optional[float] = Field(None, ge=0)
+    is_won: Optional[bool] = None
+
+class LeadBulkCreate(BaseModel):
+    """Assign every listed request to every listed professional."""
+    customer_request_ids: List[str] = Field(..., min_length=1, max_length=20)
+    professional_ids: List[str] = Field(..., min_length=1, max_length=50)
+
 class Review(BaseModel):
     id: str = Field(default_factory=lambda: str(uuid.uuid4()))
     business_profile_id: str
@@ -273,6 +317,7 @@ class BusinessProfileResponse(BaseModel):
     review_count: int
     is_featured: bool
     is_verified: bool
+    service_radius_km: float = 50.0
     created_at: datetime
 
 class CustomerRequestResponse(BaseModel):
@@ -301,10 +346,24 @@ class LeadResponse(BaseModel):
     is_won: Optional[bool]
     credits_used: int
     viewed_at: Optional[datetime]
+    auto_assigned: bool = False
     created_at: datetime
 
+class LeadDetailResponse(LeadResponse):
+    """Lead with related documents embedded when requested via ``expand``."""
+    request: Optional[Dict[str, Any]] = None
+    professional: Optional[Dict[str, Any]] = None
+
 class CreditBalanceResponse(BaseModel):
     balance: int
     total_purchased: int
     total_used: int
-    last_updated: datetime
\ No newline at end of file
+    last_updated: datetime
+
+class BatchSubRequest(BaseModel):
+    method: str = "GET"
+    path: str  # e.g. "/api/credits/balance"
+    query: Dict[str, Any] = {}
+
+class BatchRequest(BaseModel):
+    requests: List[BatchSubRequest] = Field(..., min_length=1, max_length=20)
@@ -0,0 +1,6 @@
+"""niwi-ops: maintenance commands that run outside the API process.
+
+Run from the backend directory with ``python -m ops --help``. Each command
+reports progress on stderr and ends with one JSON line on stdout holding its
+result and timing.
+"""
@@ -0,0 +1,144 @@
+import asyncio
+import sys
+import time
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, List, Optional, TextIO
+
+import typer
+
+from database import connect
+from ops import tasks
+from services import archive
+
+app = typer.Typer(name="niwi-ops", help="Bulk maintenance for the Niwi database.", no_args_is_help=True)
+indexes_app = typer.Typer(help="Declared indexes (see indexes.py).", no_args_is_help=True)
+counters_app = typer.Typer(help="Denormalised counters on profiles.", no_args_is_help=True)
+ledger_app = typer.Typer(help="Credit balances against their transactions.", no_args_is_help=True)
+archive_app = typer.Typer(help="Archive tier (see services/archive.py).", no_args_is_help=True)
+app.add_typer(indexes_app, name="indexes")
+app.add_typer(counters_app, name="counters")
+app.add_typer(ledger_app, name="ledger")
+app.add_typer(archive_app, name="archive")
+
+ConcurrencyOption = typer.Option(tasks.DEFAULT_CONCURRENCY, "--concurrency", "-c", min=1, help="Batches written at once")
+BatchSizeOption = typer.Option(tasks.DEFAULT_BATCH_SIZE, "--batch-size", min=1, help="Documents per batch")
+
+
+def _run(command: str, work: Callable[[Any], Awaitable[Dict[str, Any]]], summary: TextIO = sys.stdout):
+    """Run ``work(db)`` and print its result with timing as one JSON line.
+
+    Exits non-zero when the command fails or reports ``ok: false``.
+    """
+    async def main() -> Dict[str, Any]:
+        client, db = connect()
+        try:
+            return await work(db)
+        finally:
+            client.close()
+
+    started = time.monotonic()
+    try:
+        result = asyncio.run(main())
+    except Exception as e:
+        tasks.emit({"command": command, "ok": False, "error": str(e), "seconds": round(time.monotonic() - started, 3)}, summary)
+        raise typer.Exit(1)
+    result.setdefault("ok", True)
+    tasks.emit({"command": command, **result, "seconds": round(time.monotonic() - started, 3)}, summary)
+    if not result["ok"]:
+        raise typer.Exit(1)
+
+
+@indexes_app.command("sync")
+def indexes_sync(prune: bool = typer.Option(False, help="Drop indexes that are not declared")):
+    """Create missing declared indexes and list undeclared ones."""
+    _run("indexes sync", lambda db: tasks.sync_indexes(db, prune=prune))
+
+
+@counters_app.command("rebuild")
+def counters_rebuild(concurrency: int = ConcurrencyOption, batch_size: int = BatchSizeOption):
+    """Recompute profile ratings, review counts and rank fields from reviews."""
+    _run("counters rebuild", lambda db: tasks.rebuild_counters(db, concurrency=concurrency, batch_size=batch_size))
+
+
+@ledger_app.command("reconcile")
+def ledger_reconcile(
+    fix: bool = typer.Option(False, help="Rewrite mismatched balances from the ledger"),
+    include_unledgered: bool = typer.Option(
+        False, help="With --fix, also reset balances that have no transactions at all"
+    ),
+    sample: int = typer.Option(20, min=0, help="Mismatches to include in the output"),
+    concurrency: int = ConcurrencyOption
+):
+    """Compare credit balances with credit transactions and completed payments."""
+    _run("ledger reconcile", lambda db: tasks.reconcile_ledger(
+        db, fix=fix, include_unledgered=include_unledgered, sample=sample, concurrency=concurrency
+    ))
+
+
+@app.command("export")
+def export(
+    collection: str = typer.Argument(..., help="Collection to export"),
+    output: Optional[Path] = typer.Option(None, "--output", "-o", help="JSON lines file; stdout if omitted"),
+    query: Optional[str] = typer.Option(None, "--query", "-q", help="Filter as (extended) JSON"),
+    fields: Optional[List[str]] = typer.Option(None, "--field", "-f", help="Only these fields; repeatable"),
+    batch_size: int = BatchSizeOption
+):
+    """Stream a collection as JSON lines."""
+    try:
+        parsed = tasks.parse_query(query)
+    except ValueError as e:
+        raise typer.BadParameter(str(e), param_hint="--query")
+
+    async def work(db) -> Dict[str, Any]:
+        if output is None:
+            return await tasks.export_collection(db, collection, sys.stdout, parsed, fields, batch_size)
+        with output.open("w", encoding="utf-8") as stream:
+            result = await tasks.export_collection(db, collection, stream, parsed, fields, batch_size)
+        return {**result, "output": str(output)}
+
+    # Exported documents own stdout when there is no --output
+    _run("export", work, sys.stdout if output else sys.stderr)
+
+
+@archive_app.command("run")
+def archive_run(
+    after_days: Optional[float] = typer.Option(None, help="Override ARCHIVE_AFTER_DAYS"),
+    cancel_after_days: Optional[float] = typer.Option(None, help="Override REQUEST_AUTO_CANCEL_DAYS"),
+    max_batches: Optional[int] = typer.Option(None, min=1, help="Stop after this many batches"),
+    pause: Optional[float] = typer.Option(None, min=0, help="Override ARCHIVE_BATCH_PAUSE_SECONDS"),
+    payments: bool = typer.Option(False, help="Also archive settled payments (PAYMENT_ARCHIVE_AFTER_DAYS)")
+):
+    """Cancel stale pending requests, then archive settled requests and their leads."""
+    overrides = {
+        "ARCHIVE_AFTER_DAYS": after_days,
+        "REQUEST_AUTO_CANCEL_DAYS": cancel_after_days,
+        "ARCHIVE_BATCH_PAUSE_SECONDS": pause,
+    }
+    for name, value in overrides.items():
+        if value is not None:
+            setattr(archive, name, value)
+
+    async def work(db) -> Dict[str, Any]:
+        result: Dict[str, Any] = {"cancelled": await archive.cancel_stale_requests(db)}
+        result.update(await archive.archive_requests(db, max_batches=max_batches))
+        if payments:
+            from services.payments import archive_terminal_payments
+            result["payments"] = await archive_terminal_payments(db)
+        return result
+
+    _run("archive run", work)
+
+
+@app.command("seed")
+def seed(
+    scale: int = typer.Option(100, "--scale", "-n", min=0, help="Professionals and customers to create; requests are 3x"),
+    test_accounts: bool = typer.Option(True, help="Also create the admin/contractor/customer @test.com logins"),
+    random_seed: Optional[int] = typer.Option(None, "--random-seed", help="Make generated data reproducible"),
+    concurrency: int = ConcurrencyOption,
+    batch_size: int = BatchSizeOption
+):
+    """Fill the database with generated users, profiles, balances and pending requests."""
+    _run("seed", lambda db: tasks.seed(
+        db, scale, concurrency=concurrency, batch_size=batch_size,
+        test_accounts=test_accounts, random_seed=random_seed
+    ))
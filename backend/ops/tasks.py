@@ -0,0 +1,452 @@
+import asyncio
+import json
+import random
+import sys
+import time
+import uuid
+from datetime import datetime, timedelta
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional, TextIO, TypeVar
+
+from bson import json_util
+from pymongo import UpdateOne
+
+from auth import get_password_hash
+from indexes import INDEXES, ensure_indexes
+from models import (
+    BusinessProfile, CreditBalance, CreditTransaction, CustomerRequest,
+    LeadPriority, ServiceCategory, User, UserType
+)
+from services.geo import geo_point
+from services.lead_previews import sync_lead_previews
+from services.ranking import rank_fields
+
+T = TypeVar("T")
+
+DEFAULT_CONCURRENCY = 4
+DEFAULT_BATCH_SIZE = 1000
+
+# Cities with FSAs in data/fsa_centroids.csv, so seeded data is geocoded
+SEED_LOCATIONS = [
+    ("Toronto", "ON", "M5V 2T6"), ("Toronto", "ON", "M4W 1A8"), ("Ottawa", "ON", "K1P 5J2"),
+    ("Mississauga", "ON", "L5B 3C2"), ("Hamilton", "ON", "L8P 4R5"), ("London", "ON", "N6A 3K7"),
+    ("Montréal", "QC", "H2X 1Y4"), ("Montréal", "QC", "H3B 2Y5"), ("Québec", "QC", "G1R 4P5"),
+    ("Vancouver", "BC", "V6B 1A1"), ("Victoria", "BC", "V8W 1N9"), ("Calgary", "AB", "T2P 1J9"),
+    ("Edmonton", "AB", "T5J 0N3"), ("Winnipeg", "MB", "R3C 0V8"), ("Regina", "SK", "S4P 3Y2"),
+    ("Saskatoon", "SK", "S7K 1J5"), ("Halifax", "NS", "B3J 1P3"), ("Moncton", "NB", "E1C 4M3"),
+]
+SEED_TIMELINES = ["ASAP", "Within 1 week", "Within 1 month", "Flexible"]
+SEED_PASSWORD = "password"
+TEST_ACCOUNTS = [
+    ("admin@test.com", UserType.ADMIN, "Admin", "User", "+1234567890"),
+    ("contractor@test.com", UserType.PROFESSIONAL, "Test", "Contractor", "+1234567891"),
+    ("customer@test.com", UserType.CUSTOMER, "Test", "Customer", "+1234567892"),
+]
+
+
+class Progress:
+    """Progress lines on stderr, at most every half second."""
+
+    def __init__(self, label: str, total: Optional[int] = None, stream: TextIO = sys.stderr):
+        self.label = label
+        self.total = total
+        self.done = 0
+        self.stream = stream
+        self._started = self._printed = time.monotonic()
+
+    def advance(self, count: int = 1):
+        self.done += count
+        now = time.monotonic()
+        if now - self._printed >= 0.5:
+            self._printed = now
+            self._print(now)
+
+    def finish(self):
+        self._print(time.monotonic())
+
+    def _print(self, now: float):
+        elapsed = max(now - self._started, 1e-9)
+        total = f"/{self.total}" if self.total is not None else ""
+        print(f"{self.label}: {self.done}{total} ({self.done / elapsed:.0f}/s)", file=self.stream, flush=True)
+
+
+async def bounded(items: Iterable[T], worker: Callable[[T], Awaitable[Any]], concurrency: int) -> List[Any]:
+    """Run ``worker`` over ``items`` with at most ``concurrency`` in flight."""
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def run(item: T):
+        async with semaphore:
+            return await worker(item)
+
+    return await asyncio.gather(*(run(item) for item in items))
+
+
+def _chunks(items: List[T], size: int) -> List[List[T]]:
+    return [items[start:start + size] for start in range(0, len(items), size)]
+
+
+async def sync_indexes(db, prune: bool = False) -> Dict[str, Any]:
+    """Create declared indexes and report (or drop) undeclared ones."""
+    created = dict(await ensure_indexes(db))
+    extra: Dict[str, List[str]] = {}
+    for collection_name, indexes in INDEXES.items():
+        declared = {index.document["name"] for index in indexes} | {"_id_"}
+        existing = [index["name"] async for index in db[collection_name].list_indexes()]
+        undeclared = [name for name in existing if name not in declared]
+        if undeclared:
+            extra[collection_name] = undeclared
+            if prune:
+                for name in undeclared:
+                    await db[collection_name].drop_index(name)
+    return {"collections": len(INDEXES), "created": created, "undeclared": extra, "pruned": prune}
+
+
+async def rebuild_counters(db, concurrency: int = DEFAULT_CONCURRENCY, batch_size: int = DEFAULT_BATCH_SIZE) -> Dict[str, Any]:
+    """Recompute profile rating and review counts from the reviews collection.
+
+    Reviews reference a profile by Mongo _id, profile id or owner user id
+    (see routes/reviews.py), so all three are summed. Rank fields are
+    refreshed along with the counts.
+    """
+    stats = {
+        doc["_id"]: (doc["rating_sum"], doc["count"])
+        for doc in await db.reviews.aggregate([
+            {"$group": {"_id": "$professional_id", "rating_sum": {"$sum": "$rating"}, "count": {"$sum": 1}}},
+        ]).to_list(None)
+    }
+    total = await db.business_profiles.estimated_document_count()
+    progress = Progress("counters rebuild", total)
+    updated = 0
+
+    async def write(batch: List[UpdateOne]):
+        nonlocal updated
+        if batch:
+            result = await db.business_profiles.bulk_write(batch, ordered=False)
+            updated += result.modified_count
+
+    pending: List[List[UpdateOne]] = []
+    operations: List[UpdateOne] = []
+    async for profile in db.business_profiles.find({}):
+        keys = {profile["_id"], profile.get("id"), profile.get("user_id")}
+        rating_sum = sum(stats.get(key, (0, 0))[0] for key in keys if key)
+        count = sum(stats.get(key, (0, 0))[1] for key in keys if key)
+        rating = round(rating_sum / count, 2) if count else 0.0
+        counters = {"rating": rating, "review_count": count, "avg_rating": rating, "total_reviews": count}
+        fields = {**counters, **rank_fields({**profile, **counters})}
+        if any(profile.get(name) != value for name, value in fields.items()):
+            operations.append(UpdateOne({"_id": profile["_id"]}, {"$set": fields}))
+        progress.advance()
+        if len(operations) >= batch_size:
+            pending.append(operations)
+            operations = []
+            if len(pending) >= concurrency:
+                await bounded(pending, write, concurrency)
+                pending = []
+    pending.append(operations)
+    await bounded(pending, write, concurrency)
+    progress.finish()
+    return {"profiles": progress.done, "updated": updated, "reviewed_targets": len(stats)}
+
+
+async def reconcile_ledger(
+    db,
+    fix: bool = False,
+    include_unledgered: bool = False,
+    sample: int = 20,
+    concurrency: int = DEFAULT_CONCURRENCY
+) -> Dict[str, Any]:
+    """Check credit balances against the credit transaction ledger and payments.
+
+    A balance should equal the sum of its transactions, total_purchased the
+    purchases and total_used the uses. Completed payments should each have
+    a purchase transaction. With ``fix`` mismatched balances are rewritten
+    from the ledger; payments are only reported.
+
+    Balances with no transactions at all (seeded accounts, grants made
+    before the ledger existed) are reported separately as unledgered and
+    left alone by ``fix`` unless ``include_unledgered`` is set, which would
+    reset them to zero.
+    """
+    ledger = {
+        doc["_id"]: doc
+        for doc in await db.credit_transactions.aggregate([
+            {"$group": {
+                "_id": "$user_id",
+                "balance": {"$sum": "$amount"},
+                "purchased": {"$sum": {"$cond": [{"$eq": ["$transaction_type", "purchase"]}, "$amount", 0]}},
+                "used": {"$sum": {"$cond": [{"$eq": ["$transaction_type", "use"]}, {"$abs": "$amount"}, 0]}},
+            }},
+        ]).to_list(None)
+    }
+    balances = await db.credit_balances.find(
+        {}, {"_id": 0, "user_id": 1, "balance": 1, "total_purchased": 1, "total_used": 1}
+    ).to_list(None)
+
+    mismatches = []
+    unledgered = []
+    seen = set()
+    for balance in balances:
+        seen.add(balance["user_id"])
+        expected = ledger.get(balance["user_id"], {"balance": 0, "purchased": 0, "used": 0})
+        actual = (balance.get("balance", 0), balance.get("total_purchased", 0), balance.get("total_used", 0))
+        wanted = (expected["balance"], expected["purchased"], expected["used"])
+        if actual != wanted:
+            entry = {"user_id": balance["user_id"], "actual": actual, "ledger": wanted}
+            (mismatches if balance["user_id"] in ledger else unledgered).append(entry)
+    missing_balances = [user_id for user_id in ledger if user_id not in seen]
+
+    credited_sessions = set(await db.credit_transactions.distinct(
+        "payment_session_id", {"transaction_type": "purchase", "payment_session_id": {"$ne": None}}
+    ))
+    completed = await db.payment_transactions.find(
+        {"payment_status": "completed"}, {"_id": 0, "session_id": 1, "user_id": 1}
+    ).to_list(None)
+    uncredited = [payment for payment in completed if payment["session_id"] not in credited_sessions]
+
+    to_fix = mismatches + (unledgered if include_unledgered else [])
+    fixed = 0
+    if fix and (to_fix or missing_balances):
+        now = datetime.utcnow()
+
+        def rewrite(user_id: str) -> Dict[str, Any]:
+            expected = ledger.get(user_id, {})
+            return {
+                "$set": {
+                    "balance": expected.get("balance", 0),
+                    "total_purchased": expected.get("purchased", 0),
+                    "total_used": expected.get("used", 0),
+                    "last_updated": now,
+                },
+            }
+
+        # Guarded on the values read above, so a balance that changed since
+        # (a live grant or spend) is skipped rather than overwritten
+        operations = [
+            UpdateOne(
+                {
+                    "user_id": entry["user_id"],
+                    "balance": entry["actual"][0],
+                    "total_purchased": entry["actual"][1],
+                    "total_used": entry["actual"][2],
+                },
+                rewrite(entry["user_id"])
+            )
+            for entry in to_fix
+        ] + [
+            UpdateOne(
+                {"user_id": user_id},
+                {**rewrite(user_id), "$setOnInsert": {"id": str(uuid.uuid4())}},
+                upsert=True
+            )
+            for user_id in missing_balances
+        ]
+
+        async def write(batch: List[UpdateOne]) -> int:
+            result = await db.credit_balances.bulk_write(batch, ordered=False)
+            return result.modified_count + result.upserted_count
+
+        fixed = sum(await bounded(_chunks(operations, DEFAULT_BATCH_SIZE), write, concurrency))
+
+    unresolved = bool(to_fix or missing_balances) and not fix
+    return {
+        "ok": not unresolved and not uncredited,
+        "balances": len(balances),
+        "mismatched": len(mismatches),
+        "unledgered": len(unledgered),
+        "missing_balances": len(missing_balances),
+        "uncredited_payments": len(uncredited),
+        "fixed": fixed,
+        "sample_mismatches": mismatches[:sample],
+        "sample_unledgered": unledgered[:sample],
+        "sample_uncredited_payments": uncredited[:sample],
+    }
+
+
+async def export_collection(
+    db,
+    collection: str,
+    output: TextIO,
+    query: Optional[Dict[str, Any]] = None,
+    fields: Optional[List[str]] = None,
+    batch_size: int = DEFAULT_BATCH_SIZE
+) -> Dict[str, Any]:
+    """Stream a collection as JSON lines (MongoDB relaxed extended JSON)."""
+    query = query or {}
+    projection = {name: 1 for name in fields} if fields else None
+    total = await db[collection].count_documents(query) if query else await db[collection].estimated_document_count()
+    progress = Progress(f"export {collection}", total)
+    options = json_util.JSONOptions(json_mode=json_util.JSONMode.RELAXED)
+    async for doc in db[collection].find(query, projection).sort("_id", 1).batch_size(batch_size):
+        output.write(json_util.dumps(doc, json_options=options))
+        output.write("\n")
+        progress.advance()
+    progress.finish()
+    return {"collection": collection, "documents": progress.done}
+
+
+def _seed_profile(user_id: str, index: int, rng: random.Random) -> Dict[str, Any]:
+    city, province, postal_code = rng.choice(SEED_LOCATIONS)
+    categories = rng.sample(list(ServiceCategory), rng.randint(1, 3))
+    review_count = rng.randint(0, 80)
+    profile = BusinessProfile(
+        user_id=user_id,
+        business_name=f"Seed Services {index}",
+        service_categories=categories,
+        description=f"Seeded {', '.join(category.value for category in categories)} business.",
+        service_areas=[city],
+        years_experience=rng.randint(1, 30),
+        city=city,
+        province=province,
+        postal_code=postal_code,
+        hourly_rate_min=rng.choice([None, 50.0, 75.0]),
+        rating=round(rng.uniform(3.0, 5.0), 2) if review_count else 0.0,
+        review_count=review_count,
+        is_verified=rng.random() < 0.7,
+        service_radius_km=rng.choice([25.0, 50.0, 100.0]),
+        geo_point=geo_point(postal_code),
+    ).dict()
+    return {**profile, **rank_fields(profile)}
+
+
+def _seed_request(customer_id: str, index: int, rng: random.Random, now: datetime) -> Dict[str, Any]:
+    city, province, postal_code = rng.choice(SEED_LOCATIONS)
+    category = rng.choice(list(ServiceCategory))
+    budget_min = rng.choice([None, 500.0, 2000.0, 10000.0])
+    created_at = now - timedelta(minutes=rng.randint(0, 60 * 24 * 30))
+    return CustomerRequest(
+        customer_id=customer_id,
+        service_category=category,
+        title=f"Seed {category.value.replace('_', ' ')} request {index}",
+        description="Seeded request for load and maintenance testing. " * rng.randint(1, 6),
+        location=city,
+        city=city,
+        province=province,
+        postal_code=postal_code,
+        budget_min=budget_min,
+        budget_max=budget_min * 2 if budget_min else None,
+        timeline=rng.choice(SEED_TIMELINES),
+        urgency=rng.choice(list(LeadPriority)),
+        contact_preference=rng.choice(["phone", "email", "either"]),
+        geo_point=geo_point(postal_code),
+        created_at=created_at,
+        updated_at=created_at,
+    ).dict()
+
+
+async def seed(
+    db,
+    scale: int,
+    concurrency: int = DEFAULT_CONCURRENCY,
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    test_accounts: bool = True,
+    random_seed: Optional[int] = None
+) -> Dict[str, Any]:
+    """Insert ``scale`` professionals and customers and 3 x ``scale`` pending requests.
+
+    Seeded documents carry a ``seed_run`` tag so they can be found (and
+    removed) later; all seeded users share the password "password".
+    """
+    rng = random.Random(random_seed)
+    run = uuid.uuid4().hex[:8]
+    now = datetime.utcnow()
+    password_hash = get_password_hash(SEED_PASSWORD)
+    result: Dict[str, Any] = {"seed_run": run}
+    if test_accounts:
+        result["test_accounts"] = await seed_test_accounts(db)
+
+    def user(user_type: UserType, index: int) -> Dict[str, Any]:
+        return {**User(
+            email=f"seed-{user_type.value}-{run}-{index}@example.com",
+            password_hash=password_hash,
+            user_type=user_type,
+            first_name="Seed",
+            last_name=f"{user_type.value.title()} {index}",
+        ).dict(), "seed_run": run}
+
+    professionals = [user(UserType.PROFESSIONAL, index) for index in range(scale)]
+    customers = [user(UserType.CUSTOMER, index) for index in range(scale)]
+    profiles = [{**_seed_profile(pro["id"], index, rng), "seed_run": run} for index, pro in enumerate(professionals)]
+    balances, transactions = [], []
+    for pro in professionals:
+        credits = rng.randint(0, 30)
+        balances.append({**CreditBalance(user_id=pro["id"], balance=credits, total_purchased=credits).dict(), "seed_run": run})
+        if credits:
+            transactions.append({**CreditTransaction(
+                user_id=pro["id"], transaction_type="purchase", amount=credits, description="Seed credits"
+            ).dict(), "seed_run": run})
+    requests = [
+        {**_seed_request(rng.choice(customers)["id"], index, rng, now), "seed_run": run}
+        for index in range(scale * 3)
+    ] if customers else []
+
+    plan = [
+        ("users", professionals + customers),
+        ("business_profiles", profiles),
+        ("credit_balances", balances),
+        ("credit_transactions", transactions),
+        ("customer_requests", requests),
+    ]
+    progress = Progress("seed", sum(len(docs) for _, docs in plan))
+
+    for collection, docs in plan:
+        async def insert(batch: List[Dict[str, Any]], collection: str = collection):
+            await db[collection].insert_many(batch, ordered=False)
+            if collection == "customer_requests":
+                await sync_lead_previews(db, batch)
+            progress.advance(len(batch))
+
+        await bounded(_chunks(docs, batch_size), insert, concurrency)
+        result[collection] = len(docs)
+    progress.finish()
+    return result
+
+
+async def seed_test_accounts(db) -> List[str]:
+    """The fixed admin/contractor/customer test logins (password "password"). Existing ones are kept."""
+    created = []
+    password_hash = get_password_hash(SEED_PASSWORD)
+    for email, user_type, first_name, last_name, phone in TEST_ACCOUNTS:
+        if await db.users.find_one({"email": email}, {"_id": 1}):
+            continue
+        user = User(
+            email=email, password_hash=password_hash, user_type=user_type,
+            first_name=first_name, last_name=last_name, phone=phone, is_verified=True,
+        )
+        await db.users.insert_one(user.dict())
+        created.append(email)
+        if user_type == UserType.PROFESSIONAL:
+            profile = BusinessProfile(
+                user_id=user.id,
+                business_name="Test Contracting Services",
+                service_categories=[ServiceCategory.CONTRACTOR],
+                description="Professional contracting services for residential and commercial projects.",
+                service_areas=["Toronto"],
+                years_experience=5,
+                city="Toronto",
+                province="ON",
+                postal_code="M5V 3A8",
+                geo_point=geo_point("M5V 3A8"),
+                hourly_rate_min=75,
+                hourly_rate_max=150,
+                is_verified=True,
+            ).dict()
+            await db.business_profiles.insert_one({**profile, **rank_fields(profile)})
+            await db.credit_balances.insert_one(CreditBalance(user_id=user.id, balance=10, total_purchased=10).dict())
+            await db.credit_transactions.insert_one(CreditTransaction(
+                user_id=user.id, transaction_type="purchase", amount=10, description="Test credits"
+            ).dict())
+    return created
+
+
+def parse_query(query: Optional[str]) -> Dict[str, Any]:
+    """A JSON (extended JSON allowed) filter from the command line."""
+    if not query:
+        return {}
+    parsed = json_util.loads(query)
+    if not isinstance(parsed, dict):
+        raise ValueError("Query must be a JSON object")
+    return parsed
+
+
+def emit(payload: Dict[str, Any], stream: TextIO = sys.stdout):
+    stream.write(json.dumps(payload, default=str) + "\n")
+    stream.flush()
@@ -1,14 +1,31 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Response
 from motor.motor_asyncio import AsyncIOMotorDatabase
+from pymongo import ReturnDocument
+from pymongo.errors import BulkWriteError, DuplicateKeyError
 from typing import List, Optional
-from datetime import datetime
+from datetime import datetime, timedelta
+import asyncio
 
 from models import (
-    User, BusinessProfile, CustomerRequest, Lead, LeadCreate, LeadResponse,
+    User, BusinessProfile, CustomerRequest, Lead, LeadCreate, LeadBulkCreate, LeadResponse, LeadDetailResponse,
     BusinessProfileResponse, CustomerRequestResponse, UserResponse,
     ServiceCategory, LeadStatus, LeadPriority, UserType
 )
 from auth import get_current_admin
+from services.archive import (
+    INCLUDE_ARCHIVED_DESCRIPTION, REQUESTS_ARCHIVE_COLLECTION, TERMINAL_REQUEST_STATUSES, find_with_archive
+)
+from services.auto_assignment import AUTO_ASSIGN_DELAY_SECONDS, assign_pending_requests, assignment_metrics, policy
+from services.dashboard import bump_dashboard_version, bump_dashboard_versions
+from services.geo import fsa_centroids, professionals_covering
+from services.fields import FIELDS_DESCRIPTION, field_projection, parse_fields, sparse_response
+from services.lead_listing import list_leads, parse_expand, sparse_lead_response
+from services.loaders import request_loaders
+from services.lead_previews import sync_lead_preview, remove_lead_preview, remove_lead_previews
+from services.pagination import NEXT_CURSOR_HEADER
+from services.ranking import refresh_rank_fields
+from services.response_cache import profile_cards
+from services.scheduler import job_states, recent_job_runs
 
 router = APIRouter(prefix="/admin", tags=["admin"])
 
@@ -20,6 +37,7 @@ def get_database() -> AsyncIOMotorDatabase:
 @router.get("/users", response_model=List[UserResponse])
 async def get_all_users(
     user_type: Optional[UserType] = Query(None, description="Filter by user type"),
+    fields: Optional[str] = Query(None, description=FIELDS_DESCRIPTION),
     current_admin: dict = Depends(get_current_admin)
 ):
     """Get all users with optional filtering."""
@@ -29,7 +47,10 @@ async def get_all_users(
     if user_type:
         query["user_type"] = user_type
     
-    users = await db.users.find(query).sort("created_at", -1).to_list(1000)
+    selected = parse_fields(fields, UserResponse)
+    users = await db.users.find(query, field_projection(selected)).sort("created_at", -1).to_list(1000)
+    if selected:
+        return sparse_response(users, UserResponse, selected)
     return [UserResponse(**user) for user in users]
 
 @router.put("/users/{user_id}/status")
@@ -53,16 +74,18 @@ async def update_user_status(
     
     update_data["updated_at"] = datetime.utcnow()
     
-    result = await db.users.update_one({"id": user_id}, {"$set": update_data})
+    user_doc = await db.users.find_one_and_update(
+        {"id": user_id},
+        {"$set": update_data},
+        return_document=ReturnDocument.AFTER
+    )
     
-    if result.matched_count == 0:
+    if not user_doc:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="User not found"
         )
     
-    # Return updated user
-    user_doc = await db.users.find_one({"id": user_id})
     return UserResponse(**user_doc)
 
 # Business Profile Management
@@ -70,6 +93,7 @@ async def update_user_status(
 async def get_all_business_profiles(
     service_category: Optional[ServiceCategory] = Query(None, description="Filter by service category"),
     is_verified: Optional[bool] = Query(None, description="Filter by verification status"),
+    fields: Optional[str] = Query(None, description=FIELDS_DESCRIPTION),
     current_admin: dict = Depends(get_current_admin)
 ):
     """Get all business profiles with optional filtering."""
@@ -81,7 +105,12 @@ async def get_all_business_profiles(
     if is_verified is not None:
         query["is_verified"] = is_verified
     
-    profiles = await db.business_profiles.find(query).sort("created_at", -1).to_list(1000)
+    selected = parse_fields(fields, BusinessProfileResponse)
+    profiles = await db.business_profiles.find(query, field_projection(selected)) \
+        .sort("created_at", -1) \
+        .to_list(1000)
+    if selected:
+        return sparse_response(profiles, BusinessProfileResponse, selected)
     return [BusinessProfileResponse(**profile) for profile in profiles]
 
 @router.put("/profiles/{profile_id}/verify")
@@ -99,19 +128,21 @@ async def verify_business_profile(
         "updated_at": datetime.utcnow()
     }
     
-    result = await db.business_profiles.update_one(
+    profile_doc = await db.business_profiles.find_one_and_update(
         {"id": profile_id},
-        {"$set": update_data}
+        {"$set": update_data},
+        return_document=ReturnDocument.AFTER
     )
     
-    if result.matched_count == 0:
+    if not profile_doc:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Business profile not found"
         )
     
-    # Return updated profile
-    profile_doc = await db.business_profiles.find_one({"id": profile_id})
+    profile_doc = await refresh_rank_fields(db, profile_doc)
+    profile_cards.invalidate(profile_doc["user_id"])
+    await bump_dashboard_version(db, profile_doc["user_id"])
     return BusinessProfileResponse(**profile_doc)
 
 # Customer Request Management
@@ -120,6 +151,8 @@ async def get_all_customer_requests(
     status: Optional[LeadStatus] = Query(None, description="Filter by status"),
     service_category: Optional[ServiceCategory] = Query(None, description="Filter by service category"),
     urgency: Optional[LeadPriority] = Query(None, description="Filter by urgency"),
+    fields: Optional[str] = Query(None, description=FIELDS_DESCRIPTION),
+    include_archived: bool = Query(False, description=INCLUDE_ARCHIVED_DESCRIPTION),
     current_admin: dict = Depends(get_current_admin)
 ):
     """Get all customer requests with optional filtering."""
@@ -133,9 +166,96 @@ async def get_all_customer_requests(
     if urgency:
         query["urgency"] = urgency
     
-    requests = await db.customer_requests.find(query).sort("created_at", -1).to_list(1000)
+    selected = parse_fields(fields, CustomerRequestResponse)
+    if include_archived:
+        requests = await find_with_archive(
+            db, "customer_requests", REQUESTS_ARCHIVE_COLLECTION, query,
+            field_projection(selected, ["created_at"]), [("created_at", -1)], 1000
+        )
+    else:
+        requests = await db.customer_requests.find(query, field_projection(selected)) \
+            .sort("created_at", -1) \
+            .to_list(1000)
+    if selected:
+        return sparse_response(requests, CustomerRequestResponse, selected)
     return [CustomerRequestResponse(**req) for req in requests]
 
+@router.get("/customer-requests/duplicates")
+async def get_duplicate_request_clusters(
+    days: int = Query(7, ge=1, le=90, description="Look back this many days"),
+    min_size: int = Query(2, ge=2, description="Minimum requests per cluster"),
+    limit: int = Query(50, ge=1, le=200, description="Maximum clusters to return"),
+    current_admin: dict = Depends(get_current_admin)
+):
+    """Report clusters of guest requests sharing the same fingerprint."""
+    db = get_database()
+    
+    since = datetime.utcnow() - timedelta(days=days)
+    pipeline = [
+        {"$match": {"fingerprint": {"$type": "string"}, "created_at": {"$gte": since}}},
+        {"$sort": {"created_at": 1}},
+        {"$group": {
+            "_id": "$fingerprint",
+            "count": {"$sum": 1},
+            "request_ids": {"$push": "$id"},
+            "statuses": {"$push": "$status"},
+            "customer_id": {"$first": "$customer_id"},
+            "service_category": {"$first": "$service_category"},
+            "city": {"$first": "$city"},
+            "title": {"$first": "$title"},
+            "first_seen": {"$first": "$created_at"},
+            "last_seen": {"$last": "$created_at"}
+        }},
+        {"$match": {"count": {"$gte": min_size}}},
+        {"$sort": {"count": -1, "last_seen": -1}},
+        {"$limit": limit}
+    ]
+    
+    clusters = await db.customer_requests.aggregate(pipeline).to_list(limit)
+    for cluster in clusters:
+        cluster["fingerprint"] = cluster.pop("_id")
+    
+    return {"clusters": clusters, "days": days}
+
+@router.get("/customer-requests/{request_id}/matches")
+async def get_matching_professionals(
+    request_id: str,
+    limit: int = Query(20, ge=1, le=100, description="Maximum professionals to return"),
+    current_admin: dict = Depends(get_current_admin)
+):
+    """Professionals in the request's category whose service radius covers it."""
+    db = get_database()
+    
+    request_doc = await db.customer_requests.find_one(
+        {"id": request_id},
+        {"_id": 0, "id": 1, "service_category": 1, "geo_point": 1}
+    )
+    if not request_doc:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Customer request not found"
+        )
+    if not request_doc.get("geo_point"):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=(
+                "Customer request has no geocoded postal code; the centroid table covers "
+                f"{fsa_centroids.covered()} postal areas, see services/geo.py"
+            )
+        )
+    
+    matches = await professionals_covering(
+        db,
+        request_doc["geo_point"],
+        service_category=request_doc["service_category"],
+        limit=limit,
+        projection={
+            "_id": 0, "id": 1, "user_id": 1, "business_name": 1, "city": 1,
+            "province": 1, "service_radius_km": 1, "rank_score": 1, "is_verified": 1
+        }
+    )
+    return {"request_id": request_id, "matches": matches}
+
 @router.post("/leads", response_model=LeadResponse)
 async def assign_lead_to_professional(
     lead_data: LeadCreate,
@@ -144,16 +264,18 @@ async def assign_lead_to_professional(
     """Manually assign a customer request to a professional."""
     db = get_database()
     
-    # Verify customer request exists
-    request_doc = await db.customer_requests.find_one({"id": lead_data.customer_request_id})
+    # Verify customer request exists and professional has a business profile
+    loaders = request_loaders(db)
+    request_doc, profile_doc = await asyncio.gather(
+        loaders.requests_by_id.load(lead_data.customer_request_id),
+        loaders.profiles_by_user_id.load(lead_data.professional_id)
+    )
     if not request_doc:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Customer request not found"
         )
     
-    # Verify professional exists and has a business profile
-    profile_doc = await db.business_profiles.find_one({"user_id": lead_data.professional_id})
     if not profile_doc:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -178,20 +300,148 @@ async def assign_lead_to_professional(
         professional_id=lead_data.professional_id
     )
     
-    await db.leads.insert_one(lead.dict())
+    try:
+        await db.leads.insert_one(lead.dict())
+    except DuplicateKeyError:
+        # Assigned concurrently since the check above
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Lead already assigned to this professional"
+        )
     
     # Update customer request status
     await db.customer_requests.update_one(
         {"id": lead_data.customer_request_id},
         {"$set": {"status": LeadStatus.ASSIGNED, "updated_at": datetime.utcnow()}}
     )
+    loaders.requests_by_id.clear(lead_data.customer_request_id)
+    await remove_lead_preview(db, lead_data.customer_request_id)
+    await bump_dashboard_version(db, lead_data.professional_id)
     
     return LeadResponse(**lead.dict())
 
-@router.get("/leads", response_model=List[LeadResponse])
+DUPLICATE_KEY_ERROR = 11000
+
+@router.post("/leads/bulk")
+async def bulk_assign_leads(
+    bulk_data: LeadBulkCreate,
+    current_admin: dict = Depends(get_current_admin)
+):
+    """Assign one or more customer requests to several professionals at once.
+    
+    Every (request, professional) pair gets a result: ``created``,
+    ``already_assigned``, ``request_not_found``, ``not_assignable`` (the
+    request is completed or cancelled), ``professional_not_found`` or
+    ``failed``. Requests that already have leads can be fanned out further.
+    """
+    db = get_database()
+    
+    request_ids = list(dict.fromkeys(bulk_data.customer_request_ids))
+    professional_ids = list(dict.fromkeys(bulk_data.professional_ids))
+    
+    found_requests, found_profiles = await asyncio.gather(
+        db.customer_requests.find({"id": {"$in": request_ids}}, {"_id": 0, "id": 1, "status": 1}).to_list(len(request_ids)),
+        db.business_profiles.find({"user_id": {"$in": professional_ids}}, {"_id": 0, "user_id": 1}).to_list(None)
+    )
+    known_requests = {doc["id"]: doc.get("status") for doc in found_requests}
+    known_professionals = {doc["user_id"] for doc in found_profiles}
+    
+    results = []
+    leads = []
+    for request_id in request_ids:
+        for professional_id in professional_ids:
+            result = {"customer_request_id": request_id, "professional_id": professional_id}
+            if request_id not in known_requests:
+                result["status"] = "request_not_found"
+            elif known_requests[request_id] in TERMINAL_REQUEST_STATUSES:
+                result["status"] = "not_assignable"
+            elif professional_id not in known_professionals:
+                result["status"] = "professional_not_found"
+            else:
+                lead = Lead(customer_request_id=request_id, professional_id=professional_id)
+                result["status"] = "created"
+                result["lead_id"] = lead.id
+                leads.append((lead, result))
+            results.append(result)
+    
+    # The unique (customer_request_id, professional_id) index rejects pairs
+    # that are already assigned; the rest of the batch still goes in
+    if leads:
+        try:
+            await db.leads.insert_many([lead.dict() for lead, _ in leads], ordered=False)
+        except BulkWriteError as e:
+            for error in e.details.get("writeErrors", []):
+                _, result = leads[error["index"]]
+                result.pop("lead_id", None)
+                result["status"] = "already_assigned" if error.get("code") == DUPLICATE_KEY_ERROR else "failed"
+    
+    created = [lead for lead, result in leads if result["status"] == "created"]
+    assigned_requests = list(dict.fromkeys(lead.customer_request_id for lead in created))
+    if assigned_requests:
+        await db.customer_requests.update_many(
+            {"id": {"$in": assigned_requests}, "status": LeadStatus.PENDING},
+            {"$set": {"status": LeadStatus.ASSIGNED, "updated_at": datetime.utcnow()}}
+        )
+        await remove_lead_previews(db, assigned_requests)
+        await bump_dashboard_versions(db, list(dict.fromkeys(lead.professional_id for lead in created)))
+    
+    return {"created": len(created), "results": results}
+
+@router.get("/auto-assignment")
+async def get_auto_assignment_status(current_admin: dict = Depends(get_current_admin)):
+    """Assignment worker policy, this worker's metrics and the current backlog.
+    
+    ``backlog`` counts pending requests past the board delay; ``oldest_pending_seconds``
+    is how long the oldest of them has been waiting beyond it.
+    """
+    db = get_database()
+    
+    cutoff = datetime.utcnow() - timedelta(seconds=AUTO_ASSIGN_DELAY_SECONDS)
+    due = {"status": LeadStatus.PENDING, "created_at": {"$lte": cutoff}}
+    backlog, oldest = await asyncio.gather(
+        db.customer_requests.count_documents(due),
+        db.customer_requests.find(due, {"_id": 0, "created_at": 1}).sort("created_at", 1).limit(1).to_list(1)
+    )
+    
+    return {
+        "policy": policy(),
+        "metrics": assignment_metrics.snapshot(),
+        "backlog": backlog,
+        "oldest_pending_seconds": round((cutoff - oldest[0]["created_at"]).total_seconds(), 1) if oldest else 0,
+    }
+
+@router.post("/auto-assignment/run")
+async def run_auto_assignment(current_admin: dict = Depends(get_current_admin)):
+    """Assign one batch of pending requests now."""
+    db = get_database()
+    return await assign_pending_requests(db)
+
+@router.get("/scheduler/jobs")
+async def get_scheduler_jobs(current_admin: dict = Depends(get_current_admin)):
+    """Scheduled jobs with lease state, last run and recent durations."""
+    db = get_database()
+    return {"jobs": await job_states(db)}
+
+@router.get("/scheduler/runs")
+async def get_scheduler_runs(
+    job: Optional[str] = Query(None, description="Filter by job name"),
+    limit: int = Query(50, ge=1, le=500, description="Number of runs to return"),
+    current_admin: dict = Depends(get_current_admin)
+):
+    """Most recent scheduled job runs, newest first."""
+    db = get_database()
+    return {"runs": await recent_job_runs(db, job, limit)}
+
+@router.get("/leads", response_model=List[LeadDetailResponse])
 async def get_all_leads(
+    response: Response,
     status: Optional[LeadStatus] = Query(None, description="Filter by status"),
     professional_id: Optional[str] = Query(None, description="Filter by professional"),
+    expand: Optional[str] = Query(None, description="Embed related documents: request, professional"),
+    cursor: Optional[str] = Query(None, description="Cursor from the previous page's X-Next-Cursor header"),
+    limit: int = Query(1000, ge=1, le=1000, description="Number of records to return"),
+    fields: Optional[str] = Query(None, description=FIELDS_DESCRIPTION),
+    include_archived: bool = Query(False, description=INCLUDE_ARCHIVED_DESCRIPTION),
     current_admin: dict = Depends(get_current_admin)
 ):
     """Get all leads with optional filtering."""
@@ -203,8 +453,13 @@ async def get_all_leads(
     if professional_id:
         query["professional_id"] = professional_id
     
-    leads = await db.leads.find(query).sort("created_at", -1).to_list(1000)
-    return [LeadResponse(**lead) for lead in leads]
+    selected = parse_fields(fields, LeadDetailResponse)
+    leads, next_cursor = await list_leads(db, query, limit, cursor, parse_expand(expand), selected, include_archived)
+    if next_cursor:
+        response.headers[NEXT_CURSOR_HEADER] = next_cursor
+    if selected:
+        return sparse_lead_response(leads, selected, response)
+    return [LeadDetailResponse(**lead) for lead in leads]
 
 @router.delete("/leads/{lead_id}")
 async def delete_lead(
@@ -214,25 +469,34 @@ async def delete_lead(
     """Delete a lead assignment."""
     db = get_database()
     
-    # Find and delete lead
-    lead_doc = await db.leads.find_one({"id": lead_id})
+    # Find and delete lead in one round trip
+    lead_doc = await db.leads.find_one_and_delete(
+        {"id": lead_id},
+        projection={"_id": 0, "customer_request_id": 1, "professional_id": 1}
+    )
     if not lead_doc:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Lead not found"
         )
-    
-    await db.leads.delete_one({"id": lead_id})
+    await bump_dashboard_version(db, lead_doc.get("professional_id"))
     
     # Check if there are any other leads for this customer request
-    remaining_leads = await db.leads.find({"customer_request_id": lead_doc["customer_request_id"]}).to_list(1)
+    remaining_lead = await db.leads.find_one(
+        {"customer_request_id": lead_doc["customer_request_id"]},
+        {"_id": 1}
+    )
     
-    if not remaining_leads:
+    if not remaining_lead:
         # No more leads, set customer request back to pending
-        await db.customer_requests.update_one(
+        request_doc = await db.customer_requests.find_one_and_update(
             {"id": lead_doc["customer_request_id"]},
-            {"$set": {"status": LeadStatus.PENDING, "updated_at": datetime.utcnow()}}
+            {"$set": {"status": LeadStatus.PENDING, "updated_at": datetime.utcnow()}},
+            projection={"_id": 0, "additional_details": 0},
+            return_document=ReturnDocument.AFTER
         )
+        if request_doc:
+            await sync_lead_preview(db, request_doc)
     
     return {"message": f"Lead {lead_id} deleted successfully"}
 
@@ -1,6 +1,7 @@
 from fastapi import APIRouter, Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordRequestForm
 from motor.motor_asyncio import AsyncIOMotorDatabase
+from pymongo import ReturnDocument
 from datetime import timedelta
 from typing import List
 import os
@@ -159,19 +160,18 @@ async def update_current_user(
             detail="No valid fields to update"
         )
     
-    # Update user
-    result = await db.users.update_one(
+    # Update user and return the new document in one round trip
+    user_doc = await db.users.find_one_and_update(
         {"email": current_user["email"]},
-        {"$set": update_data}
+        {"$set": update_data},
+        return_document=ReturnDocument.AFTER
     )
     
-    if result.matched_count == 0:
+    if not user_doc:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="User not found"
         )
     
-    # Return updated user
-    user_doc = await db.users.find_one({"email": current_user["email"]})
     user = User(**user_doc)
     return UserResponse(**user.dict())
\ No newline at end of file
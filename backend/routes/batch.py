@@ -0,0 +1,117 @@
+from fastapi import APIRouter, Request
+from typing import Any, Dict, List
+from urllib.parse import urlencode
+import asyncio
+import json
+import logging
+import os
+
+from models import BatchRequest, BatchSubRequest
+from auth import decode_user_token
+from services.request_cache import request_scope
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter(tags=["batch"])
+
+# Sub-requests of one batch running at the same time
+BATCH_CONCURRENCY = int(os.environ.get("BATCH_CONCURRENCY", "5"))
+
+# Only reads are batched; writes keep their own requests so retries and
+# idempotency keys stay per operation
+BATCH_METHODS = {"GET"}
+
+# Request headers passed through to every sub-request
+FORWARDED_HEADERS = {b"authorization", b"accept-language", b"user-agent", b"if-none-match"}
+
+@router.post("/batch")
+async def run_batch(batch: BatchRequest, request: Request):
+    """Run several API reads in one round trip.
+    
+    Sub-requests go through the app concurrently and share one auth
+    resolution and one request-scoped lookup cache. Responses come back in
+    request order, each with its own status.
+    """
+    headers = [(name, value) for name, value in request.scope["headers"] if name in FORWARDED_HEADERS]
+    semaphore = asyncio.Semaphore(BATCH_CONCURRENCY)
+    
+    async def run_one(sub_request: BatchSubRequest) -> Dict[str, Any]:
+        async with semaphore:
+            return await _dispatch(request, sub_request, headers)
+    
+    with request_scope():
+        # Resolve the caller once; sub-requests read it from the scope
+        authorization = request.headers.get("authorization", "")
+        if authorization.lower().startswith("bearer "):
+            decode_user_token(authorization[7:])
+        responses = await asyncio.gather(*(run_one(sub_request) for sub_request in batch.requests))
+    
+    return {"responses": responses}
+
+async def _dispatch(parent: Request, sub_request: BatchSubRequest, headers: List[tuple]) -> Dict[str, Any]:
+    """Call the ASGI app in-process for one sub-request."""
+    method = sub_request.method.upper()
+    path = sub_request.path.split("?", 1)[0]
+    if method not in BATCH_METHODS:
+        return _error(405, f"Method {method} is not allowed in a batch")
+    if not path.startswith("/api/") or path.rstrip("/") == "/api/batch":
+        return _error(400, "Path must be an /api/ endpoint other than /api/batch")
+    
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": parent.scope.get("http_version", "1.1"),
+        "method": method,
+        "scheme": parent.scope.get("scheme", "http"),
+        "server": parent.scope.get("server"),
+        "client": parent.scope.get("client"),
+        "root_path": parent.scope.get("root_path", ""),
+        "path": path,
+        "raw_path": path.encode(),
+        "query_string": urlencode(sub_request.query, doseq=True).encode(),
+        "headers": headers,
+    }
+    
+    response_done = asyncio.Event()
+    request_sent = False
+    
+    async def receive():
+        nonlocal request_sent
+        if not request_sent:
+            request_sent = True
+            return {"type": "http.request", "body": b"", "more_body": False}
+        await response_done.wait()
+        return {"type": "http.disconnect"}
+    
+    status_code = 500
+    response_headers: Dict[str, str] = {}
+    body = bytearray()
+    
+    async def send(message):
+        nonlocal status_code
+        if message["type"] == "http.response.start":
+            status_code = message["status"]
+            for name, value in message.get("headers", []):
+                response_headers[name.decode("latin-1")] = value.decode("latin-1")
+        elif message["type"] == "http.response.body":
+            body.extend(message.get("body", b""))
+            if not message.get("more_body"):
+                response_done.set()
+    
+    try:
+        await parent.app(scope, receive, send)
+    except Exception as e:
+        logger.error(f"Batch sub-request {method} {path} failed: {str(e)}")
+        return _error(500, "Internal server error")
+    finally:
+        response_done.set()
+    
+    response_headers.pop("content-length", None)
+    try:
+        payload = json.loads(body) if body else None
+    except ValueError:
+        payload = body.decode("utf-8", errors="replace")
+    return {"status": status_code, "headers": response_headers, "body": payload}
+
+def _error(status_code: int, detail: str) -> Dict[str, Any]:
+    return {"status": status_code, "headers": {}, "body": {"detail": detail}}
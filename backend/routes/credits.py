@@ -1,4 +1,4 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Request
+from fastapi import APIRouter, Depends, HTTPException, status, Request, Header, Query
 from motor.motor_asyncio import AsyncIOMotorDatabase
 from typing import List, Optional
 from datetime import datetime
@@ -10,6 +10,10 @@ from models import (
     PaymentStatus
 )
 from auth import get_current_professional
+from services.dashboard import bump_dashboard_version
+from services.fields import FIELDS_DESCRIPTION, field_projection, parse_fields, sparse_response
+from services.idempotency import run_idempotent
+from services.payments import OPEN_PAYMENT_STATUSES, add_credits_to_user, complete_payment, upsert_credit_balance
 
 # Import Stripe integration
 from emergentintegrations.payments.stripe.checkout import (
@@ -68,14 +72,10 @@ async def get_credit_balance(current_user: dict = Depends(get_current_profession
     """Get current professional's credit balance."""
     db = get_database()
     
-    # Get or create credit balance
-    balance_doc = await db.credit_balances.find_one({"user_id": current_user["user_id"]})
-    
-    if not balance_doc:
-        # Create new balance record
-        credit_balance = CreditBalance(user_id=current_user["user_id"])
-        await db.credit_balances.insert_one(credit_balance.dict())
-        return CreditBalanceResponse(**credit_balance.dict())
+    # Get or create credit balance; an upsert, so it can't race a concurrent grant into a second record
+    new_balance = CreditBalance(user_id=current_user["user_id"]).dict()
+    new_balance.pop("user_id")
+    balance_doc = await upsert_credit_balance(db, current_user["user_id"], {"$setOnInsert": new_balance})
     
     return CreditBalanceResponse(**balance_doc)
 
@@ -99,11 +99,28 @@ async def get_credit_packages():
 async def purchase_credits(
     request: Request,
     purchase_request: CreditPurchaseRequest,
-    current_user: dict = Depends(get_current_professional)
+    current_user: dict = Depends(get_current_professional),
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key")
 ):
     """Initiate credit purchase through Stripe checkout."""
     db = get_database()
     
+    # Retries with the same key replay the original checkout session
+    return await run_idempotent(
+        db,
+        idempotency_key,
+        scope=f"credits.purchase:{current_user['user_id']}",
+        payload=purchase_request,
+        handler=lambda: _create_checkout_session(db, request, purchase_request, current_user)
+    )
+
+async def _create_checkout_session(
+    db,
+    request: Request,
+    purchase_request: CreditPurchaseRequest,
+    current_user: dict
+) -> dict:
+    """Create a Stripe checkout session and record the pending payment."""
     # Validate package
     if purchase_request.package_type not in CREDIT_PACKAGES:
         raise HTTPException(
@@ -215,25 +232,20 @@ async def check_payment_status(
         new_status = PaymentStatus.COMPLETED if status_response.payment_status == "paid" else PaymentStatus.PENDING
         if status_response.status == "expired":
             new_status = PaymentStatus.EXPIRED
-            
-        await db.payment_transactions.update_one(
-            {"session_id": session_id},
-            {
-                "$set": {
-                    "payment_status": new_status,
-                    "updated_at": datetime.utcnow()
-                }
-            }
-        )
         
-        # If payment completed, add credits
-        if new_status == PaymentStatus.COMPLETED and payment_transaction.payment_status != PaymentStatus.COMPLETED:
-            await add_credits_to_user(
-                db, 
-                current_user["user_id"], 
-                payment_transaction.credits_purchased,
-                f"Credit purchase - {payment_transaction.package_type.value}",
-                session_id
+        # Completing also adds the credits, exactly once even if the webhook
+        # or the payment sweeper settles the same session concurrently
+        if new_status == PaymentStatus.COMPLETED:
+            await complete_payment(db, session_id)
+        else:
+            await db.payment_transactions.update_one(
+                {"session_id": session_id, "payment_status": {"$in": OPEN_PAYMENT_STATUSES}},
+                {
+                    "$set": {
+                        "payment_status": new_status,
+                        "updated_at": datetime.utcnow()
+                    }
+                }
             )
         
         return PaymentStatusResponse(
@@ -249,82 +261,40 @@ async def check_payment_status(
         )
 
 @router.get("/transactions")
-async def get_credit_transactions(current_user: dict = Depends(get_current_professional)):
+async def get_credit_transactions(
+    fields: Optional[str] = Query(None, description=FIELDS_DESCRIPTION),
+    current_user: dict = Depends(get_current_professional)
+):
     """Get professional's credit transaction history."""
     db = get_database()
     
+    selected = parse_fields(fields, CreditTransaction)
     transactions = await db.credit_transactions.find(
-        {"user_id": current_user["user_id"]}
+        {"user_id": current_user["user_id"]},
+        field_projection(selected)
     ).sort("created_at", -1).limit(50).to_list(50)
     
+    if selected:
+        return sparse_response(transactions, CreditTransaction, selected, key="transactions")
     return {"transactions": transactions}
 
-async def add_credits_to_user(db, user_id: str, credits: int, description: str, payment_session_id: str = None):
-    """Add credits to user's balance and create transaction record."""
-    # Get or create credit balance
-    balance_doc = await db.credit_balances.find_one({"user_id": user_id})
-    
-    if balance_doc:
-        # Update existing balance
-        new_balance = balance_doc["balance"] + credits
-        new_total_purchased = balance_doc["total_purchased"] + credits
-        
-        await db.credit_balances.update_one(
-            {"user_id": user_id},
-            {
-                "$set": {
-                    "balance": new_balance,
-                    "total_purchased": new_total_purchased,
-                    "last_updated": datetime.utcnow()
-                }
-            }
-        )
-    else:
-        # Create new balance
-        credit_balance = CreditBalance(
-            user_id=user_id,
-            balance=credits,
-            total_purchased=credits
-        )
-        await db.credit_balances.insert_one(credit_balance.dict())
-    
-    # Create credit transaction
-    credit_transaction = CreditTransaction(
-        user_id=user_id,
-        transaction_type="purchase",
-        amount=credits,
-        description=description,
-        payment_session_id=payment_session_id
-    )
-    
-    await db.credit_transactions.insert_one(credit_transaction.dict())
-
 async def use_credits_for_lead(db, user_id: str, lead_id: str, credits_used: int = 1):
     """Deduct credits when professional views a lead."""
-    # Check balance
-    balance_doc = await db.credit_balances.find_one({"user_id": user_id})
+    # Check and deduct in one update, so concurrent grants and spends never overwrite each other
+    result = await db.credit_balances.update_one(
+        {"user_id": user_id, "balance": {"$gte": credits_used}},
+        {
+            "$inc": {"balance": -credits_used, "total_used": credits_used},
+            "$set": {"last_updated": datetime.utcnow()}
+        }
+    )
     
-    if not balance_doc or balance_doc["balance"] < credits_used:
+    if result.modified_count == 0:
         raise HTTPException(
             status_code=status.HTTP_402_PAYMENT_REQUIRED,
             detail="Insufficient credits. Please purchase more credits to view leads."
         )
     
-    # Deduct credits
-    new_balance = balance_doc["balance"] - credits_used
-    new_total_used = balance_doc["total_used"] + credits_used
-    
-    await db.credit_balances.update_one(
-        {"user_id": user_id},
-        {
-            "$set": {
-                "balance": new_balance,
-                "total_used": new_total_used,
-                "last_updated": datetime.utcnow()
-            }
-        }
-    )
-    
     # Create credit transaction
     credit_transaction = CreditTransaction(
         user_id=user_id,
@@ -335,6 +305,7 @@ async def use_credits_for_lead(db, user_id: str, lead_id: str, credits_used: int
     )
     
     await db.credit_transactions.insert_one(credit_transaction.dict())
+    await bump_dashboard_version(db, user_id)
 
 async def get_current_balance(db, user_id: str) -> int:
     """Get user's current credit balance."""
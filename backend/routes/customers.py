@@ -1,17 +1,36 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Header, Request
 from motor.motor_asyncio import AsyncIOMotorDatabase
-from typing import List, Optional
-from datetime import datetime
+from pymongo import ReturnDocument
+from pydantic import TypeAdapter, ValidationError
+from pymongo.errors import BulkWriteError, DuplicateKeyError
+from typing import Any, Dict, List, Optional
+from datetime import datetime, timedelta
+import json
 
 from models import (
     CustomerRequest, CustomerRequestCreate, CustomerRequestResponse,
-    ServiceCategory, LeadStatus, LeadPriority, UserType
+    QuickRequestCreate, ServiceCategory, LeadStatus, LeadPriority, UserType
 )
-from auth import get_current_user
+from auth import get_current_user, get_current_partner
+from services.archive import INCLUDE_ARCHIVED_DESCRIPTION, REQUESTS_ARCHIVE_COLLECTION, find_with_archive
 from services.notifications import notification_service
+from services.idempotency import run_idempotent
+from services.fingerprints import DEDUPE_WINDOW_SECONDS, dedupe_key, guest_key, request_fingerprint
+from services.fields import FIELDS_DESCRIPTION, field_projection, parse_fields, sparse_response
+from services.geo import geo_point
+from services.lead_previews import sync_lead_preview, sync_lead_previews, remove_lead_preview
+from services.locations import location_suggestions
 
 router = APIRouter(prefix="/customers", tags=["customers"])
 
+# Upper bound on requests accepted by one bulk intake call
+BULK_INTAKE_MAX_ITEMS = 500
+
+DUPLICATE_KEY_ERROR = 11000
+
+# Built once; validating through a shared adapter avoids per-item schema setup
+_quick_request_adapter = TypeAdapter(QuickRequestCreate)
+
 def get_database() -> AsyncIOMotorDatabase:
     from server import db
     return db
@@ -27,15 +46,20 @@ async def create_customer_request(
     # Create customer request
     customer_request = CustomerRequest(
         customer_id=current_user["user_id"],
+        geo_point=geo_point(request_data.postal_code),
         **request_data.dict()
     )
     
     await db.customer_requests.insert_one(customer_request.dict())
+    await sync_lead_preview(db, customer_request.dict())
+    location_suggestions.record(customer_request.city, customer_request.province)
     return CustomerRequestResponse(**customer_request.dict())
 
 @router.get("/requests", response_model=List[CustomerRequestResponse])
 async def get_my_requests(
     status_filter: Optional[LeadStatus] = Query(None, description="Filter by status"),
+    fields: Optional[str] = Query(None, description=FIELDS_DESCRIPTION),
+    include_archived: bool = Query(False, description=INCLUDE_ARCHIVED_DESCRIPTION),
     current_user: dict = Depends(get_current_user)
 ):
     """Get all service requests for current customer."""
@@ -46,21 +70,33 @@ async def get_my_requests(
     if status_filter:
         query["status"] = status_filter
     
-    requests = await db.customer_requests.find(query).sort("created_at", -1).to_list(100)
+    selected = parse_fields(fields, CustomerRequestResponse)
+    if include_archived:
+        requests = await find_with_archive(
+            db, "customer_requests", REQUESTS_ARCHIVE_COLLECTION, query,
+            field_projection(selected, ["created_at"]), [("created_at", -1)], 100
+        )
+    else:
+        requests = await db.customer_requests.find(query, field_projection(selected)) \
+            .sort("created_at", -1) \
+            .to_list(100)
+    if selected:
+        return sparse_response(requests, CustomerRequestResponse, selected)
     return [CustomerRequestResponse(**req) for req in requests]
 
 @router.get("/requests/{request_id}", response_model=CustomerRequestResponse)
 async def get_customer_request(
     request_id: str,
+    include_archived: bool = Query(False, description=INCLUDE_ARCHIVED_DESCRIPTION),
     current_user: dict = Depends(get_current_user)
 ):
     """Get a specific customer request."""
     db = get_database()
     
-    request_doc = await db.customer_requests.find_one({
-        "id": request_id,
-        "customer_id": current_user["user_id"]
-    })
+    query = {"id": request_id, "customer_id": current_user["user_id"]}
+    request_doc = await db.customer_requests.find_one(query)
+    if not request_doc and include_archived:
+        request_doc = await db[REQUESTS_ARCHIVE_COLLECTION].find_one(query)
     
     if not request_doc:
         raise HTTPException(
@@ -79,38 +115,30 @@ async def update_customer_request(
     """Update a customer request (only if not yet assigned)."""
     db = get_database()
     
-    # Check if request exists and belongs to user
-    request_doc = await db.customer_requests.find_one({
-        "id": request_id,
-        "customer_id": current_user["user_id"]
-    })
-    
-    if not request_doc:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Customer request not found"
-        )
-    
-    # Check if request can be updated (not yet assigned to professionals)
-    if request_doc.get("status") != LeadStatus.PENDING:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Cannot update request that has been assigned to professionals"
-        )
-    
     # Remove fields that shouldn't be updated
-    restricted_fields = ["id", "customer_id", "created_at", "status"]
+    restricted_fields = ["id", "customer_id", "created_at", "status", "geo_point"]
     update_data = {k: v for k, v in request_update.items() if k not in restricted_fields}
     update_data["updated_at"] = datetime.utcnow()
+    if "postal_code" in update_data:
+        update_data["geo_point"] = geo_point(update_data["postal_code"])
     
-    # Update request
-    await db.customer_requests.update_one(
-        {"id": request_id},
-        {"$set": update_data}
+    # Ownership and pending status are enforced in the filter so the check
+    # and the write happen atomically
+    updated_request = await db.customer_requests.find_one_and_update(
+        {
+            "id": request_id,
+            "customer_id": current_user["user_id"],
+            "status": LeadStatus.PENDING
+        },
+        {"$set": update_data},
+        return_document=ReturnDocument.AFTER
     )
     
-    # Return updated request
-    updated_request = await db.customer_requests.find_one({"id": request_id})
+    if not updated_request:
+        await _raise_request_not_modifiable(db, request_id, current_user["user_id"], "update")
+    
+    await sync_lead_preview(db, updated_request)
+    location_suggestions.record(update_data.get("city"), update_data.get("province"))
     return CustomerRequestResponse(**updated_request)
 
 @router.delete("/requests/{request_id}")
@@ -121,11 +149,27 @@ async def delete_customer_request(
     """Delete a customer request (only if not yet assigned)."""
     db = get_database()
     
-    # Check if request exists and belongs to user
-    request_doc = await db.customer_requests.find_one({
-        "id": request_id,
-        "customer_id": current_user["user_id"]
-    })
+    deleted_request = await db.customer_requests.find_one_and_delete(
+        {
+            "id": request_id,
+            "customer_id": current_user["user_id"],
+            "status": LeadStatus.PENDING
+        },
+        projection={"_id": 0, "id": 1}
+    )
+    
+    if not deleted_request:
+        await _raise_request_not_modifiable(db, request_id, current_user["user_id"], "delete")
+    
+    await remove_lead_preview(db, request_id)
+    return {"message": "Customer request deleted successfully"}
+
+async def _raise_request_not_modifiable(db, request_id: str, customer_id: str, action: str):
+    """Probe why a conditional write matched nothing and raise the matching error."""
+    request_doc = await db.customer_requests.find_one(
+        {"id": request_id, "customer_id": customer_id},
+        {"_id": 0, "status": 1}
+    )
     
     if not request_doc:
         raise HTTPException(
@@ -133,23 +177,31 @@ async def delete_customer_request(
             detail="Customer request not found"
         )
     
-    # Check if request can be deleted (not yet assigned to professionals)
-    if request_doc.get("status") != LeadStatus.PENDING:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Cannot delete request that has been assigned to professionals"
-        )
-    
-    # Delete request
-    await db.customer_requests.delete_one({"id": request_id})
-    
-    return {"message": "Customer request deleted successfully"}
+    raise HTTPException(
+        status_code=status.HTTP_400_BAD_REQUEST,
+        detail=f"Cannot {action} request that has been assigned to professionals"
+    )
 
 @router.post("/requests/quick", response_model=CustomerRequestResponse)
-async def create_quick_request(request_data: dict):
+async def create_quick_request(
+    request_data: dict,
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key")
+):
     """Create a quick service request without authentication (for landing page)."""
     db = get_database()
     
+    # Anonymous callers share no auth identity, so keys are scoped per guest email
+    guest = guest_key(str(request_data.get("email", "")))
+    return await run_idempotent(
+        db,
+        idempotency_key,
+        scope=f"customers.quick_request:{guest}",
+        payload=request_data,
+        handler=lambda: _create_quick_request(db, request_data)
+    )
+
+async def _create_quick_request(db, request_data: dict) -> CustomerRequestResponse:
+    """Validate and store a guest request, then notify the admin."""
     # Validate required fields
     required_fields = ["email", "phone", "service_category", "title", "description", "city", "province"]
     for field in required_fields:
@@ -159,18 +211,65 @@ async def create_quick_request(request_data: dict):
                 detail=f"Missing required field: {field}"
             )
     
+    customer_request = _build_guest_request(request_data)
+    
+    recent = await _recent_duplicates(db, [customer_request])
+    if customer_request.fingerprint in recent:
+        return CustomerRequestResponse(**recent[customer_request.fingerprint])
+    
+    try:
+        await db.customer_requests.insert_one(customer_request.dict())
+    except DuplicateKeyError:
+        # Same guest submitted the same request within the dedupe window;
+        # merge into the original instead of creating another lead
+        existing_request = await db.customer_requests.find_one(
+            {"dedupe_key": customer_request.dedupe_key}
+        )
+        if existing_request:
+            return CustomerRequestResponse(**existing_request)
+        raise
+    
+    await sync_lead_preview(db, customer_request.dict())
+    location_suggestions.record(customer_request.city, customer_request.province)
+    
+    # Send admin notification for new customer request
+    try:
+        customer_data = {
+            'email': request_data["email"],
+            'phone': request_data["phone"],
+            'first_name': request_data.get("first_name", ""),
+            'last_name': request_data.get("last_name", "")
+        }
+        await notification_service.notify_new_customer_request(customer_request.dict(), customer_data)
+    except Exception as e:
+        # Log error but don't fail the request creation
+        print(f"Failed to send admin notification: {str(e)}")
+    
+    return CustomerRequestResponse(**customer_request.dict())
+
+def _build_guest_request(request_data: dict) -> CustomerRequest:
+    """Build a guest customer request from quick-request fields."""
     # Create a temporary customer ID using email
     customer_id = f"guest_{request_data['email']}"
+    fingerprint = request_fingerprint(
+        request_data["email"],
+        request_data["phone"],
+        request_data["service_category"],
+        request_data["city"],
+        request_data["title"]
+    )
+    created_at = datetime.utcnow()
     
-    # Create customer request
-    customer_request = CustomerRequest(
+    return CustomerRequest(
         customer_id=customer_id,
         service_category=request_data["service_category"],
         title=request_data["title"],
         description=request_data["description"],
-        location=request_data.get("location", f"{request_data['city']}, {request_data['province']}"),
+        location=request_data.get("location") or f"{request_data['city']}, {request_data['province']}",
         city=request_data["city"],
         province=request_data["province"],
+        postal_code=request_data.get("postal_code"),
+        geo_point=geo_point(request_data.get("postal_code")),
         budget_min=request_data.get("budget_min"),
         budget_max=request_data.get("budget_max"),
         timeline=request_data.get("timeline", "ASAP"),
@@ -180,22 +279,197 @@ async def create_quick_request(request_data: dict):
             "email": request_data["email"],
             "phone": request_data["phone"],
             "is_guest_request": True
-        }
+        },
+        fingerprint=fingerprint,
+        dedupe_key=dedupe_key(fingerprint, created_at),
+        created_at=created_at,
+        updated_at=created_at
     )
+
+async def _recent_duplicates(
+    db,
+    requests: List[CustomerRequest],
+    projection: Optional[Dict[str, Any]] = None
+) -> Dict[str, Dict[str, Any]]:
+    """Stored requests sharing a fingerprint with ``requests`` from within the dedupe window.
     
-    await db.customer_requests.insert_one(customer_request.dict())
+    The unique dedupe_key catches repeats inside one time bucket, including
+    concurrent ones; this catches the ones straddling a bucket boundary.
+    """
+    if not requests:
+        return {}
+    cutoff = min(request.created_at for request in requests) - timedelta(seconds=DEDUPE_WINDOW_SECONDS)
+    docs = await db.customer_requests.find(
+        {"fingerprint": {"$in": list({request.fingerprint for request in requests})}, "created_at": {"$gte": cutoff}},
+        projection or {"_id": 0}
+    ).sort("created_at", 1).to_list(None)
+    found: Dict[str, Dict[str, Any]] = {}
+    for doc in docs:
+        found.setdefault(doc["fingerprint"], doc)
+    return found
+
+class _InvalidLine:
+    """Placeholder for an NDJSON line that is not valid JSON."""
+    def __init__(self, error: str):
+        self.error = error
+
+def _parse_bulk_body(body: bytes, content_type: str) -> List[Any]:
+    """Split a bulk intake body into raw items (NDJSON lines or a JSON array)."""
+    if "ndjson" in content_type or "jsonlines" in content_type:
+        items = []
+        for line in body.decode("utf-8").splitlines():
+            if not line.strip():
+                continue
+            try:
+                items.append(json.loads(line))
+            except ValueError as e:
+                # Keep the slot so result indexes match input lines
+                items.append(_InvalidLine(str(e)))
+        return items
     
-    # Send admin notification for new customer request
     try:
-        customer_data = {
-            'email': request_data["email"],
-            'phone': request_data["phone"],
-            'first_name': request_data.get("first_name", ""),
-            'last_name': request_data.get("last_name", "")
-        }
-        await notification_service.notify_new_customer_request(customer_request.dict(), customer_data)
-    except Exception as e:
-        # Log error but don't fail the request creation
-        print(f"Failed to send admin notification: {str(e)}")
+        items = json.loads(body)
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Body must be a JSON array or NDJSON"
+        )
+    
+    if not isinstance(items, list):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Body must be a JSON array or NDJSON"
+        )
+    return items
+
+@router.post("/requests/bulk")
+async def bulk_create_requests(
+    request: Request,
+    current_user: dict = Depends(get_current_partner)
+):
+    """Ingest a batch of guest requests from a lead partner feed."""
+    db = get_database()
+    
+    items = _parse_bulk_body(await request.body(), request.headers.get("content-type", ""))
+    
+    if not items:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="No requests provided"
+        )
+    
+    if len(items) > BULK_INTAKE_MAX_ITEMS:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"Batch exceeds {BULK_INTAKE_MAX_ITEMS} requests"
+        )
+    
+    results: List[Dict[str, Any]] = [None] * len(items)
+    to_insert: List[CustomerRequest] = []
+    insert_positions: List[int] = []
+    contacts: List[QuickRequestCreate] = []
+    seen: Dict[str, int] = {}
+    
+    for index, item in enumerate(items):
+        if isinstance(item, _InvalidLine):
+            results[index] = {"index": index, "status": "invalid", "errors": [item.error]}
+            continue
+        
+        try:
+            data = _quick_request_adapter.validate_python(item)
+        except ValidationError as e:
+            results[index] = {
+                "index": index,
+                "status": "invalid",
+                "errors": [f"{'.'.join(str(loc) for loc in err['loc'])}: {err['msg']}" for err in e.errors()]
+            }
+            continue
+        
+        # Drop repeats of the same submission within this batch
+        customer_request = _build_guest_request(data.dict())
+        if customer_request.fingerprint in seen:
+            results[index] = {"index": index, "status": "duplicate", "duplicate_of": seen[customer_request.fingerprint]}
+            continue
+        seen[customer_request.fingerprint] = index
+        
+        to_insert.append(customer_request)
+        insert_positions.append(index)
+        contacts.append(data)
+    
+    # Drop repeats of submissions stored shortly before, across bucket boundaries too
+    recent = await _recent_duplicates(db, to_insert, {"_id": 0, "id": 1, "fingerprint": 1})
+    if recent:
+        kept = []
+        for index, customer_request, data in zip(insert_positions, to_insert, contacts):
+            if customer_request.fingerprint in recent:
+                results[index] = {
+                    "index": index,
+                    "status": "duplicate",
+                    "existing_id": recent[customer_request.fingerprint]["id"]
+                }
+            else:
+                kept.append((index, customer_request, data))
+        insert_positions = [index for index, _, _ in kept]
+        to_insert = [customer_request for _, customer_request, _ in kept]
+        contacts = [data for _, _, data in kept]
+    
+    failed_positions: Dict[int, str] = {}
+    duplicate_positions: List[int] = []
+    if to_insert:
+        try:
+            await db.customer_requests.insert_many(
+                [customer_request.dict() for customer_request in to_insert],
+                ordered=False
+            )
+        except BulkWriteError as e:
+            for write_error in e.details.get("writeErrors", []):
+                if write_error.get("code") == DUPLICATE_KEY_ERROR:
+                    duplicate_positions.append(write_error["index"])
+                else:
+                    failed_positions[write_error["index"]] = write_error.get("errmsg", "Write failed")
+    
+    # Resolve requests that were already stored by an earlier submission
+    existing_ids: Dict[str, str] = {}
+    if duplicate_positions:
+        existing = await db.customer_requests.find(
+            {"dedupe_key": {"$in": [to_insert[position].dedupe_key for position in duplicate_positions]}},
+            {"_id": 0, "id": 1, "dedupe_key": 1}
+        ).to_list(len(duplicate_positions))
+        existing_ids = {doc["dedupe_key"]: doc["id"] for doc in existing}
+    duplicate_set = set(duplicate_positions)
+    
+    created = []
+    for position, (index, customer_request) in enumerate(zip(insert_positions, to_insert)):
+        if position in failed_positions:
+            results[index] = {"index": index, "status": "failed", "errors": [failed_positions[position]]}
+            continue
+        if position in duplicate_set:
+            results[index] = {
+                "index": index,
+                "status": "duplicate",
+                "existing_id": existing_ids.get(customer_request.dedupe_key)
+            }
+            continue
+        results[index] = {"index": index, "status": "created", "id": customer_request.id}
+        created.append((customer_request, contacts[position]))
+    
+    if created:
+        await sync_lead_previews(db, [customer_request.dict() for customer_request, _ in created])
+        for customer_request, _ in created:
+            location_suggestions.record(customer_request.city, customer_request.province)
+    
+    # One admin notification for the whole batch
+    if created:
+        try:
+            await notification_service.notify_new_customer_requests_batch(
+                [customer_request.dict() for customer_request, _ in created],
+                source=current_user["email"]
+            )
+        except Exception as e:
+            print(f"Failed to send admin notification: {str(e)}")
     
-    return CustomerRequestResponse(**customer_request.dict())
\ No newline at end of file
+    summary = {"received": len(items), "created": len(created)}
+    for outcome in ("duplicate", "invalid", "failed"):
+        summary[outcome] = sum(1 for result in results if result["status"] == outcome)
+    summary["results"] = results
+    return summary
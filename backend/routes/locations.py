@@ -0,0 +1,19 @@
+from fastapi import APIRouter, Query
+from typing import Optional
+
+from services.locations import SUGGEST_TOP_K, location_suggestions
+
+router = APIRouter(prefix="/locations", tags=["locations"])
+
+@router.get("/suggest")
+async def suggest_locations(
+    q: str = Query(..., min_length=1, max_length=100, description="What the user has typed so far"),
+    type: Optional[str] = Query(None, pattern="^(city|province)$", description="Only cities or only provinces"),
+    limit: int = Query(10, ge=1, le=SUGGEST_TOP_K, description="Number of suggestions to return")
+):
+    """Autocomplete cities and provinces from this worker's in-memory trie.
+    
+    ``key`` in each suggestion is the canonical value the city and province
+    filters expect.
+    """
+    return {"suggestions": location_suggestions.suggest(q, limit, type)}
@@ -1,13 +1,32 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Header, Request, Response
 from motor.motor_asyncio import AsyncIOMotorDatabase
+from pymongo import ReturnDocument
 from typing import List, Optional
 from datetime import datetime
 
 from models import (
     BusinessProfile, BusinessProfileCreate, BusinessProfileResponse,
-    ServiceCategory, Lead, LeadResponse, LeadStatus, UserType
+    ServiceCategory, Lead, LeadResponse, LeadDetailResponse, LeadStatus, LeadStatusUpdate, UserType
 )
 from auth import get_current_user, get_current_professional
+from services.archive import INCLUDE_ARCHIVED_DESCRIPTION
+from services.dashboard import (
+    BALANCE_PROJECTION, PROFILE_PROJECTION, TRANSACTION_PROJECTION,
+    bump_dashboard_version, dashboard_etag, gather_sections
+)
+from services.geo import MAX_SERVICE_RADIUS_KM, geo_point, normalize_fsa, within_km
+from services.idempotency import run_idempotent
+from services.fields import FIELDS_DESCRIPTION, field_projection, parse_fields, sparse_response
+from services.lead_listing import list_leads, parse_expand, professional_leads_query, sparse_lead_response
+from services.loaders import request_loaders
+from services.lead_previews import LEAD_PREVIEWS_COLLECTION, PREVIEW_PROJECTION, remove_lead_preview
+from services.locations import location_key, location_prefix_filter, location_suggestions
+from services.pagination import NEXT_CURSOR_HEADER
+from services.pending_leads import pending_leads_index
+from services.unlocked_leads import unlocked_leads_cache, find_excluding_unlocked
+from services.ranking import rank_fields, refresh_rank_fields
+from services.response_cache import profile_cards
+from services.search import professional_search
 
 router = APIRouter(prefix="/professionals", tags=["professionals"])
 
@@ -36,8 +55,14 @@ async def create_business_profile(
         user_id=current_user["user_id"],
         **profile_data.dict()
     )
-    
-    await db.business_profiles.insert_one(profile.dict())
+    profile_doc = profile.dict()
+    profile_doc.update(rank_fields(profile_doc))
+    
+    await db.business_profiles.insert_one(profile_doc)
+    professional_search.upsert(profile_doc)
+    location_suggestions.record(profile_doc["city"], profile_doc["province"])
+    profile_cards.invalidate(current_user["user_id"])
+    await bump_dashboard_version(db, current_user["user_id"])
     return BusinessProfileResponse(**profile.dict())
 
 @router.get("/profile", response_model=BusinessProfileResponse)
@@ -54,6 +79,47 @@ async def get_my_profile(current_user: dict = Depends(get_current_professional))
     
     return BusinessProfileResponse(**profile_doc)
 
+@router.get("/dashboard")
+async def get_dashboard(
+    request: Request,
+    response: Response,
+    current_user: dict = Depends(get_current_professional)
+):
+    """Everything the professional dashboard renders, in one request.
+    
+    Sections that fail come back as null and are listed in
+    ``failed_sections``. Complete responses carry an ETag; a matching
+    If-None-Match returns 304 after a single version lookup.
+    """
+    db = get_database()
+    user_id = current_user["user_id"]
+    
+    etag = await dashboard_etag(db, user_id)
+    if etag and request.headers.get("if-none-match") == etag:
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag})
+    
+    sections, failed = await gather_sections({
+        "profile": db.business_profiles.find_one({"user_id": user_id}, PROFILE_PROJECTION),
+        "credits": _dashboard_credits(db, user_id),
+        "transactions": db.credit_transactions.find({"user_id": user_id}, TRANSACTION_PROJECTION)
+            .sort("created_at", -1).limit(10).to_list(10),
+        "leads": _dashboard_leads(db, user_id),
+        "lead_previews": _lead_board(db, user_id, limit=5),
+    })
+    
+    # Partial results are never cached
+    if etag and not failed:
+        response.headers["ETag"] = etag
+    return {**sections, "failed_sections": failed, "partial": bool(failed)}
+
+async def _dashboard_credits(db, user_id: str) -> dict:
+    balance_doc = await db.credit_balances.find_one({"user_id": user_id}, BALANCE_PROJECTION)
+    return balance_doc or {"balance": 0, "total_purchased": 0, "total_used": 0}
+
+async def _dashboard_leads(db, user_id: str) -> List[dict]:
+    leads, _ = await list_leads(db, professional_leads_query(user_id), 10, expand=["request"], redact_locked=True)
+    return leads
+
 @router.put("/profile", response_model=BusinessProfileResponse)
 async def update_my_profile(
     profile_update: dict,
@@ -63,23 +129,39 @@ async def update_my_profile(
     db = get_database()
     
     # Remove fields that shouldn't be updated
-    restricted_fields = ["id", "user_id", "created_at", "rating", "review_count"]
+    restricted_fields = [
+        "id", "user_id", "created_at", "rating", "review_count",
+        "avg_rating", "total_reviews", "is_featured", "is_verified",
+        "rank_score", "city_key", "province_key", "geo_point"
+    ]
     update_data = {k: v for k, v in profile_update.items() if k not in restricted_fields}
+    
+    if "service_radius_km" in update_data:
+        radius = update_data["service_radius_km"]
+        if not isinstance(radius, (int, float)) or not 0 < radius <= MAX_SERVICE_RADIUS_KM:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"service_radius_km must be between 0 and {MAX_SERVICE_RADIUS_KM:g}"
+            )
     update_data["updated_at"] = datetime.utcnow()
     
-    result = await db.business_profiles.update_one(
+    profile_doc = await db.business_profiles.find_one_and_update(
         {"user_id": current_user["user_id"]},
-        {"$set": update_data}
+        {"$set": update_data},
+        return_document=ReturnDocument.AFTER
     )
     
-    if result.matched_count == 0:
+    if not profile_doc:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Business profile not found"
         )
     
-    # Return updated profile
-    profile_doc = await db.business_profiles.find_one({"user_id": current_user["user_id"]})
+    profile_doc = await refresh_rank_fields(db, profile_doc)
+    professional_search.upsert(profile_doc)
+    location_suggestions.record(update_data.get("city"), update_data.get("province"))
+    profile_cards.invalidate(current_user["user_id"])
+    await bump_dashboard_version(db, current_user["user_id"])
     return BusinessProfileResponse(**profile_doc)
 
 @router.get("/leads/preview", response_model=List[dict])
@@ -89,60 +171,107 @@ async def get_available_leads_preview(
     province: Optional[str] = Query(None, description="Filter by province"),
     skip: int = Query(0, ge=0, description="Number of records to skip"),
     limit: int = Query(10, ge=1, le=50, description="Number of records to return"),
+    sort: str = Query("recent", pattern="^(recent|score)$", description="Order by newest or by lead quality score"),
     current_user: dict = Depends(get_current_professional)
 ):
     """Get preview of available customer requests (limited info, no credits required)."""
     db = get_database()
+    return await _lead_board(
+        db, current_user["user_id"], service_category, city, province, skip, limit, sort
+    )
+
+async def _lead_board(
+    db,
+    user_id: str,
+    service_category: Optional[ServiceCategory] = None,
+    city: Optional[str] = None,
+    province: Optional[str] = None,
+    skip: int = 0,
+    limit: int = 10,
+    sort: str = "recent"
+) -> List[dict]:
+    """Page of the lead board for one professional."""
+    # Leave out requests this professional has already unlocked
+    unlocked = await unlocked_leads_cache.get(db, user_id)
+    
+    # Served from this worker's in-memory pending set when it is loaded
+    rows = pending_leads_index.query(
+        service_category=service_category.value if service_category else None,
+        city_prefix=location_key(city),
+        province_prefix=location_key(province),
+        skip=skip,
+        limit=limit,
+        exclude=unlocked,
+        sort=sort
+    )
+    if rows is not None:
+        return [_preview_response(row) for row in rows]
     
-    # Build query for pending customer requests
-    query = {"status": "pending"}
+    # lead_previews only holds pending requests, with contact details stripped
+    query = {}
     
     if service_category:
         query["service_category"] = service_category
     
-    if city:
-        query["city"] = {"$regex": city, "$options": "i"}
-    
-    if province:
-        query["province"] = {"$regex": province, "$options": "i"}
-    
-    # Get customer requests
-    requests = await db.customer_requests.find(query) \
-        .sort("created_at", -1) \
-        .skip(skip) \
-        .limit(limit) \
-        .to_list(limit)
-    
-    # Return limited preview information (no contact details)
-    previews = []
-    for req in requests:
-        preview = {
-            "id": req["id"],
-            "title": req["title"],
-            "service_category": req["service_category"],
-            "description": req["description"][:150] + "..." if len(req["description"]) > 150 else req["description"],
-            "city": req["city"],
-            "province": req["province"],
-            "timeline": req["timeline"],
-            "urgency": req["urgency"],
-            "budget_range": f"${req.get('budget_min', 0):,.0f} - ${req.get('budget_max', 0):,.0f}" if req.get('budget_min') else "Budget not specified",
-            "created_at": req["created_at"],
-            "credits_required": 1  # Standard cost to view full details
-        }
-        previews.append(preview)
+    city_filter = location_prefix_filter(city)
+    if city_filter:
+        query["city_key"] = city_filter
+    
+    province_filter = location_prefix_filter(province)
+    if province_filter:
+        query["province_key"] = province_filter
+    
+    rows = await find_excluding_unlocked(
+        db[LEAD_PREVIEWS_COLLECTION],
+        query,
+        PREVIEW_PROJECTION,
+        ("score" if sort == "score" else "created_at", -1),
+        skip,
+        limit,
+        unlocked
+    )
     
-    return previews
+    return [_preview_response(row) for row in rows]
+
+def _preview_response(row: dict) -> dict:
+    """Shape a lead_previews row as the board payload."""
+    return {
+        "id": row["id"],
+        "title": row["title"],
+        "service_category": row["service_category"],
+        "description": row["snippet"],
+        "city": row["city"],
+        "province": row["province"],
+        "timeline": row["timeline"],
+        "urgency": row["urgency"],
+        "budget_range": row["budget_label"],
+        "created_at": row["created_at"],
+        "score": row.get("score"),
+        "credits_required": 1  # Standard cost to view full details
+    }
 
 @router.post("/leads/{request_id}/view")
 async def view_lead_details(
     request_id: str,
-    current_user: dict = Depends(get_current_professional)
+    current_user: dict = Depends(get_current_professional),
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key")
 ):
     """View full lead details (requires 1 credit)."""
     db = get_database()
     
+    return await run_idempotent(
+        db,
+        idempotency_key,
+        scope=f"professionals.view_lead:{current_user['user_id']}",
+        payload={"request_id": request_id},
+        handler=lambda: _unlock_lead(db, request_id, current_user)
+    )
+
+async def _unlock_lead(db, request_id: str, current_user: dict) -> dict:
+    """Charge a credit (once) and return the full customer request."""
     # Check if customer request exists
-    request_doc = await db.customer_requests.find_one({"id": request_id})
+    loaders = request_loaders(db)
+    request_doc = await loaders.requests_by_id.load(request_id)
     if not request_doc:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -197,12 +326,17 @@ async def view_lead_details(
             await db.leads.insert_one(lead.dict())
             lead_id = lead.id
         
+        unlocked_leads_cache.record_unlock(current_user["user_id"], request_id)
+        await bump_dashboard_version(db, current_user["user_id"])
+        
         # Update customer request status if this is the first assignment
         if request_doc["status"] == "pending":
             await db.customer_requests.update_one(
                 {"id": request_id},
                 {"$set": {"status": "assigned", "updated_at": datetime.utcnow()}}
             )
+            loaders.requests_by_id.clear(request_id)
+            await remove_lead_preview(db, request_id)
         
         return {
             "lead_details": request_doc,
@@ -220,28 +354,40 @@ async def view_lead_details(
             detail=f"Failed to process lead view: {str(e)}"
         )
 
-@router.get("/leads", response_model=List[LeadResponse])
+@router.get("/leads", response_model=List[LeadDetailResponse])
 async def get_my_leads(
+    response: Response,
     status_filter: Optional[LeadStatus] = Query(None, description="Filter leads by status"),
+    expand: Optional[str] = Query(None, description="Embed related documents: request, professional"),
+    cursor: Optional[str] = Query(None, description="Cursor from the previous page's X-Next-Cursor header"),
+    limit: int = Query(100, ge=1, le=100, description="Number of records to return"),
+    fields: Optional[str] = Query(None, description=FIELDS_DESCRIPTION),
+    include_archived: bool = Query(False, description=INCLUDE_ARCHIVED_DESCRIPTION),
     current_user: dict = Depends(get_current_professional)
 ):
     """Get all leads purchased/assigned to current professional."""
     db = get_database()
     
-    # Build query - only show leads that have been viewed (purchased)
-    query = {
-        "professional_id": current_user["user_id"],
-        "viewed_at": {"$ne": None}
-    }
+    # Leads this professional purchased, plus auto-assigned offers still to unlock
+    query = professional_leads_query(current_user["user_id"])
     
     if status_filter:
         query["status"] = status_filter
     
-    leads = await db.leads.find(query).sort("created_at", -1).to_list(100)
-    return [LeadResponse(**lead) for lead in leads]
+    selected = parse_fields(fields, LeadDetailResponse)
+    leads, next_cursor = await list_leads(
+        db, query, limit, cursor, parse_expand(expand), selected, include_archived, redact_locked=True
+    )
+    if next_cursor:
+        response.headers[NEXT_CURSOR_HEADER] = next_cursor
+    if selected:
+        return sparse_lead_response(leads, selected, response)
+    return [LeadDetailResponse(**lead) for lead in leads]
+
+@router.put("/leads/{lead_id}/status", response_model=LeadResponse)
 async def update_lead_status(
     lead_id: str,
-    status_update: dict,
+    status_update: LeadStatusUpdate,
     current_user: dict = Depends(get_current_professional)
 ):
     """Update lead status and add notes."""
@@ -255,29 +401,30 @@ async def update_lead_status(
             detail="Lead not found"
         )
     
-    # Prepare update data
-    update_data = {"updated_at": datetime.utcnow()}
-    
-    if "status" in status_update:
-        update_data["status"] = status_update["status"]
-        
-        # Update timestamps based on status
-        if status_update["status"] == LeadStatus.CONTACTED:
-            update_data["contacted_at"] = datetime.utcnow()
-        elif status_update["status"] == LeadStatus.COMPLETED:
-            update_data["completed_at"] = datetime.utcnow()
-    
-    if "notes" in status_update:
-        update_data["notes"] = status_update["notes"]
-    
-    if "quote_amount" in status_update:
-        update_data["quote_amount"] = status_update["quote_amount"]
+    # Auto-assigned offers have to be unlocked before they can be worked
+    if not lead.get("viewed_at"):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Unlock this lead before updating it"
+        )
     
-    if "is_won" in status_update:
-        update_data["is_won"] = status_update["is_won"]
+    # Prepare update data
+    update_data = status_update.dict(exclude_unset=True)
+    # status and notes are never null on a lead
+    for field in ("status", "notes"):
+        if field in update_data and update_data[field] is None:
+            del update_data[field]
+    
+    # Update timestamps based on status
+    if update_data.get("status") == LeadStatus.CONTACTED:
+        update_data["contacted_at"] = datetime.utcnow()
+    elif update_data.get("status") == LeadStatus.COMPLETED:
+        update_data["completed_at"] = datetime.utcnow()
+    update_data["updated_at"] = datetime.utcnow()
     
     # Update lead
     await db.leads.update_one({"id": lead_id}, {"$set": update_data})
+    await bump_dashboard_version(db, current_user["user_id"])
     
     # Return updated lead
     updated_lead = await db.leads.find_one({"id": lead_id})
@@ -289,43 +436,108 @@ async def search_professionals(
     city: Optional[str] = Query(None, description="Filter by city"),
     province: Optional[str] = Query(None, description="Filter by province"),
     is_verified: Optional[bool] = Query(None, description="Show only verified professionals"),
+    postal_code: Optional[str] = Query(
+        None, description="Only professionals near this postal code (major-city postal areas only for now)"
+    ),
+    radius_km: float = Query(25, gt=0, le=MAX_SERVICE_RADIUS_KM, description="Distance from postal_code in km"),
     skip: int = Query(0, ge=0, description="Number of records to skip"),
-    limit: int = Query(20, ge=1, le=100, description="Number of records to return")
+    limit: int = Query(20, ge=1, le=100, description="Number of records to return"),
+    fields: Optional[str] = Query(None, description=FIELDS_DESCRIPTION)
 ):
     """Search and filter professional business profiles."""
     db = get_database()
     
     # Build query
-    query = {"is_active": True}
+    query = {}
     
     if service_category:
-        query["service_categories"] = {"$in": [service_category]}
+        query["service_categories"] = service_category
     
-    if city:
-        query["city"] = {"$regex": city, "$options": "i"}  # Case-insensitive search
+    city_filter = location_prefix_filter(city)
+    if city_filter:
+        query["city_key"] = city_filter
     
-    if province:
-        query["province"] = {"$regex": province, "$options": "i"}
+    province_filter = location_prefix_filter(province)
+    if province_filter:
+        query["province_key"] = province_filter
     
     if is_verified is not None:
         query["is_verified"] = is_verified
     
-    # Execute query with pagination
-    profiles = await db.business_profiles.find(query) \
-        .sort("is_featured", -1) \
-        .sort("rating", -1) \
+    if postal_code:
+        point = geo_point(postal_code)
+        if point is None:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=(
+                    "Invalid postal code" if normalize_fsa(postal_code) is None
+                    else "Distance search doesn't cover this postal code area yet; filter by city instead"
+                )
+            )
+        query["geo_point"] = within_km(point, radius_km)
+    
+    # rank_score already folds in featured, rating, reviews and verification,
+    # so one indexed key orders the results
+    selected = parse_fields(fields, BusinessProfileResponse)
+    profiles = await db.business_profiles.find(query, field_projection(selected)) \
+        .sort("rank_score", -1) \
         .skip(skip) \
         .limit(limit) \
         .to_list(limit)
     
+    if selected:
+        return sparse_response(profiles, BusinessProfileResponse, selected)
     return [BusinessProfileResponse(**profile) for profile in profiles]
 
+# Upper bound on ids per /professionals/batch call
+BATCH_PROFILE_MAX_IDS = 100
+PROFILE_CARD_PROJECTION = {"_id": 0, **{field: 1 for field in BusinessProfileResponse.model_fields}}
+
+@router.get("/batch")
+async def get_professional_profiles(
+    ids: str = Query(..., description="Comma-separated professional (user) ids, at most 100")
+):
+    """Public profiles for many professionals in one request.
+    
+    Profiles come back in the order requested; ids without a profile are
+    listed in ``missing``.
+    """
+    db = get_database()
+    
+    requested = list(dict.fromkeys(part.strip() for part in ids.split(",") if part.strip()))
+    if not requested:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="No ids provided"
+        )
+    if len(requested) > BATCH_PROFILE_MAX_IDS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"At most {BATCH_PROFILE_MAX_IDS} ids per request"
+        )
+    
+    profiles = profile_cards.get_many(requested)
+    uncached = [professional_id for professional_id in requested if professional_id not in profiles]
+    if uncached:
+        docs = await db.business_profiles.find(
+            {"user_id": {"$in": uncached}}, PROFILE_CARD_PROJECTION
+        ).to_list(len(uncached))
+        for doc in docs:
+            card = BusinessProfileResponse(**doc)
+            profile_cards.set(doc["user_id"], card)
+            profiles[doc["user_id"]] = card
+    
+    return {
+        "profiles": [profiles[professional_id] for professional_id in requested if professional_id in profiles],
+        "missing": [professional_id for professional_id in requested if professional_id not in profiles],
+    }
+
 @router.get("/{professional_id}", response_model=BusinessProfileResponse)
 async def get_professional_profile(professional_id: str):
     """Get a specific professional's public profile."""
     db = get_database()
     
-    profile_doc = await db.business_profiles.find_one({"user_id": professional_id})
+    profile_doc = await request_loaders(db).profiles_by_user_id.load(professional_id)
     if not profile_doc:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -6,7 +6,12 @@ from pydantic import BaseModel, Field
 
 from auth import get_current_user
 from models import User
+from services.dashboard import bump_dashboard_version
+from services.loaders import request_loaders
+from services.ranking import refresh_rank_fields
+from services.response_cache import profile_cards
 from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import ReturnDocument
 import os
 
 router = APIRouter()
@@ -32,6 +37,10 @@ class Review(BaseModel):
     customer_name: str
     created_at: datetime
 
+def _profile_match(professional_id: str) -> dict:
+    """Match a business profile by Mongo _id, profile id or owner user id."""
+    return {"$or": [{"_id": professional_id}, {"id": professional_id}, {"user_id": professional_id}]}
+
 @router.post("/reviews", response_model=dict)
 async def create_review(
     review_data: ReviewCreate,
@@ -40,7 +49,7 @@ async def create_review(
     """Create a new review for a professional"""
     try:
         # Verify the professional exists
-        professional = await db.business_profiles.find_one({"_id": review_data.professional_id})
+        professional = await db.business_profiles.find_one(_profile_match(review_data.professional_id))
         if not professional:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
@@ -120,11 +129,11 @@ async def get_my_reviews(current_user: User = Depends(get_current_user)):
             "customer_id": current_user.id
         }).sort("created_at", -1).to_list(100)
         
-        # Fetch professional names for each review
-        for review in reviews:
-            professional_profile = await db.business_profiles.find_one({
-                "_id": review["professional_id"]
-            })
+        # Fetch professional names for all reviews in one query
+        profiles = await request_loaders(db).profiles_by_user_id.load_many(
+            [review["professional_id"] for review in reviews]
+        )
+        for review, professional_profile in zip(reviews, profiles):
             if professional_profile:
                 review["professional_name"] = professional_profile.get("business_name", "Unknown Professional")
             
@@ -156,16 +165,25 @@ async def update_professional_rating(professional_id: str):
             total_reviews = result[0]["total_reviews"]
             
             # Update professional profile with new rating
-            await db.business_profiles.update_one(
-                {"_id": professional_id},
+            profile_doc = await db.business_profiles.find_one_and_update(
+                _profile_match(professional_id),
                 {
                     "$set": {
                         "avg_rating": avg_rating,
                         "total_reviews": total_reviews,
+                        "rating": avg_rating,
+                        "review_count": total_reviews,
                         "updated_at": datetime.utcnow()
                     }
-                }
+                },
+                return_document=ReturnDocument.AFTER
             )
+            
+            # Rating feeds the search rank
+            if profile_doc:
+                await refresh_rank_fields(db, profile_doc)
+                profile_cards.invalidate(profile_doc.get("user_id"))
+                await bump_dashboard_version(db, profile_doc.get("user_id"))
         
     except Exception as e:
         print(f"Error updating professional rating: {str(e)}")
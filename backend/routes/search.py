@@ -0,0 +1,63 @@
+from fastapi import APIRouter, Depends, Query
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from typing import Optional
+
+from models import ServiceCategory
+from auth import get_current_professional
+from services.search import professional_search, request_search
+
+router = APIRouter(prefix="/search", tags=["search"])
+
+def get_database() -> AsyncIOMotorDatabase:
+    from server import db
+    return db
+
+# Fields returned for each hit; request hits never include contact details
+PROFILE_SEARCH_PROJECTION = {
+    "_id": 0, "id": 1, "user_id": 1, "business_name": 1, "service_categories": 1,
+    "description": 1, "certifications": 1, "city": 1, "province": 1,
+    "rating": 1, "review_count": 1, "is_featured": 1, "is_verified": 1
+}
+REQUEST_SEARCH_PROJECTION = {
+    "_id": 0, "id": 1, "title": 1, "service_category": 1, "description": 1,
+    "city": 1, "province": 1, "timeline": 1, "urgency": 1, "created_at": 1
+}
+
+@router.get("/professionals")
+async def search_professional_profiles(
+    q: str = Query(..., min_length=2, max_length=200, description="Keywords"),
+    service_category: Optional[ServiceCategory] = Query(None, description="Filter by service category"),
+    skip: int = Query(0, ge=0, description="Number of records to skip"),
+    limit: int = Query(20, ge=1, le=100, description="Number of records to return")
+):
+    """Keyword search over business names, descriptions and certifications."""
+    db = get_database()
+    
+    return await professional_search.search(
+        db,
+        q,
+        service_category.value if service_category else None,
+        skip,
+        limit,
+        PROFILE_SEARCH_PROJECTION
+    )
+
+@router.get("/requests")
+async def search_customer_requests(
+    q: str = Query(..., min_length=2, max_length=200, description="Keywords"),
+    service_category: Optional[ServiceCategory] = Query(None, description="Filter by service category"),
+    skip: int = Query(0, ge=0, description="Number of records to skip"),
+    limit: int = Query(20, ge=1, le=50, description="Number of records to return"),
+    current_user: dict = Depends(get_current_professional)
+):
+    """Keyword search over titles and descriptions of pending requests."""
+    db = get_database()
+    
+    return await request_search.search(
+        db,
+        q,
+        service_category.value if service_category else None,
+        skip,
+        limit,
+        REQUEST_SEARCH_PROJECTION
+    )
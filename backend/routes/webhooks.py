@@ -1,9 +1,8 @@
 from fastapi import APIRouter, Request, HTTPException
 from motor.motor_asyncio import AsyncIOMotorDatabase
 import os
-from datetime import datetime
 
-from models import PaymentStatus
+from services.payments import complete_payment
 from emergentintegrations.payments.stripe.checkout import StripeCheckout
 
 router = APIRouter(prefix="/webhook", tags=["webhooks"])
@@ -39,31 +38,8 @@ async def stripe_webhook(request: Request):
         if webhook_response.event_type in ["checkout.session.completed", "payment_intent.succeeded"]:
             session_id = webhook_response.session_id
             
-            # Find and update payment transaction
-            payment_doc = await db.payment_transactions.find_one({"session_id": session_id})
-            
-            if payment_doc:
-                # Update payment status
-                await db.payment_transactions.update_one(
-                    {"session_id": session_id},
-                    {
-                        "$set": {
-                            "payment_status": PaymentStatus.COMPLETED,
-                            "updated_at": datetime.utcnow()
-                        }
-                    }
-                )
-                
-                # Add credits to user if not already added
-                if payment_doc["payment_status"] != PaymentStatus.COMPLETED:
-                    from routes.credits import add_credits_to_user
-                    await add_credits_to_user(
-                        db,
-                        payment_doc["user_id"],
-                        payment_doc["credits_purchased"],
-                        f"Credit purchase - {payment_doc['package_type']}",
-                        session_id
-                    )
+            # Mark the payment completed and add credits if not already added
+            await complete_payment(db, session_id)
         
         return {"status": "success", "event_type": webhook_response.event_type}
         
@@ -1,10 +1,6 @@
 from fastapi import FastAPI
-from dotenv import load_dotenv
 from starlette.middleware.cors import CORSMiddleware
-from motor.motor_asyncio import AsyncIOMotorClient
-import os
 import logging
-from pathlib import Path
 
 # Import route modules
 from routes.auth import router as auth_router
@@ -14,15 +10,22 @@ from routes.admin import router as admin_router
 from routes.credits import router as credits_router
 from routes.webhooks import router as webhooks_router
 from routes.reviews import router as reviews_router
+from routes.search import router as search_router
+from routes.locations import router as locations_router
+from routes.batch import router as batch_router
+from database import connect
+from indexes import ensure_indexes
+from jobs import JOBS
+from services.lead_previews import ensure_lead_previews, refresh_pending_leads_index, resync_pending_leads_index
+from services.loaders import LOADER_STATS_HEADER, RequestScopeMiddleware
+from services.locations import location_suggestions, refresh_location_suggestions_periodically
+from services.scheduler import SCHEDULER_ENABLED, scheduler
+from services.search import rebuild_search_indexes, rebuild_search_indexes_periodically
+import asyncio
 
 
-ROOT_DIR = Path(__file__).parent
-load_dotenv(ROOT_DIR / '.env')
-
 # MongoDB connection
-mongo_url = os.environ['MONGO_URL']
-client = AsyncIOMotorClient(mongo_url)
-db = client[os.environ.get('DB_NAME', 'niwi_platform')]
+client, db = connect()
 
 # Create the main app
 app = FastAPI(
@@ -44,6 +47,9 @@ app.include_router(admin_router, prefix="/api")
 app.include_router(credits_router, prefix="/api")
 app.include_router(webhooks_router, prefix="/api")
 app.include_router(reviews_router, prefix="/api")
+app.include_router(search_router, prefix="/api")
+app.include_router(locations_router, prefix="/api")
+app.include_router(batch_router, prefix="/api")
 
 
 app.add_middleware(
@@ -52,7 +58,9 @@ app.add_middleware(
     allow_origins=["*"],
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", LOADER_STATS_HEADER],
 )
+app.add_middleware(RequestScopeMiddleware)
 
 # Configure logging
 logging.basicConfig(
@@ -61,6 +69,57 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Per-worker background tasks, cancelled on shutdown
+background_tasks = []
+
+@app.on_event("startup")
+async def create_db_indexes():
+    await ensure_indexes(db)
+    await ensure_lead_previews(db)
+
+@app.on_event("startup")
+async def load_pending_leads_index():
+    try:
+        await refresh_pending_leads_index(db, force=True)
+    except Exception as e:
+        # The lead board falls back to Mongo until the next resync
+        logger.error(f"Failed to load pending leads index: {str(e)}")
+    background_tasks.append(asyncio.create_task(resync_pending_leads_index(db)))
+
+@app.on_event("startup")
+async def load_search_indexes():
+    try:
+        await rebuild_search_indexes(db)
+    except Exception as e:
+        # Search falls back to Mongo text indexes until the next rebuild
+        logger.error(f"Failed to load search indexes: {str(e)}")
+    background_tasks.append(asyncio.create_task(rebuild_search_indexes_periodically(db)))
+
+@app.on_event("startup")
+async def load_location_suggestions():
+    try:
+        await location_suggestions.rebuild(db)
+    except Exception as e:
+        # Suggestions stay empty until the next rebuild
+        logger.error(f"Failed to load location suggestions: {str(e)}")
+    background_tasks.append(asyncio.create_task(refresh_location_suggestions_periodically(db)))
+
+@app.on_event("startup")
+async def start_scheduler():
+    # Jobs that must run once across all workers, see jobs.py
+    if not SCHEDULER_ENABLED:
+        return
+    for job in JOBS:
+        scheduler.register(job)
+    await scheduler.start(db)
+
+@app.on_event("shutdown")
+async def stop_background_tasks():
+    # Let running scheduled jobs finish before the client is closed
+    await scheduler.stop()
+    for task in background_tasks:
+        task.cancel()
+
 @app.on_event("shutdown")
 async def shutdown_db_client():
     client.close()
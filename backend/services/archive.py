@@ -0,0 +1,156 @@
+"""Archive tier for customer requests and their leads.
+
+Settled requests move to ``customer_requests_archive`` and their leads to
+``leads_archive``, keeping the hot collections (and their indexes) down to
+live work. Documents keep their shape, so readers asked for history
+(``include_archived=true``) query both collections and merge.
+"""
+import asyncio
+import logging
+import os
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from pymongo import ReplaceOne
+
+from models import LeadStatus
+from services.dashboard import bump_dashboard_versions
+from services.lead_previews import remove_lead_previews
+
+logger = logging.getLogger(__name__)
+
+# Completed and cancelled requests older than this are archived; 0 disables.
+# Active ones (assigned, in progress) stay with their live leads whatever
+# their age, and stale pending ones are cancelled first (REQUEST_AUTO_CANCEL_DAYS)
+ARCHIVE_AFTER_DAYS = float(os.environ.get("ARCHIVE_AFTER_DAYS", "0"))
+ARCHIVE_BATCH_SIZE = int(os.environ.get("ARCHIVE_BATCH_SIZE", "500"))
+# Pause between batches so archiving doesn't compete with live traffic
+ARCHIVE_BATCH_PAUSE_SECONDS = float(os.environ.get("ARCHIVE_BATCH_PAUSE_SECONDS", "0.5"))
+# Pending requests older than this are cancelled; 0 disables
+REQUEST_AUTO_CANCEL_DAYS = float(os.environ.get("REQUEST_AUTO_CANCEL_DAYS", "0"))
+
+REQUESTS_ARCHIVE_COLLECTION = "customer_requests_archive"
+LEADS_ARCHIVE_COLLECTION = "leads_archive"
+TERMINAL_REQUEST_STATUSES = [LeadStatus.COMPLETED, LeadStatus.CANCELLED]
+INCLUDE_ARCHIVED_DESCRIPTION = "Also return archived history"
+
+
+def archivable_query(now: datetime) -> Optional[Dict[str, Any]]:
+    """Requests due for the archive, or None when archiving is off."""
+    if ARCHIVE_AFTER_DAYS <= 0:
+        return None
+    return {
+        "status": {"$in": TERMINAL_REQUEST_STATUSES},
+        "created_at": {"$lt": now - timedelta(days=ARCHIVE_AFTER_DAYS)},
+    }
+
+
+async def _archive_batch(db, query: Dict[str, Any], requests: List[Dict[str, Any]]) -> Tuple[int, int]:
+    """Move one batch of requests and their leads. Returns (requests, leads) moved.
+
+    Copies are written first and are idempotent by _id, so an interrupted run
+    is finished by the next one. A request updated out of the archivable set
+    in the meantime stays hot and its archive copies are dropped again.
+    """
+    ids = [request["id"] for request in requests]
+    leads = await db.leads.find({"customer_request_id": {"$in": ids}}).to_list(None)
+    archived_at = datetime.utcnow()
+    await db[REQUESTS_ARCHIVE_COLLECTION].bulk_write(
+        [ReplaceOne({"_id": doc["_id"]}, {**doc, "archived_at": archived_at}, upsert=True) for doc in requests],
+        ordered=False
+    )
+    if leads:
+        await db[LEADS_ARCHIVE_COLLECTION].bulk_write(
+            [ReplaceOne({"_id": doc["_id"]}, {**doc, "archived_at": archived_at}, upsert=True) for doc in leads],
+            ordered=False
+        )
+
+    await db.customer_requests.delete_many({"id": {"$in": ids}, **query})
+    still_hot = {
+        doc["id"] for doc in await db.customer_requests.find({"id": {"$in": ids}}, {"_id": 0, "id": 1}).to_list(None)
+    }
+    if still_hot:
+        await db[REQUESTS_ARCHIVE_COLLECTION].delete_many({"id": {"$in": list(still_hot)}})
+        await db[LEADS_ARCHIVE_COLLECTION].delete_many({"customer_request_id": {"$in": list(still_hot)}})
+    moved = [request_id for request_id in ids if request_id not in still_hot]
+    moved_leads = [lead for lead in leads if lead["customer_request_id"] not in still_hot]
+    if moved:
+        await db.leads.delete_many({"customer_request_id": {"$in": moved}})
+        await bump_dashboard_versions(db, list(dict.fromkeys(lead["professional_id"] for lead in moved_leads)))
+    return len(moved), len(moved_leads)
+
+
+async def archive_requests(db, max_batches: Optional[int] = None) -> Dict[str, int]:
+    """Move archivable requests and their leads in throttled batches, oldest first."""
+    query = archivable_query(datetime.utcnow())
+    totals = {"requests": 0, "leads": 0}
+    if query is None:
+        return totals
+    batches = 0
+    while max_batches is None or batches < max_batches:
+        requests = await db.customer_requests.find(query).sort("created_at", 1) \
+            .limit(ARCHIVE_BATCH_SIZE).to_list(ARCHIVE_BATCH_SIZE)
+        if not requests:
+            break
+        moved_requests, moved_leads = await _archive_batch(db, query, requests)
+        totals["requests"] += moved_requests
+        totals["leads"] += moved_leads
+        batches += 1
+        if len(requests) < ARCHIVE_BATCH_SIZE:
+            break
+        await asyncio.sleep(ARCHIVE_BATCH_PAUSE_SECONDS)
+    return totals
+
+
+async def cancel_stale_requests(db) -> int:
+    """Cancel pending requests older than REQUEST_AUTO_CANCEL_DAYS and take them off the board."""
+    if REQUEST_AUTO_CANCEL_DAYS <= 0:
+        return 0
+    cutoff = datetime.utcnow() - timedelta(days=REQUEST_AUTO_CANCEL_DAYS)
+    cancelled = 0
+    while True:
+        stale = await db.customer_requests.find(
+            {"status": LeadStatus.PENDING, "created_at": {"$lt": cutoff}}, {"_id": 0, "id": 1}
+        ).sort("created_at", 1).limit(ARCHIVE_BATCH_SIZE).to_list(ARCHIVE_BATCH_SIZE)
+        if not stale:
+            return cancelled
+        ids = [doc["id"] for doc in stale]
+        now = datetime.utcnow()
+        result = await db.customer_requests.update_many(
+            {"id": {"$in": ids}, "status": LeadStatus.PENDING},
+            {"$set": {"status": LeadStatus.CANCELLED, "cancel_reason": "expired", "updated_at": now}}
+        )
+        await remove_lead_previews(db, ids)
+        cancelled += result.modified_count
+        if len(stale) < ARCHIVE_BATCH_SIZE:
+            return cancelled
+        await asyncio.sleep(ARCHIVE_BATCH_PAUSE_SECONDS)
+
+
+def _sort_value(doc: Dict[str, Any], sort: Sequence[Tuple[str, int]]):
+    return tuple(doc.get(field) for field, _ in sort)
+
+
+async def find_with_archive(
+    db,
+    collection: str,
+    archive: str,
+    query: Dict[str, Any],
+    projection: Optional[Dict[str, Any]],
+    sort: Sequence[Tuple[str, int]],
+    limit: int
+) -> List[Dict[str, Any]]:
+    """Query a hot collection and its archive, merged in ``sort`` order.
+
+    ``sort`` must use one direction for every key (as the listing sorts do).
+    A document present in both (mid-move) is returned once, from the hot side.
+    """
+    hot, archived = await asyncio.gather(
+        db[collection].find(query, projection).sort(list(sort)).limit(limit).to_list(limit),
+        db[archive].find(query, projection).sort(list(sort)).limit(limit).to_list(limit)
+    )
+    hot_ids = {doc.get("id") for doc in hot}
+    merged = hot + [doc for doc in archived if doc.get("id") not in hot_ids]
+    descending = sort[0][1] < 0
+    merged.sort(key=lambda doc: _sort_value(doc, sort), reverse=descending)
+    return merged[:limit]
@@ -0,0 +1,299 @@
+import asyncio
+import logging
+import os
+import time
+from collections import deque
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+
+from pymongo.errors import BulkWriteError
+
+from models import Lead, LeadStatus
+from services.dashboard import bump_dashboard_versions
+from services.geo import professionals_covering
+from services.lead_previews import remove_lead_previews
+from services.locations import location_key
+
+logger = logging.getLogger(__name__)
+
+# Runs as a scheduler job (see jobs.py), on one worker at a time
+AUTO_ASSIGN_ENABLED = os.environ.get("AUTO_ASSIGN_ENABLED", "false").lower() == "true"
+AUTO_ASSIGN_INTERVAL_SECONDS = float(os.environ.get("AUTO_ASSIGN_INTERVAL_SECONDS", "60"))
+AUTO_ASSIGN_BATCH_SIZE = int(os.environ.get("AUTO_ASSIGN_BATCH_SIZE", "200"))
+# Full batches are followed straight away by another, up to this many per run
+AUTO_ASSIGN_MAX_BATCHES_PER_RUN = int(os.environ.get("AUTO_ASSIGN_MAX_BATCHES_PER_RUN", "25"))
+# Requests stay on the lead board this long before the worker assigns them
+AUTO_ASSIGN_DELAY_SECONDS = float(os.environ.get("AUTO_ASSIGN_DELAY_SECONDS", "900"))
+# Requests with no eligible professional are retried after this long
+AUTO_ASSIGN_RETRY_SECONDS = float(os.environ.get("AUTO_ASSIGN_RETRY_SECONDS", "3600"))
+AUTO_ASSIGN_MAX_PROFESSIONALS = int(os.environ.get("AUTO_ASSIGN_MAX_PROFESSIONALS", "3"))
+AUTO_ASSIGN_CANDIDATE_POOL = int(os.environ.get("AUTO_ASSIGN_CANDIDATE_POOL", "50"))
+AUTO_ASSIGN_REQUIRE_VERIFIED = os.environ.get("AUTO_ASSIGN_REQUIRE_VERIFIED", "true").lower() == "true"
+# Credits a professional needs to be offered a lead (viewing it costs one)
+AUTO_ASSIGN_MIN_BALANCE = int(os.environ.get("AUTO_ASSIGN_MIN_BALANCE", "1"))
+# Professionals at this many leads within the load window are skipped
+AUTO_ASSIGN_MAX_RECENT_LEADS = int(os.environ.get("AUTO_ASSIGN_MAX_RECENT_LEADS", "20"))
+AUTO_ASSIGN_LOAD_WINDOW_HOURS = float(os.environ.get("AUTO_ASSIGN_LOAD_WINDOW_HOURS", "24"))
+# "rotation" prefers the least loaded, least recently assigned professional;
+# "rank" takes the best ranked ones that are under the load cap
+AUTO_ASSIGN_FAIRNESS = os.environ.get("AUTO_ASSIGN_FAIRNESS", "rotation").lower()
+
+DUPLICATE_KEY_ERROR = 11000
+CANDIDATE_PROJECTION = {"_id": 0, "user_id": 1, "rank_score": 1}
+REQUEST_PROJECTION = {
+    "_id": 0, "id": 1, "service_category": 1, "city": 1, "geo_point": 1, "created_at": 1,
+}
+THROUGHPUT_WINDOW_SECONDS = 3600
+
+
+def policy() -> Dict[str, Any]:
+    """Current assignment policy, as reported by the admin status endpoint."""
+    return {
+        "enabled": AUTO_ASSIGN_ENABLED,
+        "interval_seconds": AUTO_ASSIGN_INTERVAL_SECONDS,
+        "batch_size": AUTO_ASSIGN_BATCH_SIZE,
+        "max_batches_per_run": AUTO_ASSIGN_MAX_BATCHES_PER_RUN,
+        "delay_seconds": AUTO_ASSIGN_DELAY_SECONDS,
+        "retry_seconds": AUTO_ASSIGN_RETRY_SECONDS,
+        "max_professionals_per_lead": AUTO_ASSIGN_MAX_PROFESSIONALS,
+        "candidate_pool": AUTO_ASSIGN_CANDIDATE_POOL,
+        "require_verified": AUTO_ASSIGN_REQUIRE_VERIFIED,
+        "min_balance": AUTO_ASSIGN_MIN_BALANCE,
+        "max_recent_leads": AUTO_ASSIGN_MAX_RECENT_LEADS,
+        "load_window_hours": AUTO_ASSIGN_LOAD_WINDOW_HOURS,
+        "fairness": AUTO_ASSIGN_FAIRNESS,
+    }
+
+
+class AssignmentMetrics:
+    """Counters for the worker in this process: totals, last run and hourly throughput."""
+
+    def __init__(self):
+        self.runs = 0
+        self.failed_runs = 0
+        self.requests_processed = 0
+        self.requests_assigned = 0
+        self.requests_unmatched = 0
+        self.leads_created = 0
+        self.last_run_at: Optional[datetime] = None
+        self.last_run_ms: Optional[float] = None
+        self.lag_seconds = 0.0
+        self._recent: deque = deque()
+
+    def record_run(self, processed: int, assigned: int, unmatched: int, leads: int, elapsed: float, lag: float):
+        now = time.monotonic()
+        self.runs += 1
+        self.requests_processed += processed
+        self.requests_assigned += assigned
+        self.requests_unmatched += unmatched
+        self.leads_created += leads
+        self.last_run_at = datetime.utcnow()
+        self.last_run_ms = round(elapsed * 1000, 1)
+        self.lag_seconds = round(lag, 1)
+        if assigned or leads:
+            self._recent.append((now, assigned, leads))
+        self._trim(now)
+
+    def _trim(self, now: float):
+        while self._recent and now - self._recent[0][0] > THROUGHPUT_WINDOW_SECONDS:
+            self._recent.popleft()
+
+    def snapshot(self) -> Dict[str, Any]:
+        self._trim(time.monotonic())
+        return {
+            "runs": self.runs,
+            "failed_runs": self.failed_runs,
+            "requests_processed": self.requests_processed,
+            "requests_assigned": self.requests_assigned,
+            "requests_unmatched": self.requests_unmatched,
+            "leads_created": self.leads_created,
+            "last_run_at": self.last_run_at,
+            "last_run_ms": self.last_run_ms,
+            "lag_seconds": self.lag_seconds,
+            "requests_assigned_last_hour": sum(assigned for _, assigned, _ in self._recent),
+            "leads_created_last_hour": sum(leads for _, _, leads in self._recent),
+        }
+
+
+assignment_metrics = AssignmentMetrics()
+
+
+async def _pending_batch(db, now: datetime) -> List[Dict[str, Any]]:
+    """Oldest pending requests past the board delay that aren't waiting for a retry."""
+    return await db.customer_requests.find(
+        {
+            "status": LeadStatus.PENDING,
+            "created_at": {"$lte": now - timedelta(seconds=AUTO_ASSIGN_DELAY_SECONDS)},
+            "auto_assign_after": {"$not": {"$gt": now}},
+        },
+        REQUEST_PROJECTION
+    ).sort("created_at", 1).limit(AUTO_ASSIGN_BATCH_SIZE).to_list(AUTO_ASSIGN_BATCH_SIZE)
+
+
+async def _candidates(db, requests: List[Dict[str, Any]]) -> Dict[str, List[Dict[str, Any]]]:
+    """Candidate profiles per request id.
+
+    Geocoded requests use the 2dsphere index and each profile's service
+    radius; the rest share one category/city query per (category, city).
+    """
+    by_city: Dict[Tuple[str, str], List[str]] = {}
+    geo_requests = []
+    for request in requests:
+        if request.get("geo_point"):
+            geo_requests.append(request)
+        else:
+            by_city.setdefault((request["service_category"], location_key(request.get("city"))), []).append(request["id"])
+
+    verified = {"is_verified": True} if AUTO_ASSIGN_REQUIRE_VERIFIED else {}
+
+    async def city_candidates(category: str, city_key: str) -> List[Dict[str, Any]]:
+        if not city_key:
+            return []
+        return await db.business_profiles.find(
+            {"service_categories": category, "city_key": city_key, **verified},
+            CANDIDATE_PROJECTION
+        ).sort("rank_score", -1).limit(AUTO_ASSIGN_CANDIDATE_POOL).to_list(AUTO_ASSIGN_CANDIDATE_POOL)
+
+    async def geo_candidates(request: Dict[str, Any]) -> List[Dict[str, Any]]:
+        return await professionals_covering(
+            db, request["geo_point"], request["service_category"],
+            limit=AUTO_ASSIGN_CANDIDATE_POOL, projection=CANDIDATE_PROJECTION, filters=verified
+        )
+
+    city_keys = list(by_city)
+    results = await asyncio.gather(
+        *(city_candidates(category, city_key) for category, city_key in city_keys),
+        *(geo_candidates(request) for request in geo_requests)
+    )
+    candidates: Dict[str, List[Dict[str, Any]]] = {}
+    for key, found in zip(city_keys, results):
+        for request_id in by_city[key]:
+            candidates[request_id] = found
+    for request, found in zip(geo_requests, results[len(city_keys):]):
+        candidates[request["id"]] = found
+    return candidates
+
+
+async def _eligibility(db, professional_ids: List[str], now: datetime) -> Tuple[set, Dict[str, Dict[str, Any]]]:
+    """Professionals with enough credits, and each candidate's recent lead load."""
+    since = now - timedelta(hours=AUTO_ASSIGN_LOAD_WINDOW_HOURS)
+    balances, loads = await asyncio.gather(
+        db.credit_balances.find(
+            {"user_id": {"$in": professional_ids}, "balance": {"$gte": AUTO_ASSIGN_MIN_BALANCE}},
+            {"_id": 0, "user_id": 1}
+        ).to_list(None),
+        db.leads.aggregate([
+            {"$match": {"professional_id": {"$in": professional_ids}, "created_at": {"$gte": since}}},
+            {"$group": {"_id": "$professional_id", "count": {"$sum": 1}, "last": {"$max": "$created_at"}}},
+        ]).to_list(None)
+    )
+    funded = {doc["user_id"] for doc in balances}
+    load = {doc["_id"]: {"count": doc["count"], "last": doc["last"]} for doc in loads}
+    return funded, load
+
+
+def _choose(candidates: List[Dict[str, Any]], funded: set, load: Dict[str, Dict[str, Any]]) -> List[str]:
+    """Pick up to AUTO_ASSIGN_MAX_PROFESSIONALS and count them against ``load``."""
+    eligible = [
+        candidate for candidate in candidates
+        if candidate["user_id"] in funded
+        and load.get(candidate["user_id"], {}).get("count", 0) < AUTO_ASSIGN_MAX_RECENT_LEADS
+    ]
+    if AUTO_ASSIGN_FAIRNESS == "rotation":
+        eligible.sort(key=lambda candidate: (
+            load.get(candidate["user_id"], {}).get("count", 0),
+            load.get(candidate["user_id"], {}).get("last") or datetime.min,
+            -(candidate.get("rank_score") or 0),
+        ))
+    chosen = list(dict.fromkeys(candidate["user_id"] for candidate in eligible))[:AUTO_ASSIGN_MAX_PROFESSIONALS]
+    now = datetime.utcnow()
+    for professional_id in chosen:
+        entry = load.setdefault(professional_id, {"count": 0, "last": None})
+        entry["count"] += 1
+        entry["last"] = now
+    return chosen
+
+
+async def assign_pending_requests(db) -> Dict[str, int]:
+    """Assign one batch of pending requests. Returns counts for the batch."""
+    started = time.monotonic()
+    now = datetime.utcnow()
+    requests = await _pending_batch(db, now)
+    lag = 0.0
+    if requests:
+        oldest = requests[0]["created_at"]
+        lag = max((now - oldest).total_seconds() - AUTO_ASSIGN_DELAY_SECONDS, 0.0)
+
+    leads: List[Lead] = []
+    if requests:
+        candidates = await _candidates(db, requests)
+        professional_ids = list({
+            candidate["user_id"] for found in candidates.values() for candidate in found
+        })
+        funded, load = await _eligibility(db, professional_ids, now) if professional_ids else (set(), {})
+        for request in requests:
+            chosen = _choose(candidates.get(request["id"], []), funded, load)
+            leads.extend(
+                Lead(customer_request_id=request["id"], professional_id=professional_id, auto_assigned=True)
+                for professional_id in chosen
+            )
+
+    created = list(leads)
+    if leads:
+        # Pairs assigned meanwhile (by an admin or another worker) are rejected
+        # by the unique index; the rest of the batch still goes in
+        try:
+            await db.leads.insert_many([lead.dict() for lead in leads], ordered=False)
+        except BulkWriteError as e:
+            rejected = set()
+            for error in e.details.get("writeErrors", []):
+                rejected.add(error["index"])
+                if error.get("code") != DUPLICATE_KEY_ERROR:
+                    logger.error(f"Auto-assignment insert failed: {error.get('errmsg')}")
+            created = [lead for index, lead in enumerate(leads) if index not in rejected]
+
+    assigned_requests = list(dict.fromkeys(lead.customer_request_id for lead in created))
+    if assigned_requests:
+        await db.customer_requests.update_many(
+            {"id": {"$in": assigned_requests}, "status": LeadStatus.PENDING},
+            {"$set": {"status": LeadStatus.ASSIGNED, "updated_at": datetime.utcnow()}}
+        )
+        await remove_lead_previews(db, assigned_requests)
+        await bump_dashboard_versions(db, list(dict.fromkeys(lead.professional_id for lead in created)))
+    # No eligible professional, or every chosen pair was rejected on insert:
+    # either way nothing was created, so back off before trying again
+    assigned = set(assigned_requests)
+    unmatched = [request["id"] for request in requests if request["id"] not in assigned]
+    if unmatched:
+        await db.customer_requests.update_many(
+            {"id": {"$in": unmatched}},
+            {"$set": {"auto_assign_after": now + timedelta(seconds=AUTO_ASSIGN_RETRY_SECONDS)}}
+        )
+
+    assignment_metrics.record_run(
+        len(requests), len(assigned_requests), len(unmatched), len(created),
+        time.monotonic() - started, lag
+    )
+    return {
+        "processed": len(requests),
+        "assigned": len(assigned_requests),
+        "unmatched": len(unmatched),
+        "leads_created": len(created),
+    }
+
+
+async def assign_pending_backlog(db) -> Dict[str, int]:
+    """Scheduler job: assign batches until one comes back short or the run limit is hit."""
+    totals = {"batches": 0, "processed": 0, "assigned": 0, "unmatched": 0, "leads_created": 0}
+    for _ in range(AUTO_ASSIGN_MAX_BATCHES_PER_RUN):
+        try:
+            result = await assign_pending_requests(db)
+        except Exception:
+            assignment_metrics.failed_runs += 1
+            raise
+        totals["batches"] += 1
+        for key, value in result.items():
+            totals[key] += value
+        if result["processed"] < AUTO_ASSIGN_BATCH_SIZE:
+            break
+    return totals
@@ -0,0 +1,86 @@
+import asyncio
+import logging
+from typing import Any, Awaitable, Dict, List, Optional, Tuple
+
+from pymongo import UpdateOne
+
+from services.lead_previews import LEAD_PREVIEWS_COLLECTION, READ_MODEL_VERSIONS_COLLECTION
+
+logger = logging.getLogger(__name__)
+
+PROFILE_PROJECTION = {
+    "_id": 0, "id": 1, "business_name": 1, "service_categories": 1, "city": 1,
+    "province": 1, "rating": 1, "review_count": 1, "is_verified": 1,
+    "is_featured": 1, "service_radius_km": 1,
+}
+BALANCE_PROJECTION = {"_id": 0, "balance": 1, "total_purchased": 1, "total_used": 1}
+TRANSACTION_PROJECTION = {
+    "_id": 0, "id": 1, "transaction_type": 1, "amount": 1, "description": 1,
+    "lead_id": 1, "created_at": 1,
+}
+
+
+def _version_id(user_id: str) -> str:
+    return f"dashboard:{user_id}"
+
+
+async def bump_dashboard_version(db, user_id: Optional[str]):
+    """Mark a professional's dashboard as changed. Call after the write it reflects."""
+    if not user_id:
+        return
+    try:
+        await db[READ_MODEL_VERSIONS_COLLECTION].update_one(
+            {"_id": _version_id(user_id)},
+            {"$inc": {"version": 1}},
+            upsert=True
+        )
+    except Exception as e:
+        logger.error(f"Failed to bump dashboard version for {user_id}: {str(e)}")
+
+
+async def bump_dashboard_versions(db, user_ids: List[str]):
+    """bump_dashboard_version for several professionals in one write."""
+    if not user_ids:
+        return
+    try:
+        await db[READ_MODEL_VERSIONS_COLLECTION].bulk_write(
+            [UpdateOne({"_id": _version_id(user_id)}, {"$inc": {"version": 1}}, upsert=True) for user_id in user_ids],
+            ordered=False
+        )
+    except Exception as e:
+        logger.error(f"Failed to bump dashboard versions for {len(user_ids)} professionals: {str(e)}")
+
+
+async def dashboard_etag(db, user_id: str) -> Optional[str]:
+    """ETag built from the professional's own version and the lead board version.
+
+    Both live in read_model_versions, so checking it is a single query.
+    Returns None if the versions can't be read.
+    """
+    try:
+        docs = await db[READ_MODEL_VERSIONS_COLLECTION].find(
+            {"_id": {"$in": [_version_id(user_id), LEAD_PREVIEWS_COLLECTION]}}
+        ).to_list(2)
+    except Exception as e:
+        logger.error(f"Failed to read dashboard version for {user_id}: {str(e)}")
+        return None
+    versions = {doc["_id"]: doc.get("version", 0) for doc in docs}
+    return f'W/"{versions.get(_version_id(user_id), 0)}.{versions.get(LEAD_PREVIEWS_COLLECTION, 0)}"'
+
+
+async def gather_sections(sections: Dict[str, Awaitable[Any]]) -> Tuple[Dict[str, Any], List[str]]:
+    """Run dashboard sections concurrently; a failing section becomes None.
+
+    Returns the section data and the names of the sections that failed.
+    """
+    results = await asyncio.gather(*sections.values(), return_exceptions=True)
+    data: Dict[str, Any] = {}
+    failed: List[str] = []
+    for name, result in zip(sections, results):
+        if isinstance(result, BaseException):
+            logger.error(f"Dashboard section {name} failed: {str(result)}")
+            data[name] = None
+            failed.append(name)
+        else:
+            data[name] = result
+    return data, failed
@@ -0,0 +1,60 @@
+from functools import lru_cache
+from typing import Any, Dict, Iterable, List, Optional, Tuple, Type
+
+from fastapi import HTTPException, Response, status
+from pydantic import BaseModel, TypeAdapter, create_model
+
+FIELDS_DESCRIPTION = "Comma-separated response fields to return (default: all)"
+
+
+def parse_fields(fields: Optional[str], model: Type[BaseModel]) -> Optional[Tuple[str, ...]]:
+    """Validate a ``fields=`` parameter against a response model.
+
+    Returns None when no fieldset was requested. ``id`` is always included
+    when the model has one.
+    """
+    if not fields:
+        return None
+    names = [name.strip() for name in fields.split(",") if name.strip()]
+    unknown = [name for name in names if name not in model.model_fields]
+    if unknown:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Unknown field(s): {', '.join(unknown)}"
+        )
+    if "id" in model.model_fields and "id" not in names:
+        names.insert(0, "id")
+    return tuple(dict.fromkeys(names))
+
+
+def field_projection(selected: Optional[Iterable[str]], required: Iterable[str] = ()) -> Optional[Dict[str, Any]]:
+    """Mongo projection for a fieldset, or None for whole documents.
+
+    ``required`` adds fields the handler itself needs (sort keys, join keys);
+    they are dropped again when the response is serialized.
+    """
+    if selected is None:
+        return None
+    return {"_id": 0, **{name: 1 for name in (*selected, *required)}}
+
+
+@lru_cache(maxsize=256)
+def _partial_adapter(model: Type[BaseModel], selected: Tuple[str, ...]) -> TypeAdapter:
+    definitions = {
+        name: (Optional[model.model_fields[name].annotation], None)
+        for name in selected
+    }
+    partial = create_model(f"{model.__name__}Partial", **definitions)
+    return TypeAdapter(List[partial])
+
+
+def sparse_response(docs: List[Dict[str, Any]], model: Type[BaseModel], selected: Tuple[str, ...], key: Optional[str] = None) -> Response:
+    """Serialize documents through a model holding only the selected fields.
+
+    With ``key`` the list is wrapped as ``{key: [...]}``.
+    """
+    adapter = _partial_adapter(model, selected)
+    body = adapter.dump_json(adapter.validate_python(docs))
+    if key is not None:
+        body = b'{"' + key.encode() + b'":' + body + b"}"
+    return Response(content=body, media_type="application/json")
@@ -0,0 +1,44 @@
+import calendar
+import hashlib
+import os
+import re
+from datetime import datetime
+from typing import Optional
+
+# Identical guest submissions inside one window share a dedupe key
+DEDUPE_WINDOW_SECONDS = int(os.environ.get("REQUEST_DEDUPE_WINDOW_SECONDS", "600"))
+
+_WHITESPACE = re.compile(r"\s+")
+_NON_DIGITS = re.compile(r"\D")
+
+
+def _normalize_text(value: Optional[str]) -> str:
+    return _WHITESPACE.sub(" ", (value or "").strip().lower())
+
+
+def request_fingerprint(email: str, phone: str, service_category: str, city: str, title: str) -> str:
+    """Hash of the normalized contact, category, city and title of a guest request."""
+    parts = [
+        _normalize_text(email),
+        _NON_DIGITS.sub("", phone or ""),
+        _normalize_text(getattr(service_category, "value", service_category)),
+        _normalize_text(city),
+        _normalize_text(title),
+    ]
+    return hashlib.sha256("\x1f".join(parts).encode("utf-8")).hexdigest()
+
+
+def guest_key(email: Optional[str]) -> str:
+    """Short hash of a normalized email, telling anonymous clients apart."""
+    return hashlib.sha256(_normalize_text(email).encode("utf-8")).hexdigest()[:16]
+
+
+def dedupe_key(fingerprint: str, created_at: datetime) -> str:
+    """Fingerprint combined with its time bucket; unique-indexed on customer_requests.
+
+    Buckets are fixed, so two submissions either side of a boundary get
+    different keys; intake also looks for a stored fingerprint within the
+    window to catch those.
+    """
+    bucket = calendar.timegm(created_at.utctimetuple()) // DEDUPE_WINDOW_SECONDS
+    return f"{fingerprint}:{bucket}"
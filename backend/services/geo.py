@@ -0,0 +1,188 @@
+"""Offline geocoding of Canadian postal codes to forward sortation area (FSA) centroids.
+
+Centroids live in ``data/fsa_centroids.bin``: an 8-byte header (magic
+``FSA1`` and a little-endian uint32 slot count) followed by one
+``(float32 lat, float32 lng)`` pair per possible FSA. Each FSA maps directly
+to a slot, so a lookup is one offset computation and one read from the
+memory-mapped file. Slots without data hold NaN.
+
+Rebuild the file from a CSV with ``fsa,lat,lng`` columns (for example one
+derived from the Statistics Canada FSA boundary file):
+
+    python -m services.geo build path/to/fsa_centroids.csv
+
+Coverage is partial: the table in ``data/`` is a starter set of central
+FSAs in major cities (53 of the roughly 1,650 in use), so most postal
+codes don't geocode until the full table is built. Profiles and requests
+without a point are left out of radius searches. The postal-code search
+filter and the admin matches endpoint say so in their errors, and
+auto-assignment falls back to city matching for such requests.
+"""
+import csv
+import math
+import mmap
+import os
+import re
+import struct
+import sys
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+DATA_PATH = Path(__file__).resolve().parent.parent / "data" / "fsa_centroids.bin"
+MAGIC = b"FSA1"
+HEADER = struct.Struct("<4sI")
+SLOT = struct.Struct("<ff")
+
+# Letters Canada Post uses in each FSA position
+FIRST_LETTERS = "ABCEGHJKLMNPRSTVXY"
+THIRD_LETTERS = "ABCEGHJKLMNPRSTVWXYZ"
+SLOT_COUNT = len(FIRST_LETTERS) * 10 * len(THIRD_LETTERS)
+
+EARTH_RADIUS_KM = 6378.1
+DEFAULT_SERVICE_RADIUS_KM = 50.0
+MAX_SERVICE_RADIUS_KM = 500.0
+
+_FSA = re.compile(r"^\s*([A-Za-z])\s*(\d)\s*([A-Za-z])")
+
+
+def normalize_fsa(postal_code: Optional[str]) -> Optional[str]:
+    """First three characters of a postal code, upper-cased, or None if malformed."""
+    if not postal_code:
+        return None
+    match = _FSA.match(postal_code)
+    if not match:
+        return None
+    return "".join(match.groups()).upper()
+
+
+def fsa_slot(fsa: str) -> Optional[int]:
+    first = FIRST_LETTERS.find(fsa[0])
+    third = THIRD_LETTERS.find(fsa[2])
+    if first < 0 or third < 0 or not fsa[1].isdigit():
+        return None
+    return (first * 10 + int(fsa[1])) * len(THIRD_LETTERS) + third
+
+
+class FsaCentroids:
+    """Read-only, memory-mapped FSA centroid table."""
+
+    def __init__(self, path: Path = DATA_PATH):
+        self.path = path
+        self._map: Optional[mmap.mmap] = None
+        self._covered: Optional[int] = None
+
+    def _open(self) -> Optional[mmap.mmap]:
+        if self._map is None and self.path.exists():
+            with open(self.path, "rb") as handle:
+                self._map = mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ)
+            magic, slots = HEADER.unpack_from(self._map, 0)
+            if magic != MAGIC or slots != SLOT_COUNT:
+                self._map.close()
+                self._map = None
+                raise ValueError(f"{self.path} is not an FSA centroid table")
+        return self._map
+
+    def lookup(self, postal_code: Optional[str]) -> Optional[Tuple[float, float]]:
+        """(lat, lng) of the postal code's FSA, or None when unknown."""
+        fsa = normalize_fsa(postal_code)
+        slot = fsa_slot(fsa) if fsa else None
+        table = self._open() if slot is not None else None
+        if table is None:
+            return None
+        lat, lng = SLOT.unpack_from(table, HEADER.size + slot * SLOT.size)
+        if math.isnan(lat):
+            return None
+        return lat, lng
+
+    def covered(self) -> int:
+        """Number of FSAs the table has a centroid for."""
+        if self._covered is None:
+            table = self._open()
+            self._covered = 0 if table is None else sum(
+                1 for slot in range(SLOT_COUNT)
+                if not math.isnan(SLOT.unpack_from(table, HEADER.size + slot * SLOT.size)[0])
+            )
+        return self._covered
+
+
+fsa_centroids = FsaCentroids()
+
+
+def geo_point(postal_code: Optional[str]) -> Optional[Dict[str, Any]]:
+    """GeoJSON point for a postal code, for 2dsphere-indexed ``geo_point`` fields."""
+    centroid = fsa_centroids.lookup(postal_code)
+    if centroid is None:
+        return None
+    lat, lng = centroid
+    return {"type": "Point", "coordinates": [round(lng, 5), round(lat, 5)]}
+
+
+def within_km(point: Dict[str, Any], radius_km: float) -> Dict[str, Any]:
+    """``$geoWithin`` filter for documents inside ``radius_km`` of ``point``."""
+    return {"$geoWithin": {"$centerSphere": [point["coordinates"], radius_km / EARTH_RADIUS_KM]}}
+
+
+async def professionals_covering(
+    db,
+    point: Dict[str, Any],
+    service_category: Optional[str] = None,
+    limit: int = 20,
+    projection: Optional[Dict[str, Any]] = None,
+    filters: Optional[Dict[str, Any]] = None
+) -> List[Dict[str, Any]]:
+    """Profiles whose service radius reaches ``point``, nearest first.
+
+    Each result carries ``distance_km``. The search is bounded by
+    ``MAX_SERVICE_RADIUS_KM``; the per-profile radius is checked afterwards.
+    ``filters`` are extra conditions on the profile, applied inside $geoNear.
+    """
+    query: Dict[str, Any] = dict(filters or {})
+    if service_category:
+        query["service_categories"] = service_category
+    pipeline = [
+        {"$geoNear": {
+            "near": point,
+            "key": "geo_point",
+            "distanceField": "distance_m",
+            "maxDistance": MAX_SERVICE_RADIUS_KM * 1000,
+            "spherical": True,
+            "query": query,
+        }},
+        {"$match": {"$expr": {"$lte": [
+            "$distance_m",
+            {"$multiply": [{"$ifNull": ["$service_radius_km", DEFAULT_SERVICE_RADIUS_KM]}, 1000]},
+        ]}}},
+        {"$limit": limit},
+        {"$addFields": {"distance_km": {"$round": [{"$divide": ["$distance_m", 1000]}, 1]}}},
+        {"$project": {**(projection or {"_id": 0}), "distance_km": 1}},
+    ]
+    return await db.business_profiles.aggregate(pipeline).to_list(limit)
+
+
+def build_table(csv_path: str, output_path: Path = DATA_PATH) -> int:
+    """Write the binary table from a ``fsa,lat,lng`` CSV. Returns the number of FSAs stored."""
+    slots = [(math.nan, math.nan)] * SLOT_COUNT
+    stored = 0
+    with open(csv_path, newline="") as handle:
+        for row in csv.DictReader(line for line in handle if not line.startswith("#")):
+            fsa = normalize_fsa(row["fsa"])
+            slot = fsa_slot(fsa) if fsa else None
+            if slot is None:
+                continue
+            slots[slot] = (float(row["lat"]), float(row["lng"]))
+            stored += 1
+
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    with open(output_path, "wb") as handle:
+        handle.write(HEADER.pack(MAGIC, SLOT_COUNT))
+        for lat, lng in slots:
+            handle.write(SLOT.pack(lat, lng))
+    return stored
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 3 or sys.argv[1] != "build":
+        print("usage: python -m services.geo build <fsa_centroids.csv>")
+        sys.exit(2)
+    count = build_table(sys.argv[2])
+    print(f"Wrote {count} FSA centroids to {DATA_PATH} ({os.path.getsize(DATA_PATH)} bytes)")
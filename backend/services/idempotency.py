@@ -0,0 +1,165 @@
+import asyncio
+import hashlib
+import json
+import logging
+from datetime import datetime, timedelta
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from fastapi import HTTPException, status
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from pymongo.errors import DuplicateKeyError
+
+logger = logging.getLogger(__name__)
+
+IDEMPOTENCY_COLLECTION = "idempotency_keys"
+IDEMPOTENCY_KEY_TTL = timedelta(hours=24)
+# How long a duplicate waits for the first in-flight execution to finish
+IN_FLIGHT_WAIT_SECONDS = 30.0
+MAX_KEY_LENGTH = 255
+
+STATUS_IN_PROGRESS = "in_progress"
+STATUS_COMPLETED = "completed"
+
+# Executions started by this worker, so local duplicates wait on a future
+# instead of polling Mongo
+_in_flight: Dict[str, asyncio.Future] = {}
+
+
+def _request_hash(payload: Any) -> str:
+    """Stable hash of the request payload, used to reject key reuse with a different body."""
+    encoded = json.dumps(jsonable_encoder(payload), sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(encoded.encode("utf-8")).hexdigest()
+
+
+def _replay(record: Dict[str, Any]) -> JSONResponse:
+    """Build a response from a stored execution."""
+    return JSONResponse(
+        status_code=record["status_code"],
+        content=record["response_body"],
+        headers={"Idempotent-Replayed": "true"}
+    )
+
+
+async def _wait_for_completion(db, record_id: str) -> Dict[str, Any]:
+    """Wait until the first execution of a key stores its response."""
+    local = _in_flight.get(record_id)
+    if local is not None:
+        try:
+            await asyncio.wait_for(asyncio.shield(local), timeout=IN_FLIGHT_WAIT_SECONDS)
+        except (asyncio.TimeoutError, Exception):
+            pass
+
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + IN_FLIGHT_WAIT_SECONDS
+    delay = 0.05
+    while True:
+        record = await db[IDEMPOTENCY_COLLECTION].find_one(
+            {"_id": record_id},
+            {"status": 1, "status_code": 1, "response_body": 1, "request_hash": 1}
+        )
+        if record is None or record["status"] == STATUS_COMPLETED:
+            return record
+        if loop.time() >= deadline:
+            raise HTTPException(
+                status_code=status.HTTP_409_CONFLICT,
+                detail="A request with this Idempotency-Key is still being processed"
+            )
+        await asyncio.sleep(delay)
+        delay = min(delay * 2, 0.5)
+
+
+async def run_idempotent(
+    db,
+    idempotency_key: Optional[str],
+    scope: str,
+    payload: Any,
+    handler: Callable[[], Awaitable[Any]]
+):
+    """Execute ``handler`` at most once per ``(scope, idempotency_key)``.
+
+    Without a key the handler simply runs. With a key, the first call stores
+    the status code and body; retries replay the stored response and
+    concurrent duplicates wait for the in-flight execution to finish.
+    Server errors release the key so the client can retry.
+    """
+    if not idempotency_key:
+        return await handler()
+
+    if len(idempotency_key) > MAX_KEY_LENGTH:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Idempotency-Key is too long"
+        )
+
+    collection = db[IDEMPOTENCY_COLLECTION]
+    record_id = f"{scope}:{idempotency_key}"
+    request_hash = _request_hash(payload)
+
+    for _ in range(2):
+        try:
+            await collection.insert_one({
+                "_id": record_id,
+                "scope": scope,
+                "status": STATUS_IN_PROGRESS,
+                "request_hash": request_hash,
+                "created_at": datetime.utcnow()
+            })
+            break
+        except DuplicateKeyError:
+            record = await _wait_for_completion(db, record_id)
+            if record is None:
+                # The first execution failed and released the key; take it over
+                continue
+            if record["request_hash"] != request_hash:
+                raise HTTPException(
+                    status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+                    detail="Idempotency-Key was already used with a different request"
+                )
+            return _replay(record)
+    else:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="A request with this Idempotency-Key is still being processed"
+        )
+
+    done = asyncio.get_running_loop().create_future()
+    _in_flight[record_id] = done
+    try:
+        try:
+            result = await handler()
+        except HTTPException as e:
+            if e.status_code >= 500:
+                await collection.delete_one({"_id": record_id})
+            else:
+                await _store(collection, record_id, e.status_code, {"detail": e.detail})
+            raise
+        except Exception:
+            await collection.delete_one({"_id": record_id})
+            raise
+
+        await _store(collection, record_id, status.HTTP_200_OK, jsonable_encoder(result))
+        return result
+    finally:
+        _in_flight.pop(record_id, None)
+        if not done.done():
+            done.set_result(None)
+
+
+async def _store(collection, record_id: str, status_code: int, body: Any):
+    """Persist the outcome of an execution for later replay."""
+    try:
+        await collection.update_one(
+            {"_id": record_id},
+            {
+                "$set": {
+                    "status": STATUS_COMPLETED,
+                    "status_code": status_code,
+                    "response_body": body,
+                    "completed_at": datetime.utcnow()
+                }
+            }
+        )
+    except Exception as e:
+        # A lost record only means the next retry executes again
+        logger.warning(f"Failed to store idempotent response for {record_id}: {str(e)}")
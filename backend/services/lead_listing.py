@@ -0,0 +1,129 @@
+import asyncio
+from typing import Any, Dict, List, Optional, Tuple
+
+from fastapi import HTTPException, Response, status
+
+from models import LeadDetailResponse
+from services.archive import LEADS_ARCHIVE_COLLECTION, REQUESTS_ARCHIVE_COLLECTION, find_with_archive
+from services.fields import field_projection, sparse_response
+from services.loaders import request_loaders
+from services.pagination import cursor_filter, encode_cursor
+
+EXPANSIONS = ("request", "professional")
+
+REQUEST_EXPAND_PROJECTION = {
+    "_id": 0, "id": 1, "customer_id": 1, "service_category": 1, "title": 1,
+    "description": 1, "location": 1, "city": 1, "province": 1, "postal_code": 1,
+    "budget_min": 1, "budget_max": 1, "timeline": 1, "urgency": 1,
+    "contact_preference": 1, "additional_details": 1, "status": 1, "created_at": 1,
+}
+# Offered (auto-assigned) leads not yet unlocked embed only what the board shows
+LOCKED_REQUEST_PROJECTION = {
+    "_id": 0, "id": 1, "service_category": 1, "title": 1, "city": 1, "province": 1,
+    "budget_min": 1, "budget_max": 1, "timeline": 1, "urgency": 1, "status": 1, "created_at": 1,
+}
+PROFESSIONAL_EXPAND_PROJECTION = {
+    "_id": 0, "id": 1, "user_id": 1, "business_name": 1, "business_phone": 1,
+    "website": 1, "city": 1, "province": 1, "service_categories": 1,
+    "rating": 1, "review_count": 1, "is_verified": 1,
+}
+
+
+def parse_expand(expand: Optional[str]) -> List[str]:
+    """Validate a comma-separated ``expand`` parameter."""
+    if not expand:
+        return []
+    names = [name.strip() for name in expand.split(",") if name.strip()]
+    unknown = [name for name in names if name not in EXPANSIONS]
+    if unknown:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Unknown expand value(s): {', '.join(unknown)}. Allowed: {', '.join(EXPANSIONS)}"
+        )
+    return names
+
+
+def professional_leads_query(professional_id: str) -> Dict[str, Any]:
+    """A professional's leads: the ones they unlocked and the ones offered to them by auto-assignment."""
+    return {
+        "professional_id": professional_id,
+        "$or": [{"viewed_at": {"$ne": None}}, {"auto_assigned": True}],
+    }
+
+
+def _project(doc: Optional[Dict[str, Any]], projection: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    if doc is None:
+        return None
+    return {field: doc[field] for field, include in projection.items() if include and field in doc}
+
+
+async def list_leads(
+    db,
+    query: Dict[str, Any],
+    limit: int,
+    cursor: Optional[str] = None,
+    expand: Optional[List[str]] = None,
+    selected: Optional[Tuple[str, ...]] = None,
+    include_archived: bool = False,
+    redact_locked: bool = False
+) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+    """One page of leads, newest first, with related documents embedded.
+
+    Related documents come from the request's loaders, so each expansion is
+    one ``$in`` query for the whole page. With ``include_archived`` archived
+    leads are merged in and their requests looked up in the archive. With
+    ``redact_locked`` leads that were not unlocked embed only the board
+    fields of their request. Returns the rows and the cursor for the next page, if any.
+    """
+    expand = expand or []
+    # Cursor and join keys are always read, even outside a sparse fieldset
+    required = ["created_at", "customer_request_id", "professional_id", "viewed_at"]
+    projection = field_projection(
+        [name for name in selected if name not in EXPANSIONS] if selected else None,
+        required
+    ) or {"_id": 0}
+    
+    page_query = {"$and": [query, cursor_filter(cursor)]} if cursor else query
+    sort = [("created_at", -1), ("id", -1)]
+    if include_archived:
+        leads = await find_with_archive(db, "leads", LEADS_ARCHIVE_COLLECTION, page_query, projection, sort, limit + 1)
+    else:
+        leads = await db.leads.find(page_query, projection).sort(sort).limit(limit + 1).to_list(limit + 1)
+
+    next_cursor = encode_cursor(leads[limit - 1]) if len(leads) > limit else None
+    leads = leads[:limit]
+
+    loaders = request_loaders(db)
+    requests, professionals = await asyncio.gather(
+        loaders.requests_by_id.load_many(
+            [lead["customer_request_id"] for lead in leads] if "request" in expand else []
+        ),
+        loaders.profiles_by_user_id.load_many(
+            [lead["professional_id"] for lead in leads] if "professional" in expand else []
+        )
+    )
+    if include_archived and "request" in expand:
+        missing = [lead["customer_request_id"] for lead, request in zip(leads, requests) if request is None]
+        if missing:
+            archived = await db[REQUESTS_ARCHIVE_COLLECTION].find(
+                {"id": {"$in": missing}}, REQUEST_EXPAND_PROJECTION
+            ).to_list(None)
+            by_id = {doc["id"]: doc for doc in archived}
+            requests = [request or by_id.get(lead["customer_request_id"]) for lead, request in zip(leads, requests)]
+    for position, lead in enumerate(leads):
+        if "request" in expand:
+            locked = redact_locked and not lead.get("viewed_at")
+            projection = LOCKED_REQUEST_PROJECTION if locked else REQUEST_EXPAND_PROJECTION
+            lead["request"] = _project(requests[position], projection)
+        if "professional" in expand:
+            lead["professional"] = _project(professionals[position], PROFESSIONAL_EXPAND_PROJECTION)
+    return leads, next_cursor
+
+
+def sparse_lead_response(leads: List[Dict[str, Any]], selected: Tuple[str, ...], response: Response) -> Response:
+    """Sparse fieldset response for a lead page, keeping headers already set (e.g. the cursor)."""
+    sparse = sparse_response(leads, LeadDetailResponse, selected)
+    for name, value in response.headers.items():
+        if name != "content-length":
+            sparse.headers[name] = value
+    return sparse
@@ -0,0 +1,229 @@
+import asyncio
+import logging
+from typing import Any, Dict, Iterable, List, Optional
+
+from pymongo import ReplaceOne, ReturnDocument
+
+from services.locations import location_key
+from services.lead_scoring import score_preview, rescore_lead_previews, epoch_seconds
+from services.search import request_search
+from services.pending_leads import pending_leads_index, PENDING_LEADS_CACHE_ENABLED, PENDING_LEADS_RESYNC_SECONDS
+
+logger = logging.getLogger(__name__)
+
+LEAD_PREVIEWS_COLLECTION = "lead_previews"
+# Holds a counter bumped on every lead_previews write, so workers can tell
+# whether their in-memory copy is current
+READ_MODEL_VERSIONS_COLLECTION = "read_model_versions"
+SNIPPET_LENGTH = 150
+
+# Every field the board returns; the board indexes include all of them so
+# the board query is answered from the index alone
+PREVIEW_FIELDS = [
+    "id", "title", "service_category", "snippet", "city", "province",
+    "city_key", "province_key", "timeline", "urgency", "budget_label",
+    "created_at", "score",
+]
+PREVIEW_PROJECTION = {"_id": 0, **{field: 1 for field in PREVIEW_FIELDS}}
+
+
+def _enum_value(value: Any) -> Any:
+    return getattr(value, "value", value)
+
+
+def budget_label(budget_min: Optional[float], budget_max: Optional[float]) -> str:
+    """Human readable budget range shown on the lead board."""
+    if not budget_min:
+        return "Budget not specified"
+    return f"${budget_min:,.0f} - ${budget_max or 0:,.0f}"
+
+
+def description_snippet(description: str) -> str:
+    if len(description) > SNIPPET_LENGTH:
+        return description[:SNIPPET_LENGTH] + "..."
+    return description
+
+
+def build_lead_preview(request_doc: Dict[str, Any]) -> Dict[str, Any]:
+    """Preview document for a pending customer request (no contact details)."""
+    preview = {
+        "id": request_doc["id"],
+        "title": request_doc["title"],
+        "service_category": _enum_value(request_doc["service_category"]),
+        "snippet": description_snippet(request_doc["description"]),
+        "city": request_doc["city"],
+        "province": request_doc["province"],
+        "city_key": location_key(request_doc["city"]),
+        "province_key": location_key(request_doc["province"]),
+        "timeline": request_doc["timeline"],
+        "urgency": _enum_value(request_doc["urgency"]),
+        "budget_label": budget_label(request_doc.get("budget_min"), request_doc.get("budget_max")),
+        "created_at": request_doc["created_at"],
+        # Scoring inputs, not returned by the board
+        "budget_value": max(request_doc.get("budget_min") or 0, request_doc.get("budget_max") or 0),
+        "description_length": len(request_doc["description"]),
+        "created_ts": epoch_seconds(request_doc["created_at"]),
+    }
+    preview["score"] = score_preview(preview)
+    return preview
+
+
+def _is_pending(request_doc: Dict[str, Any]) -> bool:
+    return _enum_value(request_doc.get("status")) == "pending"
+
+
+async def _bump_version(db) -> Optional[int]:
+    try:
+        doc = await db[READ_MODEL_VERSIONS_COLLECTION].find_one_and_update(
+            {"_id": LEAD_PREVIEWS_COLLECTION},
+            {"$inc": {"version": 1}},
+            upsert=True,
+            return_document=ReturnDocument.AFTER
+        )
+        return doc["version"]
+    except Exception as e:
+        logger.error(f"Failed to bump lead previews version: {str(e)}")
+        return None
+
+
+async def sync_lead_preview(db, request_doc: Dict[str, Any]):
+    """Upsert the preview of a pending request, or drop it once the request leaves pending."""
+    try:
+        if _is_pending(request_doc):
+            preview = build_lead_preview(request_doc)
+            await db[LEAD_PREVIEWS_COLLECTION].replace_one(
+                {"id": request_doc["id"]},
+                preview,
+                upsert=True
+            )
+            pending_leads_index.upsert(preview, await _bump_version(db))
+            request_search.upsert(request_doc)
+        else:
+            await db[LEAD_PREVIEWS_COLLECTION].delete_one({"id": request_doc["id"]})
+            pending_leads_index.remove(request_doc["id"], await _bump_version(db))
+            request_search.remove(request_doc["id"])
+    except Exception as e:
+        # The read model is repairable with rebuild_lead_previews; never fail the write path
+        logger.error(f"Failed to sync lead preview {request_doc.get('id')}: {str(e)}")
+
+
+async def sync_lead_previews(db, request_docs: Iterable[Dict[str, Any]]):
+    """Bulk variant of sync_lead_preview for batch writes."""
+    pending_docs = [doc for doc in request_docs if _is_pending(doc)]
+    previews = [build_lead_preview(doc) for doc in pending_docs]
+    if not previews:
+        return
+    try:
+        await db[LEAD_PREVIEWS_COLLECTION].bulk_write(
+            [ReplaceOne({"id": preview["id"]}, preview, upsert=True) for preview in previews],
+            ordered=False
+        )
+    except Exception as e:
+        logger.error(f"Failed to sync {len(previews)} lead previews: {str(e)}")
+        return
+    version = await _bump_version(db)
+    for preview in previews[:-1]:
+        pending_leads_index.upsert(preview)
+    pending_leads_index.upsert(previews[-1], version)
+    for doc in pending_docs:
+        request_search.upsert(doc)
+
+
+async def remove_lead_preview(db, request_id: str):
+    """Drop a request from the board (assigned, deleted or otherwise no longer pending)."""
+    try:
+        await db[LEAD_PREVIEWS_COLLECTION].delete_one({"id": request_id})
+        pending_leads_index.remove(request_id, await _bump_version(db))
+        request_search.remove(request_id)
+    except Exception as e:
+        logger.error(f"Failed to remove lead preview {request_id}: {str(e)}")
+
+
+async def remove_lead_previews(db, request_ids: List[str]):
+    """Bulk variant of remove_lead_preview."""
+    if not request_ids:
+        return
+    try:
+        await db[LEAD_PREVIEWS_COLLECTION].delete_many({"id": {"$in": request_ids}})
+    except Exception as e:
+        logger.error(f"Failed to remove {len(request_ids)} lead previews: {str(e)}")
+        return
+    version = await _bump_version(db)
+    for request_id in request_ids[:-1]:
+        pending_leads_index.remove(request_id)
+    pending_leads_index.remove(request_ids[-1], version)
+    for request_id in request_ids:
+        request_search.remove(request_id)
+
+
+async def rebuild_lead_previews(db, batch_size: int = 500) -> int:
+    """Regenerate the read model from all pending customer requests."""
+    collection = db[LEAD_PREVIEWS_COLLECTION]
+    await collection.delete_many({})
+
+    written = 0
+    batch = []
+    cursor = db.customer_requests.find({"status": "pending"}, {"_id": 0, "additional_details": 0})
+    async for request_doc in cursor:
+        batch.append(build_lead_preview(request_doc))
+        if len(batch) >= batch_size:
+            await collection.insert_many(batch, ordered=False)
+            written += len(batch)
+            batch = []
+    if batch:
+        await collection.insert_many(batch, ordered=False)
+        written += len(batch)
+    await _bump_version(db)
+    return written
+
+
+async def ensure_lead_previews(db):
+    """Populate the read model on first start against an existing database."""
+    if await db[LEAD_PREVIEWS_COLLECTION].estimated_document_count() > 0:
+        return
+    written = await rebuild_lead_previews(db)
+    if written:
+        logger.info(f"Built {written} lead previews")
+
+
+async def _current_version(db) -> int:
+    doc = await db[READ_MODEL_VERSIONS_COLLECTION].find_one({"_id": LEAD_PREVIEWS_COLLECTION})
+    return doc["version"] if doc else 0
+
+
+async def refresh_pending_leads_index(db, force: bool = False) -> bool:
+    """Reload this worker's pending leads index if lead_previews changed elsewhere."""
+    if not PENDING_LEADS_CACHE_ENABLED:
+        return False
+    version = await _current_version(db)
+    if not force and pending_leads_index.version == version:
+        return False
+    # Don't pull an oversized set into memory just to discard it
+    if await db[LEAD_PREVIEWS_COLLECTION].estimated_document_count() > pending_leads_index.max_leads:
+        pending_leads_index.disable(f"more than {pending_leads_index.max_leads} pending leads")
+        pending_leads_index.version = version
+        return False
+    rows = await db[LEAD_PREVIEWS_COLLECTION].find({}, PREVIEW_PROJECTION).to_list(None)
+    pending_leads_index.replace_all(rows, version)
+    return True
+
+
+async def resync_pending_leads_index(db):
+    """Background loop keeping the pending leads index in step with other workers."""
+    while True:
+        await asyncio.sleep(PENDING_LEADS_RESYNC_SECONDS)
+        try:
+            await refresh_pending_leads_index(db)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"Pending leads resync failed: {str(e)}")
+
+
+async def rescore_pending_leads(db) -> int:
+    """Refresh every preview score and tell other workers to reload."""
+    rescored = await rescore_lead_previews(db)
+    if rescored:
+        await _bump_version(db)
+    return rescored
+
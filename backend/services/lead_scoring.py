@@ -0,0 +1,172 @@
+import calendar
+import logging
+import math
+import os
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+from pymongo import UpdateOne
+
+logger = logging.getLogger(__name__)
+
+LEAD_RESCORE_SECONDS = float(os.environ.get("LEAD_RESCORE_SECONDS", "900"))
+RECENCY_HALF_LIFE_HOURS = 72.0
+# Budgets are compared on a log scale up to this amount
+BUDGET_CEILING = 100000.0
+DESCRIPTION_FULL_LENGTH = 500
+
+URGENCY_WEIGHTS = {"low": 0.25, "medium": 0.5, "high": 0.75, "urgent": 1.0}
+TIMELINE_WEIGHTS = {
+    "asap": 1.0,
+    "within 1 week": 0.8,
+    "within 2 weeks": 0.7,
+    "within 1 month": 0.5,
+    "flexible": 0.3,
+}
+DEFAULT_TIMELINE_WEIGHT = 0.4
+DEFAULT_CATEGORY_DEMAND = 0.5
+
+# Relative weight of each signal; scores land in 0..100
+SCORE_WEIGHTS = {
+    "urgency": 0.25,
+    "budget": 0.20,
+    "timeline": 0.15,
+    "description": 0.10,
+    "recency": 0.20,
+    "demand": 0.10,
+}
+
+# Professionals per pending request in each category, scaled to 0..1.
+# Refreshed by each full rescore and used to score new requests in between.
+category_demand: Dict[str, float] = {}
+
+
+def _lookup(values: Sequence[str], weights: Dict[str, float], default: float) -> np.ndarray:
+    """Map string labels to weights (case-insensitive)."""
+    return np.fromiter(
+        (weights.get((value or "").strip().lower(), default) for value in values),
+        dtype=np.float64,
+        count=len(values)
+    )
+
+
+def epoch_seconds(moment: datetime) -> int:
+    """Seconds since the epoch for a naive UTC datetime."""
+    return calendar.timegm(moment.utctimetuple())
+
+
+def score_arrays(
+    urgency_score: np.ndarray,
+    budget: np.ndarray,
+    timeline_score: np.ndarray,
+    description_length: np.ndarray,
+    age_hours: np.ndarray,
+    demand: np.ndarray
+) -> np.ndarray:
+    """Priority score for a batch of requests, one vectorized pass.
+
+    Urgency and timeline arrive as weights (see ``URGENCY_WEIGHTS`` and
+    ``TIMELINE_WEIGHTS``); everything else is raw.
+    """
+    budget_score = np.clip(np.log1p(np.maximum(budget, 0)) / math.log1p(BUDGET_CEILING), 0.0, 1.0)
+    description_score = np.clip(description_length / DESCRIPTION_FULL_LENGTH, 0.0, 1.0)
+    recency_score = np.exp2(-np.maximum(age_hours, 0) / RECENCY_HALF_LIFE_HOURS)
+    demand_score = np.clip(demand, 0.0, 1.0)
+
+    combined = (
+        SCORE_WEIGHTS["urgency"] * urgency_score
+        + SCORE_WEIGHTS["budget"] * budget_score
+        + SCORE_WEIGHTS["timeline"] * timeline_score
+        + SCORE_WEIGHTS["description"] * description_score
+        + SCORE_WEIGHTS["recency"] * recency_score
+        + SCORE_WEIGHTS["demand"] * demand_score
+    )
+    return np.round(combined * 100, 2)
+
+
+def score_previews(previews: List[Dict[str, Any]], now: Optional[datetime] = None) -> np.ndarray:
+    """Score lead_previews documents (or preview-shaped dicts)."""
+    now_ts = epoch_seconds(now or datetime.utcnow())
+    count = len(previews)
+    budget = np.fromiter((preview.get("budget_value") or 0.0 for preview in previews), dtype=np.float64, count=count)
+    description_length = np.fromiter(
+        (preview.get("description_length") or 0 for preview in previews), dtype=np.float64, count=count
+    )
+    created = np.fromiter(
+        (preview.get("created_ts") or epoch_seconds(preview["created_at"]) for preview in previews),
+        dtype=np.float64,
+        count=count
+    )
+    demand = np.fromiter(
+        (category_demand.get(preview["service_category"], DEFAULT_CATEGORY_DEMAND) for preview in previews),
+        dtype=np.float64,
+        count=count
+    )
+    return score_arrays(
+        _lookup([preview.get("urgency") for preview in previews], URGENCY_WEIGHTS, URGENCY_WEIGHTS["medium"]),
+        budget,
+        _lookup([preview.get("timeline") for preview in previews], TIMELINE_WEIGHTS, DEFAULT_TIMELINE_WEIGHT),
+        description_length,
+        (now_ts - created) / 3600.0,
+        demand
+    )
+
+
+def score_preview(preview: Dict[str, Any]) -> float:
+    """Score one new preview at write time."""
+    return float(score_previews([preview])[0])
+
+
+async def refresh_category_demand(db) -> Dict[str, float]:
+    """Recompute professionals-per-pending-request for each category."""
+    pending = await db.lead_previews.aggregate([
+        {"$group": {"_id": "$service_category", "count": {"$sum": 1}}}
+    ]).to_list(None)
+    supply = await db.business_profiles.aggregate([
+        {"$unwind": "$service_categories"},
+        {"$group": {"_id": "$service_categories", "count": {"$sum": 1}}}
+    ]).to_list(None)
+
+    supply_by_category = {row["_id"]: row["count"] for row in supply}
+    ratios = {
+        row["_id"]: supply_by_category.get(row["_id"], 0) / max(row["count"], 1)
+        for row in pending
+    }
+    top = max(ratios.values(), default=0)
+    category_demand.clear()
+    if top > 0:
+        category_demand.update({category: ratio / top for category, ratio in ratios.items()})
+    return category_demand
+
+
+async def rescore_lead_previews(db, batch_size: int = 1000) -> int:
+    """Recompute every pending lead's score so recency decay is reflected."""
+    await refresh_category_demand(db)
+    now = datetime.utcnow()
+    updated = 0
+    batch: List[Dict[str, Any]] = []
+    projection = {
+        "_id": 1, "service_category": 1, "urgency": 1, "timeline": 1,
+        "budget_value": 1, "description_length": 1, "created_at": 1, "created_ts": 1,
+    }
+    async for preview in db.lead_previews.find({}, projection):
+        batch.append(preview)
+        if len(batch) >= batch_size:
+            updated += await _write_scores(db, batch, now)
+            batch = []
+    if batch:
+        updated += await _write_scores(db, batch, now)
+    return updated
+
+
+async def _write_scores(db, previews: List[Dict[str, Any]], now: datetime) -> int:
+    scores = score_previews(previews, now)
+    await db.lead_previews.bulk_write(
+        [
+            UpdateOne({"_id": preview["_id"]}, {"$set": {"score": float(score)}})
+            for preview, score in zip(previews, scores)
+        ],
+        ordered=False
+    )
+    return len(previews)
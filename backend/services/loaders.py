@@ -0,0 +1,141 @@
+import asyncio
+from typing import Any, Dict, Hashable, Iterable, List, Optional, Set
+
+from services.request_cache import current_scope, request_scope
+
+# Per-request stats header: keys resolved through loaders and queries sent
+LOADER_STATS_HEADER = "X-Loader-Stats"
+
+
+class Loader:
+    """Batches ``load(key)`` calls made in the same event-loop tick into one ``$in`` query.
+
+    Results (including misses, as None) are cached for the life of the loader.
+    Returned documents are shared between callers and must not be mutated.
+    """
+
+    def __init__(self, collection, field: str, projection: Optional[Dict[str, Any]] = None):
+        self.collection = collection
+        self.field = field
+        self.projection = projection or {"_id": 0}
+        self.batched_keys = 0
+        self.queries = 0
+        self._cache: Dict[Hashable, asyncio.Future] = {}
+        self._pending: Dict[Hashable, asyncio.Future] = {}
+        # Dispatch tasks still running, held so they can't be garbage-collected mid-query
+        self._tasks: Set[asyncio.Task] = set()
+
+    async def load(self, key: Hashable) -> Optional[Dict[str, Any]]:
+        future = self._cache.get(key)
+        if future is None:
+            loop = asyncio.get_running_loop()
+            future = self._cache[key] = loop.create_future()
+            if not self._pending:
+                # Runs after every callback already queued, i.e. once the
+                # tasks started alongside this one have asked for their keys
+                loop.call_soon(self._start_dispatch)
+            self._pending[key] = future
+        return await asyncio.shield(future)
+
+    async def load_many(self, keys: Iterable[Hashable]) -> List[Optional[Dict[str, Any]]]:
+        return list(await asyncio.gather(*(self.load(key) for key in keys)))
+
+    def clear(self, key: Hashable):
+        """Forget a cached result, e.g. after the handler wrote to that document."""
+        self._cache.pop(key, None)
+
+    def _start_dispatch(self):
+        task = asyncio.ensure_future(self._dispatch())
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _dispatch(self):
+        batch, self._pending = self._pending, {}
+        self.batched_keys += len(batch)
+        self.queries += 1
+        try:
+            docs = await self.collection.find(
+                {self.field: {"$in": list(batch)}}, self.projection
+            ).to_list(None)
+            found = {doc[self.field]: doc for doc in docs}
+        except asyncio.CancelledError:
+            self._fail(batch, None)
+            raise
+        except Exception as e:
+            self._fail(batch, e)
+            return
+        for key, future in batch.items():
+            if not future.done():
+                future.set_result(found.get(key))
+
+    def _fail(self, batch: Dict[Hashable, asyncio.Future], error: Optional[BaseException]):
+        """Drop a failed batch from the cache and fail (or, with no error, cancel) its waiters."""
+        for key, future in batch.items():
+            self._cache.pop(key, None)
+            if future.done():
+                continue
+            if error is None:
+                future.cancel()
+            else:
+                future.set_exception(error)
+
+
+class Loaders:
+    """The loaders available to one request."""
+
+    def __init__(self, db):
+        self.profiles_by_user_id = Loader(db.business_profiles, "user_id")
+        self.users_by_id = Loader(db.users, "id", {"_id": 0, "password_hash": 0})
+        self.requests_by_id = Loader(db.customer_requests, "id")
+
+    def all(self) -> List[Loader]:
+        return [self.profiles_by_user_id, self.users_by_id, self.requests_by_id]
+
+
+def request_loaders(db) -> Loaders:
+    """Loaders shared by the current request (and all sub-requests of a batch).
+
+    Outside a request scope a fresh, unshared set is returned.
+    """
+    scope = current_scope()
+    if scope is None:
+        return Loaders(db)
+    key = ("loaders", id(db))
+    loaders = scope.get(key)
+    if loaders is None:
+        loaders = scope[key] = Loaders(db)
+    return loaders
+
+
+def loader_stats(scope: Dict[Any, Any]) -> Optional[str]:
+    """Header value summarizing loader use in a scope, or None if unused."""
+    loaders = [loader for key, value in scope.items() if key[0] == "loaders" for loader in value.all()]
+    keys = sum(loader.batched_keys for loader in loaders)
+    if not keys:
+        return None
+    return f"keys={keys};queries={sum(loader.queries for loader in loaders)}"
+
+
+class RequestScopeMiddleware:
+    """Opens a request scope around every HTTP request and reports loader stats."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        with request_scope() as cache:
+            async def send_with_stats(message):
+                if message["type"] == "http.response.start":
+                    stats = loader_stats(cache)
+                    if stats:
+                        message = {
+                            **message,
+                            "headers": [*message.get("headers", []), (LOADER_STATS_HEADER.lower().encode(), stats.encode())],
+                        }
+                await send(message)
+
+            await self.app(scope, receive, send_with_stats)
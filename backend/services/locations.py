@@ -0,0 +1,205 @@
+import asyncio
+import heapq
+import logging
+import os
+import re
+import unicodedata
+from collections import Counter
+from operator import attrgetter
+from typing import Any, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+_NON_ALNUM = re.compile(r"[^a-z0-9]+")
+
+
+def location_key(value: Optional[str]) -> str:
+    """Canonical form of a city or province name used by indexed filters.
+
+    Accents, case and punctuation are dropped so "Montréal", "montreal" and
+    " MONTREAL " all map to "montreal".
+    """
+    if not value:
+        return ""
+    decomposed = unicodedata.normalize("NFKD", value)
+    ascii_only = "".join(ch for ch in decomposed if not unicodedata.combining(ch))
+    return _NON_ALNUM.sub(" ", ascii_only.lower()).strip()
+
+
+def location_prefix_filter(value: Optional[str]) -> Optional[dict]:
+    """Anchored prefix match on a location key; can use index bounds unlike a free regex."""
+    key = location_key(value)
+    if not key:
+        return None
+    return {"$regex": f"^{re.escape(key)}"}
+
+
+# Completions cached per trie node; also the largest page /locations/suggest serves
+SUGGEST_TOP_K = 20
+LOCATION_SUGGEST_REFRESH_SECONDS = float(os.environ.get("LOCATION_SUGGEST_REFRESH_SECONDS", "300"))
+LOCATION_SOURCES = ("business_profiles", "customer_requests")
+LOCATION_KINDS = ("city", "province")
+
+_rank = attrgetter("rank")
+
+
+class _Entry:
+    __slots__ = ("kind", "key", "count", "labels")
+
+    def __init__(self, kind: str, key: str):
+        self.kind = kind
+        self.key = key
+        self.count = 0
+        self.labels: Counter = Counter()
+
+    @property
+    def rank(self) -> Tuple[int, str]:
+        return (-self.count, self.key)
+
+    def as_suggestion(self) -> Dict[str, Any]:
+        label = self.labels.most_common(1)[0][0] if self.labels else self.key
+        return {"key": self.key, "label": label, "type": self.kind, "count": self.count}
+
+
+class _Node:
+    __slots__ = ("children", "entry", "top")
+
+    def __init__(self):
+        self.children: Dict[str, "_Node"] = {}
+        self.entry: Optional[_Entry] = None
+        # Most frequent entries in this subtree, best first
+        self.top: List[_Entry] = []
+
+
+class LocationTrie:
+    """Prefix trie over location keys of one kind, weighted by frequency.
+
+    Every node keeps its subtree's top ``SUGGEST_TOP_K`` entries, so a lookup
+    is a walk down the prefix plus a slice.
+    """
+
+    def __init__(self, kind: str, top_k: int = SUGGEST_TOP_K):
+        self.kind = kind
+        self.top_k = top_k
+        self.root = _Node()
+
+    def _path(self, key: str, create: bool) -> Optional[List[_Node]]:
+        node = self.root
+        path = [node]
+        for ch in key:
+            child = node.children.get(ch)
+            if child is None:
+                if not create:
+                    return None
+                child = node.children[ch] = _Node()
+            node = child
+            path.append(node)
+        return path
+
+    def add(self, value: Optional[str], delta: int = 1, maintain: bool = True):
+        """Count ``delta`` occurrences of a raw city/province value."""
+        key = location_key(value) if isinstance(value, str) else ""
+        if not key or not delta:
+            return
+        path = self._path(key, create=delta > 0)
+        if path is None or (path[-1].entry is None and delta < 0):
+            return
+        terminal = path[-1]
+        if terminal.entry is None:
+            terminal.entry = _Entry(self.kind, key)
+        entry = terminal.entry
+        entry.count += delta
+        # Most common spelling is shown as the label
+        label = value.strip()
+        entry.labels[label] += delta
+        if entry.labels[label] <= 0:
+            del entry.labels[label]
+        if entry.count <= 0:
+            terminal.entry = None
+        if not maintain:
+            return
+
+        if delta > 0:
+            # An entry only moves up, so each cached list needs at most one insert
+            for node in path:
+                if entry in node.top:
+                    node.top.sort(key=_rank)
+                elif len(node.top) < self.top_k or entry.rank < node.top[-1].rank:
+                    node.top.append(entry)
+                    node.top.sort(key=_rank)
+                    del node.top[self.top_k:]
+        else:
+            for node in reversed(path):
+                self._recompute(node)
+
+    def _recompute(self, node: _Node):
+        candidates = [entry for child in node.children.values() for entry in child.top]
+        if node.entry is not None:
+            candidates.append(node.entry)
+        node.top = heapq.nsmallest(self.top_k, candidates, key=_rank)
+
+    def finalize(self, node: Optional[_Node] = None):
+        """Compute every cached list bottom-up after a bulk load."""
+        node = node or self.root
+        for child in node.children.values():
+            self.finalize(child)
+        self._recompute(node)
+
+    def suggest(self, prefix_key: str, limit: int) -> List[_Entry]:
+        path = self._path(prefix_key, create=False)
+        if path is None:
+            return []
+        return path[-1].top[:limit]
+
+
+class LocationSuggestions:
+    """Per-worker city and province autocomplete.
+
+    Writes on this worker are counted immediately; a periodic rebuild picks up
+    other workers' writes and values that were changed or deleted.
+    """
+
+    def __init__(self):
+        self.tries = {kind: LocationTrie(kind) for kind in LOCATION_KINDS}
+        self.loaded = False
+
+    def record(self, city: Optional[str] = None, province: Optional[str] = None):
+        if not self.loaded:
+            return
+        self.tries["city"].add(city)
+        self.tries["province"].add(province)
+
+    def suggest(self, query: str, limit: int = 10, kind: Optional[str] = None) -> List[Dict[str, Any]]:
+        prefix_key = location_key(query)
+        if not prefix_key:
+            return []
+        kinds = [kind] if kind else LOCATION_KINDS
+        candidates = [entry for name in kinds for entry in self.tries[name].suggest(prefix_key, limit)]
+        return [entry.as_suggestion() for entry in heapq.nsmallest(limit, candidates, key=_rank)]
+
+    async def rebuild(self, db):
+        tries = {kind: LocationTrie(kind) for kind in LOCATION_KINDS}
+        for collection in LOCATION_SOURCES:
+            for kind in LOCATION_KINDS:
+                rows = db[collection].aggregate([{"$group": {"_id": f"${kind}", "count": {"$sum": 1}}}])
+                async for row in rows:
+                    if isinstance(row["_id"], str):
+                        tries[kind].add(row["_id"], row["count"], maintain=False)
+        for trie in tries.values():
+            trie.finalize()
+        self.tries = tries
+        self.loaded = True
+
+
+location_suggestions = LocationSuggestions()
+
+
+async def refresh_location_suggestions_periodically(db):
+    while True:
+        await asyncio.sleep(LOCATION_SUGGEST_REFRESH_SECONDS)
+        try:
+            await location_suggestions.rebuild(db)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"Location suggestions rebuild failed: {str(e)}")
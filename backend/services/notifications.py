@@ -1,6 +1,6 @@
 import os
 import logging
-from typing import Dict, Any
+from typing import Dict, Any, List
 
 logger = logging.getLogger(__name__)
 
@@ -36,6 +36,11 @@ class NotificationService:
         logger.info(f"Customer request notification disabled - Service: {request_data.get('service_category')}")
         return True
 
+    async def notify_new_customer_requests_batch(self, requests_data: List[Dict[str, Any]], source: str = None):
+        """Notify admin of a batch of new customer requests in one message - DISABLED"""
+        logger.info(f"Batch customer request notification disabled - Count: {len(requests_data)}, Source: {source}")
+        return True
+
     async def notify_professional_verification_needed(self, professional_data: Dict[str, Any]):
         """Notify admin that a professional needs verification - DISABLED"""
         logger.info(f"Professional verification notification disabled - Business: {professional_data.get('business_name')}")
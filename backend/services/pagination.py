@@ -0,0 +1,35 @@
+import base64
+import json
+from datetime import datetime
+from typing import Any, Dict, Optional
+
+from fastapi import HTTPException, status
+
+# Response header carrying the cursor for the next page; absent on the last page
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+def encode_cursor(doc: Dict[str, Any], field: str = "created_at") -> str:
+    """Opaque cursor pointing just past ``doc`` in a (field desc, id desc) ordering."""
+    payload = json.dumps({"v": doc[field].isoformat(), "id": doc["id"]}, separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def cursor_filter(cursor: Optional[str], field: str = "created_at") -> Dict[str, Any]:
+    """Query clause selecting documents after ``cursor``; raises 400 on a malformed cursor."""
+    if not cursor:
+        return {}
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        value = datetime.fromisoformat(payload["v"])
+        last_id = str(payload["id"])
+    except (ValueError, KeyError, TypeError):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid cursor"
+        )
+    return {"$or": [
+        {field: {"$lt": value}},
+        {field: value, "id": {"$lt": last_id}},
+    ]}
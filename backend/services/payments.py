@@ -0,0 +1,195 @@
+import asyncio
+import logging
+import os
+import uuid
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional
+
+from pymongo import ReplaceOne, ReturnDocument, UpdateOne
+from pymongo.errors import DuplicateKeyError
+
+from models import CreditTransaction, PaymentStatus
+from services.dashboard import bump_dashboard_version
+from emergentintegrations.payments.stripe.checkout import StripeCheckout
+
+logger = logging.getLogger(__name__)
+
+PAYMENT_SWEEP_INTERVAL_SECONDS = float(os.environ.get("PAYMENT_SWEEP_INTERVAL_SECONDS", "60"))
+# Sessions younger than this are left to the success page and the webhook
+PAYMENT_SWEEP_MIN_AGE_SECONDS = float(os.environ.get("PAYMENT_SWEEP_MIN_AGE_SECONDS", "120"))
+PAYMENT_SWEEP_BATCH_SIZE = int(os.environ.get("PAYMENT_SWEEP_BATCH_SIZE", "200"))
+PAYMENT_SWEEP_CONCURRENCY = int(os.environ.get("PAYMENT_SWEEP_CONCURRENCY", "8"))
+# Stripe checkout sessions expire after 24 hours; sessions Stripe can no
+# longer report on are expired locally once past this age
+PAYMENT_SESSION_EXPIRY_HOURS = float(os.environ.get("PAYMENT_SESSION_EXPIRY_HOURS", "25"))
+# Terminal payments older than this move to payment_transactions_archive; 0 disables
+PAYMENT_ARCHIVE_AFTER_DAYS = float(os.environ.get("PAYMENT_ARCHIVE_AFTER_DAYS", "0"))
+PAYMENT_ARCHIVE_COLLECTION = "payment_transactions_archive"
+
+OPEN_PAYMENT_STATUSES = [PaymentStatus.INITIATED, PaymentStatus.PENDING]
+TERMINAL_PAYMENT_STATUSES = [
+    PaymentStatus.COMPLETED, PaymentStatus.FAILED, PaymentStatus.CANCELLED, PaymentStatus.EXPIRED,
+]
+# Open sessions are rechecked with a backoff of a quarter of their age, within these bounds
+MIN_RECHECK_SECONDS = 60
+MAX_RECHECK_SECONDS = 3600
+
+
+async def upsert_credit_balance(db, user_id: str, update: Dict[str, Any]) -> Dict[str, Any]:
+    """Apply ``update`` to a user's balance, creating it if missing, and return the result.
+
+    Two concurrent upserts can both miss and try to insert; the unique
+    user_id index rejects the second, which is retried as a plain update.
+    """
+    for attempt in range(2):
+        try:
+            return await db.credit_balances.find_one_and_update(
+                {"user_id": user_id},
+                update,
+                upsert=True,
+                return_document=ReturnDocument.AFTER
+            )
+        except DuplicateKeyError:
+            if attempt:
+                raise
+
+
+async def add_credits_to_user(db, user_id: str, credits: int, description: str, payment_session_id: str = None):
+    """Add credits to user's balance and create transaction record."""
+    # One atomic upsert, so concurrent grants and spends never overwrite each other
+    await upsert_credit_balance(db, user_id, {
+        "$inc": {"balance": credits, "total_purchased": credits},
+        "$set": {"last_updated": datetime.utcnow()},
+        "$setOnInsert": {"id": str(uuid.uuid4()), "total_used": 0},
+    })
+
+    # Create credit transaction
+    credit_transaction = CreditTransaction(
+        user_id=user_id,
+        transaction_type="purchase",
+        amount=credits,
+        description=description,
+        payment_session_id=payment_session_id
+    )
+
+    await db.credit_transactions.insert_one(credit_transaction.dict())
+    await bump_dashboard_version(db, user_id)
+
+
+async def complete_payment(db, session_id: str) -> Optional[Dict[str, Any]]:
+    """Mark a checkout session paid and grant its credits.
+
+    The status flip is atomic, so when the webhook, the success page and the
+    sweeper race only one of them grants the credits. Returns the payment as
+    it was before this call completed it, or None if it was already completed
+    (or doesn't exist).
+    """
+    payment_doc = await db.payment_transactions.find_one_and_update(
+        {"session_id": session_id, "payment_status": {"$ne": PaymentStatus.COMPLETED}},
+        {"$set": {"payment_status": PaymentStatus.COMPLETED, "updated_at": datetime.utcnow()}},
+        return_document=ReturnDocument.BEFORE
+    )
+    if payment_doc:
+        await add_credits_to_user(
+            db,
+            payment_doc["user_id"],
+            payment_doc["credits_purchased"],
+            f"Credit purchase - {payment_doc['package_type']}",
+            session_id
+        )
+    return payment_doc
+
+
+def _recheck_after(created_at: datetime, now: datetime) -> datetime:
+    age = (now - created_at).total_seconds()
+    return now + timedelta(seconds=min(max(age / 4, MIN_RECHECK_SECONDS), MAX_RECHECK_SECONDS))
+
+
+async def sweep_stale_payments(db) -> Dict[str, int]:
+    """Settle or expire one batch of checkout sessions nobody came back for.
+
+    Paid sessions are completed (and credited) one by one through
+    complete_payment; every other outcome is written with one bulk_write
+    that only touches rows still open.
+    """
+    stripe_api_key = os.environ.get('STRIPE_API_KEY')
+    if not stripe_api_key:
+        return {"checked": 0}
+    stripe_checkout = StripeCheckout(api_key=stripe_api_key, webhook_url="")
+
+    now = datetime.utcnow()
+    stale = await db.payment_transactions.find(
+        {
+            "payment_status": {"$in": OPEN_PAYMENT_STATUSES},
+            "created_at": {"$lte": now - timedelta(seconds=PAYMENT_SWEEP_MIN_AGE_SECONDS)},
+            "next_check_at": {"$not": {"$gt": now}},
+        },
+        {"_id": 0, "session_id": 1, "created_at": 1}
+    ).sort("created_at", 1).limit(PAYMENT_SWEEP_BATCH_SIZE).to_list(PAYMENT_SWEEP_BATCH_SIZE)
+
+    semaphore = asyncio.Semaphore(PAYMENT_SWEEP_CONCURRENCY)
+
+    async def check(payment: Dict[str, Any]):
+        async with semaphore:
+            try:
+                return await stripe_checkout.get_checkout_status(payment["session_id"])
+            except Exception as e:
+                logger.warning(f"Failed to check payment session {payment['session_id']}: {str(e)}")
+                return None
+
+    statuses = await asyncio.gather(*(check(payment) for payment in stale))
+
+    counts = {"checked": len(stale), "completed": 0, "expired": 0, "pending": 0}
+    paid: List[str] = []
+    updates: List[UpdateOne] = []
+    for payment, status_response in zip(stale, statuses):
+        session_id = payment["session_id"]
+        is_old = now - payment["created_at"] > timedelta(hours=PAYMENT_SESSION_EXPIRY_HOURS)
+        if status_response is not None and status_response.payment_status == "paid":
+            paid.append(session_id)
+            continue
+        if (status_response is not None and status_response.status == "expired") or (status_response is None and is_old):
+            new_fields = {"payment_status": PaymentStatus.EXPIRED}
+            counts["expired"] += 1
+        else:
+            new_fields = {"payment_status": PaymentStatus.PENDING, "next_check_at": _recheck_after(payment["created_at"], now)}
+            counts["pending"] += 1
+        updates.append(UpdateOne(
+            {"session_id": session_id, "payment_status": {"$in": OPEN_PAYMENT_STATUSES}},
+            {"$set": {**new_fields, "updated_at": now}}
+        ))
+
+    if updates:
+        await db.payment_transactions.bulk_write(updates, ordered=False)
+    for session_id in paid:
+        if await complete_payment(db, session_id):
+            counts["completed"] += 1
+    return counts
+
+
+async def archive_terminal_payments(db, batch_size: int = 1000) -> int:
+    """Move settled payments older than PAYMENT_ARCHIVE_AFTER_DAYS to the archive collection.
+
+    Rows are copied (idempotently, by _id) before they are deleted, so an
+    interrupted run loses nothing and the next run finishes the move.
+    """
+    if PAYMENT_ARCHIVE_AFTER_DAYS <= 0:
+        return 0
+    cutoff = datetime.utcnow() - timedelta(days=PAYMENT_ARCHIVE_AFTER_DAYS)
+    moved = 0
+    while True:
+        docs = await db.payment_transactions.find(
+            {"payment_status": {"$in": TERMINAL_PAYMENT_STATUSES}, "created_at": {"$lt": cutoff}}
+        ).sort("created_at", 1).limit(batch_size).to_list(batch_size)
+        if not docs:
+            return moved
+        await db[PAYMENT_ARCHIVE_COLLECTION].bulk_write(
+            [ReplaceOne({"_id": doc["_id"]}, {**doc, "archived_at": datetime.utcnow()}, upsert=True) for doc in docs],
+            ordered=False
+        )
+        await db.payment_transactions.delete_many(
+            {"_id": {"$in": [doc["_id"] for doc in docs]}, "payment_status": {"$in": TERMINAL_PAYMENT_STATUSES}}
+        )
+        moved += len(docs)
+        if len(docs) < batch_size:
+            return moved
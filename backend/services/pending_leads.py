@@ -0,0 +1,207 @@
+import bisect
+import calendar
+import heapq
+import logging
+import os
+from itertools import islice
+from operator import attrgetter
+from typing import Any, Dict, Iterable, List, Optional
+
+logger = logging.getLogger(__name__)
+
+PENDING_LEADS_CACHE_ENABLED = os.environ.get("PENDING_LEADS_CACHE_ENABLED", "true").lower() == "true"
+# Above this many pending leads the worker stops serving from memory and
+# the board falls back to Mongo
+PENDING_LEADS_CACHE_MAX = int(os.environ.get("PENDING_LEADS_CACHE_MAX", "50000"))
+PENDING_LEADS_RESYNC_SECONDS = float(os.environ.get("PENDING_LEADS_RESYNC_SECONDS", "30"))
+
+_sort_key = attrgetter("sort_key")
+
+
+class PendingLead:
+    """Compact in-memory copy of one lead_previews row."""
+    __slots__ = (
+        "id", "title", "service_category", "snippet", "city", "province",
+        "city_key", "province_key", "timeline", "urgency", "budget_label",
+        "created_at", "score", "sort_key",
+    )
+
+    def __init__(self, row: Dict[str, Any]):
+        self.id = row["id"]
+        self.title = row["title"]
+        self.service_category = row["service_category"]
+        self.snippet = row["snippet"]
+        self.city = row["city"]
+        self.province = row["province"]
+        self.city_key = row["city_key"]
+        self.province_key = row["province_key"]
+        self.timeline = row["timeline"]
+        self.urgency = row["urgency"]
+        self.budget_label = row["budget_label"]
+        self.created_at = row["created_at"]
+        self.score = row.get("score") or 0.0
+        # Newest first, ties broken by id so removal can bisect to the record
+        self.sort_key = (-calendar.timegm(self.created_at.utctimetuple()), -self.created_at.microsecond, self.id)
+
+    def as_row(self) -> Dict[str, Any]:
+        return {field: getattr(self, field) for field in self.__slots__ if field != "sort_key"}
+
+
+def _insert(bucket: List[PendingLead], lead: PendingLead):
+    bisect.insort(bucket, lead, key=_sort_key)
+
+
+def _remove(bucket: List[PendingLead], lead: PendingLead):
+    position = bisect.bisect_left(bucket, lead.sort_key, key=_sort_key)
+    if position < len(bucket) and bucket[position].id == lead.id:
+        del bucket[position]
+
+
+class PendingLeadsIndex:
+    """Per-worker hot set of pending leads, grouped by category and city key.
+
+    ``version`` mirrors the lead_previews version counter; a periodic resync
+    reloads the set whenever another worker has written since.
+    """
+
+    def __init__(self, max_leads: int = PENDING_LEADS_CACHE_MAX):
+        self.max_leads = max_leads
+        self.version: Optional[int] = None
+        self.serving = False
+        self._by_id: Dict[str, PendingLead] = {}
+        self._all: List[PendingLead] = []
+        self._by_category: Dict[str, List[PendingLead]] = {}
+        self._by_city: Dict[str, List[PendingLead]] = {}
+        self._city_keys: List[str] = []
+
+    def __len__(self) -> int:
+        return len(self._by_id)
+
+    def replace_all(self, rows: Iterable[Dict[str, Any]], version: int):
+        """Swap in a freshly loaded set; stop serving if it exceeds the memory cap."""
+        by_id: Dict[str, PendingLead] = {}
+        for row in rows:
+            by_id[row["id"]] = PendingLead(row)
+            if len(by_id) > self.max_leads:
+                self.disable(f"more than {self.max_leads} pending leads")
+                self.version = version
+                return
+
+        leads = sorted(by_id.values(), key=_sort_key)
+        by_category: Dict[str, List[PendingLead]] = {}
+        by_city: Dict[str, List[PendingLead]] = {}
+        for lead in leads:
+            by_category.setdefault(lead.service_category, []).append(lead)
+            by_city.setdefault(lead.city_key, []).append(lead)
+
+        self._by_id = by_id
+        self._all = leads
+        self._by_category = by_category
+        self._by_city = by_city
+        self._city_keys = sorted(by_city)
+        self.version = version
+        self.serving = True
+
+    def disable(self, reason: str):
+        """Drop the in-memory set; queries return None until the next successful load."""
+        if self.serving:
+            logger.warning(f"Pending leads index disabled: {reason}")
+        self.serving = False
+        self._by_id = {}
+        self._all = []
+        self._by_category = {}
+        self._by_city = {}
+        self._city_keys = []
+
+    def _note_version(self, version: Optional[int]):
+        # Only advance when no other worker wrote in between; otherwise keep
+        # the old version so the next resync reloads
+        if version is not None and self.version is not None and version == self.version + 1:
+            self.version = version
+
+    def upsert(self, row: Dict[str, Any], version: Optional[int] = None):
+        if not self.serving:
+            return
+        self._discard(row["id"])
+        if len(self._by_id) >= self.max_leads:
+            self.disable(f"more than {self.max_leads} pending leads")
+            return
+
+        lead = PendingLead(row)
+        self._by_id[lead.id] = lead
+        _insert(self._all, lead)
+        _insert(self._by_category.setdefault(lead.service_category, []), lead)
+        if lead.city_key not in self._by_city:
+            bisect.insort(self._city_keys, lead.city_key)
+        _insert(self._by_city.setdefault(lead.city_key, []), lead)
+        self._note_version(version)
+
+    def remove(self, request_id: str, version: Optional[int] = None):
+        if not self.serving:
+            return
+        self._discard(request_id)
+        self._note_version(version)
+
+    def _discard(self, request_id: str):
+        lead = self._by_id.pop(request_id, None)
+        if lead is None:
+            return
+        _remove(self._all, lead)
+        _remove(self._by_category.get(lead.service_category, []), lead)
+        city_bucket = self._by_city.get(lead.city_key)
+        if city_bucket is not None:
+            _remove(city_bucket, lead)
+            if not city_bucket:
+                del self._by_city[lead.city_key]
+                position = bisect.bisect_left(self._city_keys, lead.city_key)
+                if position < len(self._city_keys) and self._city_keys[position] == lead.city_key:
+                    del self._city_keys[position]
+
+    def _city_candidates(self, city_prefix: str) -> Iterable[PendingLead]:
+        """Leads whose city key starts with ``city_prefix``, newest first."""
+        start = bisect.bisect_left(self._city_keys, city_prefix)
+        buckets = []
+        for city_key in self._city_keys[start:]:
+            if not city_key.startswith(city_prefix):
+                break
+            buckets.append(self._by_city[city_key])
+        if len(buckets) == 1:
+            return buckets[0]
+        return heapq.merge(*buckets, key=_sort_key)
+
+    def query(
+        self,
+        service_category: Optional[str] = None,
+        city_prefix: str = "",
+        province_prefix: str = "",
+        skip: int = 0,
+        limit: int = 10,
+        exclude=None,
+        sort: str = "recent"
+    ) -> Optional[List[Dict[str, Any]]]:
+        """Page of board rows, or None when the caller must fall back to Mongo."""
+        if not self.serving:
+            return None
+
+        if city_prefix:
+            candidates = self._city_candidates(city_prefix)
+        elif service_category:
+            candidates = self._by_category.get(service_category, [])
+        else:
+            candidates = self._all
+
+        matches = (
+            lead for lead in candidates
+            if (not service_category or lead.service_category == service_category)
+            and (not province_prefix or lead.province_key.startswith(province_prefix))
+            and not (exclude and lead.id in exclude)
+        )
+        if sort == "score":
+            # Only the top skip + limit entries are ever ordered
+            ranked = heapq.nsmallest(skip + limit, matches, key=lambda lead: (-lead.score, lead.sort_key))
+            return [lead.as_row() for lead in ranked[skip:]]
+
+        return [lead.as_row() for lead in islice(matches, skip, skip + limit)]
+
+
+pending_leads_index = PendingLeadsIndex()
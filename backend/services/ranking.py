@@ -0,0 +1,67 @@
+import logging
+import math
+from typing import Any, Dict
+
+from services.geo import geo_point
+from services.locations import location_key
+
+logger = logging.getLogger(__name__)
+
+# Bayesian smoothing: a profile with few reviews is pulled towards the prior
+PRIOR_RATING = 3.5
+PRIOR_WEIGHT = 5
+REVIEW_COUNT_SATURATION = 100
+
+FEATURED_BOOST = 20.0
+VERIFIED_BOOST = 10.0
+RATING_POINTS = 50.0
+REVIEW_COUNT_POINTS = 10.0
+COMPLETENESS_POINTS = 10.0
+
+# Optional profile fields that count towards completeness
+COMPLETENESS_FIELDS = [
+    "description", "website", "business_phone", "address", "license_number",
+    "hourly_rate_min", "hourly_rate_max", "portfolio_images", "certifications",
+]
+
+
+def smoothed_rating(rating: float, review_count: int) -> float:
+    return (PRIOR_WEIGHT * PRIOR_RATING + (rating or 0.0) * review_count) / (PRIOR_WEIGHT + review_count)
+
+
+def rank_score(profile: Dict[str, Any]) -> float:
+    """Single ordering key for professional search, higher ranks first."""
+    review_count = profile.get("review_count") or 0
+    score = RATING_POINTS * smoothed_rating(profile.get("rating") or 0.0, review_count) / 5.0
+    score += REVIEW_COUNT_POINTS * min(math.log1p(review_count) / math.log1p(REVIEW_COUNT_SATURATION), 1.0)
+    if profile.get("is_featured"):
+        score += FEATURED_BOOST
+    if profile.get("is_verified"):
+        score += VERIFIED_BOOST
+    filled = sum(1 for field in COMPLETENESS_FIELDS if profile.get(field))
+    score += COMPLETENESS_POINTS * filled / len(COMPLETENESS_FIELDS)
+    return round(score, 4)
+
+
+def rank_fields(profile: Dict[str, Any]) -> Dict[str, Any]:
+    """Derived fields stored on a business profile for indexed search."""
+    return {
+        "rank_score": rank_score(profile),
+        "city_key": location_key(profile.get("city")),
+        "province_key": location_key(profile.get("province")),
+        "geo_point": geo_point(profile.get("postal_code")),
+    }
+
+
+async def refresh_rank_fields(db, profile_doc: Dict[str, Any]) -> Dict[str, Any]:
+    """Recompute derived fields after a profile write and return the updated document."""
+    fields = rank_fields(profile_doc)
+    if all(profile_doc.get(name) == value for name, value in fields.items()):
+        return profile_doc
+    try:
+        await db.business_profiles.update_one({"id": profile_doc["id"]}, {"$set": fields})
+    except Exception as e:
+        logger.error(f"Failed to update rank score for profile {profile_doc.get('id')}: {str(e)}")
+        return profile_doc
+    return {**profile_doc, **fields}
+
@@ -0,0 +1,26 @@
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, Iterator, Optional
+
+# Lookups shared by everything awaited inside one scope, including the
+# sub-requests of a /batch call, which inherit the context
+_scope: ContextVar[Optional[Dict[Any, Any]]] = ContextVar("request_scope", default=None)
+
+
+def current_scope() -> Optional[Dict[Any, Any]]:
+    """The active request-scoped cache, or None outside a scope."""
+    return _scope.get()
+
+
+@contextmanager
+def request_scope() -> Iterator[Dict[Any, Any]]:
+    """Open a request-scoped cache; nested scopes reuse the outer one."""
+    existing = _scope.get()
+    if existing is not None:
+        yield existing
+        return
+    token = _scope.set({})
+    try:
+        yield _scope.get()
+    finally:
+        _scope.reset(token)
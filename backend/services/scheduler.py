@@ -0,0 +1,398 @@
+"""Background jobs that run on one worker at a time.
+
+Every job has a lease document in ``scheduler_leases`` holding its next run
+time and, while it runs, the owning worker and an expiry the owner keeps
+extending. A worker runs a job only after atomically taking a due, expired
+lease, so with several uvicorn workers each run happens exactly once. If the
+owner dies the lease expires without the next run time advancing and another
+worker picks the job up.
+"""
+import asyncio
+import logging
+import os
+import random
+import socket
+import uuid
+from datetime import datetime, timedelta
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set
+
+from pymongo import ReturnDocument
+from pymongo.errors import CollectionInvalid
+
+logger = logging.getLogger(__name__)
+
+SCHEDULER_ENABLED = os.environ.get("SCHEDULER_ENABLED", "true").lower() == "true"
+SCHEDULER_LEASE_SECONDS = float(os.environ.get("SCHEDULER_LEASE_SECONDS", "60"))
+# Upper bound on how long a worker waits before rechecking a job's lease
+SCHEDULER_POLL_SECONDS = float(os.environ.get("SCHEDULER_POLL_SECONDS", "30"))
+# How long shutdown waits for running jobs before cancelling them
+SCHEDULER_DRAIN_SECONDS = float(os.environ.get("SCHEDULER_DRAIN_SECONDS", "20"))
+SCHEDULER_RUN_HISTORY_BYTES = int(os.environ.get("SCHEDULER_RUN_HISTORY_BYTES", str(8 * 1024 * 1024)))
+SCHEDULER_RUN_HISTORY_MAX = int(os.environ.get("SCHEDULER_RUN_HISTORY_MAX", "10000"))
+DEFAULT_JOB_TIMEOUT_SECONDS = 600.0
+
+SCHEDULER_LEASES_COLLECTION = "scheduler_leases"
+SCHEDULER_RUNS_COLLECTION = "scheduler_runs"
+
+# Run statuses
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+TIMED_OUT = "timed_out"
+LEASE_LOST = "lease_lost"
+CANCELLED = "cancelled"
+
+_EPOCH = datetime(1970, 1, 1)
+
+
+class Interval:
+    """Run every ``seconds``, measured from the end of the previous run."""
+
+    def __init__(self, seconds: float):
+        if seconds <= 0:
+            raise ValueError("Interval must be positive")
+        self.seconds = seconds
+
+    def next_after(self, when: datetime) -> datetime:
+        return when + timedelta(seconds=self.seconds)
+
+    def describe(self) -> str:
+        return f"every {self.seconds:g}s"
+
+
+def _parse_cron_field(field: str, low: int, high: int) -> Set[int]:
+    values: Set[int] = set()
+    for part in field.split(","):
+        base, _, step = part.partition("/")
+        if base == "*":
+            start, end = low, high
+        elif "-" in base:
+            start, end = (int(value) for value in base.split("-", 1))
+        else:
+            start = end = int(base)
+            if step:
+                end = high
+        if start < low or end > high or start > end:
+            raise ValueError(f"Cron field {field!r} is out of range {low}-{high}")
+        values.update(range(start, end + 1, int(step) if step else 1))
+    return values
+
+
+class Cron:
+    """Five-field cron expression (minute hour day-of-month month day-of-week), in UTC.
+
+    Supports ``*``, numbers, ranges, lists and ``/`` steps. As in cron, when
+    both day fields are restricted a day matching either one qualifies.
+    """
+
+    def __init__(self, expression: str):
+        fields = expression.split()
+        if len(fields) != 5:
+            raise ValueError(f"Cron expression {expression!r} needs 5 fields")
+        self.expression = expression
+        self.minutes = _parse_cron_field(fields[0], 0, 59)
+        self.hours = _parse_cron_field(fields[1], 0, 23)
+        self.days = _parse_cron_field(fields[2], 1, 31)
+        self.months = _parse_cron_field(fields[3], 1, 12)
+        # 7 is accepted for Sunday
+        self.weekdays = {day % 7 for day in _parse_cron_field(fields[4], 0, 7)}
+        self._either_day = fields[2] != "*" and fields[4] != "*"
+
+    def _day_matches(self, when: datetime) -> bool:
+        day = when.day in self.days
+        weekday = when.isoweekday() % 7 in self.weekdays
+        return (day or weekday) if self._either_day else (day and weekday)
+
+    def next_after(self, when: datetime) -> datetime:
+        candidate = when.replace(second=0, microsecond=0) + timedelta(minutes=1)
+        limit = candidate + timedelta(days=366 * 4)
+        while candidate < limit:
+            if candidate.month not in self.months:
+                candidate = (candidate.replace(day=1) + timedelta(days=32)).replace(day=1, hour=0, minute=0)
+            elif not self._day_matches(candidate):
+                candidate = candidate.replace(hour=0, minute=0) + timedelta(days=1)
+            elif candidate.hour not in self.hours:
+                candidate = candidate.replace(minute=0) + timedelta(hours=1)
+            elif candidate.minute not in self.minutes:
+                candidate += timedelta(minutes=1)
+            else:
+                return candidate
+        raise ValueError(f"Cron expression {self.expression!r} never matches")
+
+    def describe(self) -> str:
+        return f"cron {self.expression}"
+
+
+def parse_schedule(value: str):
+    """``"300"`` is an interval in seconds, anything else a cron expression."""
+    try:
+        return Interval(float(value))
+    except ValueError:
+        return Cron(value)
+
+
+class Job:
+    def __init__(
+        self,
+        name: str,
+        func: Callable[[Any], Awaitable[Any]],
+        schedule,
+        timeout_seconds: float = DEFAULT_JOB_TIMEOUT_SECONDS,
+        jitter_seconds: float = 0.0,
+        enabled: bool = True,
+        run_on_start: bool = False
+    ):
+        self.name = name
+        self.func = func
+        self.schedule = schedule
+        self.timeout_seconds = timeout_seconds
+        self.jitter_seconds = jitter_seconds
+        self.enabled = enabled
+        # Otherwise the first run waits one full schedule step after the lease is created
+        self.run_on_start = run_on_start
+
+    def describe(self) -> Dict[str, Any]:
+        return {
+            "name": self.name,
+            "schedule": self.schedule.describe(),
+            "timeout_seconds": self.timeout_seconds,
+            "jitter_seconds": self.jitter_seconds,
+            "enabled": self.enabled,
+        }
+
+
+def _summarize(result: Any) -> Any:
+    """Keep small, storable job results for the run history."""
+    if isinstance(result, (int, float, str, bool)) or result is None:
+        return result
+    if isinstance(result, dict) and all(isinstance(value, (int, float, str, bool)) for value in result.values()):
+        return result
+    return None
+
+
+class Scheduler:
+    def __init__(self):
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self.jobs: Dict[str, Job] = {}
+        self.db = None
+        self._loops: List[asyncio.Task] = []
+        self._running: Dict[str, asyncio.Task] = {}
+        self._lost: Set[str] = set()
+        self._stop = asyncio.Event()
+
+    def register(self, job: Job):
+        if job.name in self.jobs:
+            raise ValueError(f"Job {job.name} is already registered")
+        self.jobs[job.name] = job
+
+    async def start(self, db):
+        self.db = db
+        self._stop = asyncio.Event()
+        await ensure_run_history(db)
+        for job in self.jobs.values():
+            if not job.enabled:
+                continue
+            now = datetime.utcnow()
+            first_run = now if job.run_on_start else job.schedule.next_after(now)
+            await db[SCHEDULER_LEASES_COLLECTION].update_one(
+                {"_id": job.name},
+                {"$setOnInsert": {"next_run_at": first_run, "expires_at": _EPOCH, "owner": None}},
+                upsert=True
+            )
+            self._loops.append(asyncio.create_task(self._loop(job)))
+        logger.info(f"Scheduler {self.owner} started with {len(self._loops)} job(s)")
+
+    async def stop(self):
+        """Stop taking leases, let running jobs finish for a while, then cancel the rest."""
+        self._stop.set()
+        if not self._loops:
+            return
+        _, pending = await asyncio.wait(self._loops, timeout=SCHEDULER_DRAIN_SECONDS)
+        for task in pending:
+            task.cancel()
+        await asyncio.gather(*pending, return_exceptions=True)
+        self._loops = []
+
+    def running_here(self) -> List[str]:
+        return list(self._running)
+
+    async def _sleep(self, seconds: float):
+        try:
+            await asyncio.wait_for(self._stop.wait(), timeout=max(seconds, 0))
+        except asyncio.TimeoutError:
+            pass
+
+    async def _loop(self, job: Job):
+        # Spread workers out so they don't all race for the lease at once
+        await self._sleep(random.uniform(0, job.jitter_seconds))
+        while not self._stop.is_set():
+            try:
+                next_run = await self._try_run(job)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Scheduler error for job {job.name}: {str(e)}")
+                next_run = None
+            delay = SCHEDULER_POLL_SECONDS
+            if next_run is not None:
+                delay = min(max((next_run - datetime.utcnow()).total_seconds(), 0), SCHEDULER_POLL_SECONDS)
+            await self._sleep(delay + random.uniform(0, job.jitter_seconds))
+
+    async def _try_run(self, job: Job) -> Optional[datetime]:
+        """Run the job if it's due and unowned. Returns its next run time."""
+        leases = self.db[SCHEDULER_LEASES_COLLECTION]
+        now = datetime.utcnow()
+        lease = await leases.find_one_and_update(
+            {"_id": job.name, "next_run_at": {"$lte": now}, "expires_at": {"$lte": now}},
+            {"$set": {
+                "owner": self.owner,
+                "expires_at": now + timedelta(seconds=SCHEDULER_LEASE_SECONDS),
+                "last_started_at": now,
+            }},
+            return_document=ReturnDocument.AFTER
+        )
+        if lease is None:
+            doc = await leases.find_one({"_id": job.name}, {"next_run_at": 1})
+            return doc.get("next_run_at") if doc else None
+        return await self._run(job, now)
+
+    async def _run(self, job: Job, started_at: datetime) -> datetime:
+        task = asyncio.create_task(asyncio.wait_for(job.func(self.db), timeout=job.timeout_seconds))
+        self._running[job.name] = task
+        self._lost.discard(job.name)
+        heartbeat = asyncio.create_task(self._heartbeat(job, task))
+        result = None
+        error = None
+        try:
+            result = await task
+            status = SUCCEEDED
+        except asyncio.TimeoutError:
+            status = TIMED_OUT
+            error = f"Timed out after {job.timeout_seconds:g}s"
+        except asyncio.CancelledError:
+            if job.name not in self._lost:
+                # Shutdown: hand the lease back without advancing the schedule
+                # so another worker reruns the job
+                await self._finish(job, started_at, CANCELLED, "Cancelled on shutdown", None, reschedule=False)
+                raise
+            status = LEASE_LOST
+            error = "Lease lost while running"
+        except Exception as e:
+            status = FAILED
+            error = str(e)
+            logger.error(f"Job {job.name} failed: {error}")
+        finally:
+            heartbeat.cancel()
+            self._running.pop(job.name, None)
+        return await self._finish(job, started_at, status, error, result)
+
+    async def _heartbeat(self, job: Job, task: asyncio.Task):
+        leases = self.db[SCHEDULER_LEASES_COLLECTION]
+        while True:
+            await asyncio.sleep(SCHEDULER_LEASE_SECONDS / 3)
+            try:
+                extended = await leases.update_one(
+                    {"_id": job.name, "owner": self.owner},
+                    {"$set": {"expires_at": datetime.utcnow() + timedelta(seconds=SCHEDULER_LEASE_SECONDS)}}
+                )
+            except Exception as e:
+                # Keep trying; the lease only lapses after SCHEDULER_LEASE_SECONDS
+                logger.error(f"Heartbeat for job {job.name} failed: {str(e)}")
+                continue
+            if not extended.matched_count:
+                logger.warning(f"Job {job.name} lost its lease; cancelling")
+                self._lost.add(job.name)
+                task.cancel()
+                return
+
+    async def _finish(
+        self,
+        job: Job,
+        started_at: datetime,
+        status: str,
+        error: Optional[str],
+        result: Any,
+        reschedule: bool = True
+    ) -> datetime:
+        finished_at = datetime.utcnow()
+        duration_ms = round((finished_at - started_at).total_seconds() * 1000, 1)
+        next_run = job.schedule.next_after(finished_at) if reschedule else finished_at
+        update: Dict[str, Any] = {
+            "owner": None,
+            "expires_at": finished_at,
+            "last_finished_at": finished_at,
+            "last_status": status,
+            "last_duration_ms": duration_ms,
+            "last_error": error,
+        }
+        if reschedule:
+            update["next_run_at"] = next_run
+        try:
+            await self.db[SCHEDULER_LEASES_COLLECTION].update_one(
+                {"_id": job.name, "owner": self.owner}, {"$set": update}
+            )
+            await self.db[SCHEDULER_RUNS_COLLECTION].insert_one({
+                "job": job.name,
+                "owner": self.owner,
+                "started_at": started_at,
+                "finished_at": finished_at,
+                "duration_ms": duration_ms,
+                "status": status,
+                "error": error,
+                "result": _summarize(result),
+            })
+        except Exception as e:
+            logger.error(f"Failed to record run of job {job.name}: {str(e)}")
+        return next_run
+
+
+scheduler = Scheduler()
+
+
+async def ensure_run_history(db):
+    """Create the capped run history collection if it doesn't exist yet."""
+    try:
+        await db.create_collection(
+            SCHEDULER_RUNS_COLLECTION,
+            capped=True,
+            size=SCHEDULER_RUN_HISTORY_BYTES,
+            max=SCHEDULER_RUN_HISTORY_MAX
+        )
+    except CollectionInvalid:
+        pass
+
+
+async def job_states(db, history: int = 20) -> List[Dict[str, Any]]:
+    """Registered jobs with their lease state and recent run durations."""
+    names = list(scheduler.jobs)
+    leases = await db[SCHEDULER_LEASES_COLLECTION].find({"_id": {"$in": names}}).to_list(None)
+    by_name = {lease.pop("_id"): lease for lease in leases}
+
+    async def recent_runs(name: str) -> List[Dict[str, Any]]:
+        return await db[SCHEDULER_RUNS_COLLECTION].find(
+            {"job": name}, {"_id": 0, "status": 1, "duration_ms": 1}
+        ).sort("$natural", -1).limit(history).to_list(history)
+
+    runs = await asyncio.gather(*(recent_runs(name) for name in names))
+    running_here = set(scheduler.running_here())
+    now = datetime.utcnow()
+    states = []
+    for name, recent in zip(names, runs):
+        lease = by_name.get(name, {})
+        durations = [run["duration_ms"] for run in recent if run.get("duration_ms") is not None]
+        states.append({
+            **scheduler.jobs[name].describe(),
+            **lease,
+            # An owner whose lease has expired died mid-run; the job is due again
+            "running": bool(lease.get("owner")) and lease.get("expires_at", _EPOCH) > now,
+            "running_on_this_worker": name in running_here,
+            "recent_runs": len(recent),
+            "recent_failures": sum(1 for run in recent if run.get("status") != SUCCEEDED),
+            "avg_duration_ms": round(sum(durations) / len(durations), 1) if durations else None,
+            "max_duration_ms": max(durations) if durations else None,
+        })
+    return states
+
+
+async def recent_job_runs(db, job: Optional[str] = None, limit: int = 50) -> List[Dict[str, Any]]:
+    query = {"job": job} if job else {}
+    return await db[SCHEDULER_RUNS_COLLECTION].find(query, {"_id": 0}).sort("$natural", -1).limit(limit).to_list(limit)
@@ -0,0 +1,319 @@
+import asyncio
+import heapq
+import html
+import logging
+import math
+import os
+import re
+import unicodedata
+from collections import Counter
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# "mongo" uses text indexes; "memory" keeps a per-worker inverted index
+SEARCH_BACKEND = os.environ.get("SEARCH_BACKEND", "mongo").lower()
+SEARCH_INDEX_REBUILD_SECONDS = float(os.environ.get("SEARCH_INDEX_REBUILD_SECONDS", "300"))
+
+BM25_K1 = 1.2
+BM25_B = 0.75
+HIGHLIGHT_CONTEXT = 60
+
+_TOKEN = re.compile(r"[a-z0-9]+")
+STOPWORDS = frozenset(
+    "a an and are as at be but by for from has have i in is it my of on or our "
+    "the this to we with you your".split()
+)
+
+# Field weights, shared by both backends (Mongo text index weights and
+# term-frequency multipliers in the inverted index)
+PROFILE_FIELD_WEIGHTS = {"business_name": 3, "description": 1, "certifications": 2}
+REQUEST_FIELD_WEIGHTS = {"title": 3, "description": 1}
+
+
+def _fold(text: str) -> str:
+    decomposed = unicodedata.normalize("NFKD", text)
+    return "".join(ch for ch in decomposed if not unicodedata.combining(ch)).lower()
+
+
+def tokenize(text: Optional[str]) -> List[str]:
+    """Lowercased, accent-folded terms without stopwords."""
+    if not text:
+        return []
+    return [token for token in _TOKEN.findall(_fold(text)) if token not in STOPWORDS and len(token) > 1]
+
+
+def _field_text(value: Any) -> str:
+    if isinstance(value, (list, tuple)):
+        return " ".join(str(item) for item in value)
+    return value or ""
+
+
+def highlight(text: Optional[str], terms: Iterable[str], context: int = HIGHLIGHT_CONTEXT) -> Optional[str]:
+    """Snippet around the first matching term with matches wrapped in <mark>.
+
+    Returns None when nothing matches. Text is HTML-escaped.
+    """
+    if not text:
+        return None
+    terms = set(terms)
+    folded = _fold(text)
+    spans = [
+        match.span() for match in _TOKEN.finditer(folded)
+        if match.group() in terms
+    ]
+    if not spans:
+        return None
+
+    # Folding can change length (e.g. ligatures); fall back to the folded text then
+    source = text if len(folded) == len(text) else folded
+    start = max(spans[0][0] - context, 0)
+    end = min(spans[0][1] + context * 2, len(source))
+    pieces = ["..." if start > 0 else ""]
+    cursor = start
+    for span_start, span_end in spans:
+        if span_start < start or span_end > end:
+            continue
+        pieces.append(html.escape(source[cursor:span_start]))
+        pieces.append(f"<mark>{html.escape(source[span_start:span_end])}</mark>")
+        cursor = span_end
+    pieces.append(html.escape(source[cursor:end]))
+    pieces.append("..." if end < len(source) else "")
+    return "".join(pieces)
+
+
+class InvertedIndex:
+    """In-process BM25 index with incremental add/remove.
+
+    Postings map term -> {doc_id: weighted term frequency}; each document
+    keeps its length and categories for normalization and facets.
+    """
+
+    def __init__(self, field_weights: Dict[str, int]):
+        self.field_weights = field_weights
+        self.postings: Dict[str, Dict[str, float]] = {}
+        self.doc_lengths: Dict[str, float] = {}
+        self.doc_terms: Dict[str, Tuple[str, ...]] = {}
+        self.doc_categories: Dict[str, Tuple[str, ...]] = {}
+        self.total_length = 0.0
+        self._norms: Dict[str, float] = {}
+        self._norms_key: Optional[Tuple[int, float]] = None
+
+    def __len__(self) -> int:
+        return len(self.doc_lengths)
+
+    def add(self, doc_id: str, fields: Dict[str, Any], categories: Iterable[str]):
+        self.remove(doc_id)
+        frequencies: Counter = Counter()
+        for field, weight in self.field_weights.items():
+            for token in tokenize(_field_text(fields.get(field))):
+                frequencies[token] += weight
+        length = float(sum(frequencies.values()))
+        for term, frequency in frequencies.items():
+            self.postings.setdefault(term, {})[doc_id] = frequency
+        self.doc_lengths[doc_id] = length
+        self.doc_terms[doc_id] = tuple(frequencies)
+        self.doc_categories[doc_id] = tuple(getattr(category, "value", category) for category in categories)
+        self.total_length += length
+
+    def remove(self, doc_id: str):
+        terms = self.doc_terms.pop(doc_id, None)
+        if terms is None:
+            return
+        for term in terms:
+            posting = self.postings.get(term)
+            if posting is not None:
+                posting.pop(doc_id, None)
+                if not posting:
+                    del self.postings[term]
+        self.total_length -= self.doc_lengths.pop(doc_id)
+        self.doc_categories.pop(doc_id, None)
+
+    def _length_norms(self) -> Dict[str, float]:
+        """BM25 length normalization per document, reused until the corpus changes."""
+        key = (len(self.doc_lengths), self.total_length)
+        if self._norms_key != key:
+            average_length = self.total_length / len(self.doc_lengths) or 1.0
+            self._norms = {
+                doc_id: BM25_K1 * (1 - BM25_B + BM25_B * length / average_length)
+                for doc_id, length in self.doc_lengths.items()
+            }
+            self._norms_key = key
+        return self._norms
+
+    def search(
+        self,
+        query: str,
+        category: Optional[str] = None,
+        skip: int = 0,
+        limit: int = 20
+    ) -> Tuple[int, List[Tuple[str, float]], Dict[str, int]]:
+        """Return (total matches, page of (doc_id, score), category facet counts)."""
+        terms = set(tokenize(query))
+        if not terms or not self.doc_lengths:
+            return 0, [], {}
+
+        doc_count = len(self.doc_lengths)
+        norms = self._length_norms()
+        scores: Dict[str, float] = {}
+        get_score = scores.get
+        for term in terms:
+            posting = self.postings.get(term)
+            if not posting:
+                continue
+            idf = math.log(1 + (doc_count - len(posting) + 0.5) / (len(posting) + 0.5))
+            boost = idf * (BM25_K1 + 1)
+            for doc_id, frequency in posting.items():
+                scores[doc_id] = get_score(doc_id, 0.0) + boost * frequency / (frequency + norms[doc_id])
+
+        # Facets count every match before the category filter is applied
+        facets: Counter = Counter()
+        for doc_id in scores:
+            facets.update(self.doc_categories.get(doc_id, ()))
+
+        if category:
+            scores = {doc_id: score for doc_id, score in scores.items() if category in self.doc_categories.get(doc_id, ())}
+
+        top = heapq.nlargest(skip + limit, scores.items(), key=lambda item: (item[1], item[0]))
+        return len(scores), top[skip:], dict(facets)
+
+
+class SearchCorpus:
+    """One searchable collection: its Mongo source, fields and in-process index."""
+
+    def __init__(
+        self,
+        collection: str,
+        field_weights: Dict[str, int],
+        category_field: str,
+        source_filter: Dict[str, Any],
+        multi_category: bool = False
+    ):
+        self.collection = collection
+        self.field_weights = field_weights
+        self.category_field = category_field
+        self.source_filter = source_filter
+        self.multi_category = multi_category
+        self.index = InvertedIndex(field_weights)
+        self.loaded = False
+
+    def categories(self, doc: Dict[str, Any]) -> List[str]:
+        value = doc.get(self.category_field)
+        if isinstance(value, list):
+            return value
+        return [value] if value else []
+
+    def matches_source(self, doc: Dict[str, Any]) -> bool:
+        return all(getattr(doc.get(field), "value", doc.get(field)) == value for field, value in self.source_filter.items())
+
+    def upsert(self, doc: Dict[str, Any]):
+        """Incremental update from a write path (no-op for the Mongo backend)."""
+        if not self.loaded:
+            return
+        if self.matches_source(doc):
+            self.index.add(doc["id"], doc, self.categories(doc))
+        else:
+            self.index.remove(doc["id"])
+
+    def remove(self, doc_id: str):
+        if self.loaded:
+            self.index.remove(doc_id)
+
+    async def rebuild(self, db):
+        projection = {"_id": 0, "id": 1, self.category_field: 1, **{field: 1 for field in self.field_weights}}
+        index = InvertedIndex(self.field_weights)
+        async for doc in db[self.collection].find(self.source_filter, projection):
+            index.add(doc["id"], doc, self.categories(doc))
+        self.index = index
+        self.loaded = True
+
+    async def search(
+        self,
+        db,
+        query: str,
+        category: Optional[str],
+        skip: int,
+        limit: int,
+        projection: Dict[str, Any]
+    ) -> Dict[str, Any]:
+        """Ranked, highlighted, faceted page of matching documents."""
+        if SEARCH_BACKEND == "memory" and self.loaded:
+            total, page, facets = self.index.search(query, category, skip, limit)
+            docs = await db[self.collection].find(
+                {"id": {"$in": [doc_id for doc_id, _ in page]}},
+                projection
+            ).to_list(len(page))
+            by_id = {doc["id"]: doc for doc in docs}
+            hits = [{**by_id[doc_id], "score": round(score, 4)} for doc_id, score in page if doc_id in by_id]
+        else:
+            total, hits, facets = await self._search_mongo(db, query, category, skip, limit, projection)
+
+        terms = tokenize(query)
+        for hit in hits:
+            hit["highlights"] = {
+                field: snippet
+                for field in self.field_weights
+                if (snippet := highlight(_field_text(hit.get(field)), terms))
+            }
+        return {
+            "total": total,
+            "skip": skip,
+            "limit": limit,
+            "hits": hits,
+            "facets": {self.category_field: facets},
+        }
+
+    async def _search_mongo(self, db, query, category, skip, limit, projection):
+        match = {"$text": {"$search": query}, **self.source_filter}
+        category_match = {self.category_field: category} if category else {}
+        facet_stage = [{"$unwind": f"${self.category_field}"}] if self.multi_category else []
+        pipeline = [
+            {"$match": match},
+            {"$addFields": {"score": {"$meta": "textScore"}}},
+            {"$facet": {
+                "hits": [
+                    {"$match": category_match},
+                    {"$sort": {"score": -1}},
+                    {"$skip": skip},
+                    {"$limit": limit},
+                    {"$project": {**projection, "score": 1}},
+                ],
+                "total": [{"$match": category_match}, {"$count": "count"}],
+                "facets": facet_stage + [{"$group": {"_id": f"${self.category_field}", "count": {"$sum": 1}}}],
+            }},
+        ]
+        result = (await db[self.collection].aggregate(pipeline).to_list(1))[0]
+        total = result["total"][0]["count"] if result["total"] else 0
+        facets = {row["_id"]: row["count"] for row in result["facets"]}
+        return total, result["hits"], facets
+
+
+professional_search = SearchCorpus(
+    "business_profiles", PROFILE_FIELD_WEIGHTS, "service_categories", {}, multi_category=True
+)
+request_search = SearchCorpus(
+    "customer_requests", REQUEST_FIELD_WEIGHTS, "service_category", {"status": "pending"}
+)
+
+
+async def rebuild_search_indexes(db):
+    """Load the in-process indexes (only used with SEARCH_BACKEND=memory)."""
+    if SEARCH_BACKEND != "memory":
+        return
+    for corpus in (professional_search, request_search):
+        await corpus.rebuild(db)
+        logger.info(f"Search index for {corpus.collection}: {len(corpus.index)} documents")
+
+
+async def rebuild_search_indexes_periodically(db):
+    """Pick up writes made by other workers."""
+    if SEARCH_BACKEND != "memory":
+        return
+    while True:
+        await asyncio.sleep(SEARCH_INDEX_REBUILD_SECONDS)
+        try:
+            await rebuild_search_indexes(db)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"Search index rebuild failed: {str(e)}")
@@ -0,0 +1,112 @@
+import hashlib
+import os
+import time
+from collections import OrderedDict
+from typing import FrozenSet, Optional, Tuple
+
+# Per-worker cache of the customer requests each professional has unlocked
+UNLOCKED_CACHE_TTL_SECONDS = float(os.environ.get("UNLOCKED_CACHE_TTL_SECONDS", "60"))
+UNLOCKED_CACHE_MAX_PROFESSIONALS = int(os.environ.get("UNLOCKED_CACHE_MAX_PROFESSIONALS", "10000"))
+# Sets up to this size are excluded server-side with $nin; larger ones are
+# filtered in-process against the hashed set
+NIN_MAX_IDS = 200
+
+
+def id_hash(request_id: str) -> int:
+    """64-bit hash of a request id, the compact form kept in the cache."""
+    return int.from_bytes(hashlib.blake2b(request_id.encode("utf-8"), digest_size=8).digest(), "big")
+
+
+class UnlockedSet:
+    """Request ids unlocked by one professional."""
+    __slots__ = ("hashes", "ids", "loaded_at")
+
+    def __init__(self, request_ids, loaded_at: float):
+        self.hashes = {id_hash(request_id) for request_id in request_ids}
+        # Raw ids are only kept while the set is small enough for $nin
+        self.ids: Optional[FrozenSet[str]] = frozenset(request_ids) if len(self.hashes) <= NIN_MAX_IDS else None
+        self.loaded_at = loaded_at
+
+    def __contains__(self, request_id: str) -> bool:
+        return id_hash(request_id) in self.hashes
+
+    def __len__(self) -> int:
+        return len(self.hashes)
+
+    def add(self, request_id: str):
+        self.hashes.add(id_hash(request_id))
+        if self.ids is not None:
+            self.ids = (self.ids | {request_id}) if len(self.hashes) <= NIN_MAX_IDS else None
+
+
+class UnlockedLeadsCache:
+    def __init__(self, ttl: float = UNLOCKED_CACHE_TTL_SECONDS, max_entries: int = UNLOCKED_CACHE_MAX_PROFESSIONALS):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, UnlockedSet]" = OrderedDict()
+
+    async def get(self, db, professional_id: str) -> UnlockedSet:
+        """Return the professional's unlocked set, reloading it from leads when stale."""
+        entry = self._entries.get(professional_id)
+        now = time.monotonic()
+        if entry is not None and now - entry.loaded_at < self.ttl:
+            self._entries.move_to_end(professional_id)
+            return entry
+
+        docs = await db.leads.find(
+            {"professional_id": professional_id, "viewed_at": {"$ne": None}},
+            {"_id": 0, "customer_request_id": 1}
+        ).to_list(None)
+        entry = UnlockedSet([doc["customer_request_id"] for doc in docs], now)
+        self._entries[professional_id] = entry
+        self._entries.move_to_end(professional_id)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+        return entry
+
+    def record_unlock(self, professional_id: str, request_id: str):
+        """Keep this worker's entry current after an unlock write."""
+        entry = self._entries.get(professional_id)
+        if entry is not None:
+            entry.add(request_id)
+
+    def invalidate(self, professional_id: str):
+        self._entries.pop(professional_id, None)
+
+
+unlocked_leads_cache = UnlockedLeadsCache()
+
+
+async def find_excluding_unlocked(
+    collection,
+    query: dict,
+    projection: dict,
+    sort: Tuple[str, int],
+    skip: int,
+    limit: int,
+    unlocked: UnlockedSet
+) -> list:
+    """Page through ``collection`` leaving out requests in ``unlocked``.
+
+    Small sets become a ``$nin`` on ``id``. Large sets are filtered here, with
+    overfetched batches so the requested page still fills.
+    """
+    if not unlocked:
+        return await collection.find(query, projection).sort(*sort).skip(skip).limit(limit).to_list(limit)
+
+    if unlocked.ids is not None:
+        query = {**query, "id": {"$nin": list(unlocked.ids)}}
+        return await collection.find(query, projection).sort(*sort).skip(skip).limit(limit).to_list(limit)
+
+    wanted = skip + limit
+    batch_size = max(wanted * 2, 50)
+    kept = []
+    scanned = 0
+    while len(kept) < wanted:
+        rows = await collection.find(query, projection).sort(*sort).skip(scanned).limit(batch_size).to_list(batch_size)
+        scanned += len(rows)
+        kept.extend(row for row in rows if row["id"] not in unlocked)
+        if len(rows) < batch_size:
+            break
+        batch_size *= 2
+    return kept[skip:wanted]
@@ -0,0 +1,89 @@
+import asyncio
+
+from mongomock_motor import AsyncMongoMockClient
+
+from indexes import INDEXES
+from models import BusinessProfile, CustomerRequest, LeadBulkCreate, LeadPriority, LeadStatus, ServiceCategory
+from routes import admin
+
+
+def make_request(**overrides):
+    return CustomerRequest(
+        customer_id="cust-1",
+        service_category=ServiceCategory.PLUMBER,
+        title="Leaking tap",
+        description="Kitchen tap drips",
+        location="Downtown",
+        city="Toronto",
+        province="ON",
+        timeline="ASAP",
+        urgency=LeadPriority.MEDIUM,
+        contact_preference="either",
+        **overrides
+    ).dict()
+
+
+def make_profile(user_id):
+    return BusinessProfile(
+        user_id=user_id,
+        business_name=f"Pro {user_id}",
+        service_categories=[ServiceCategory.PLUMBER],
+        description="Plumbing",
+        service_areas=["Toronto"],
+        years_experience=5,
+        city="Toronto",
+        province="ON",
+        postal_code="M5V 2T6",
+    ).dict()
+
+
+def bulk_assign(monkeypatch, requests, calls):
+    """Run each ``(request_ids, professional_ids)`` bulk call in turn against one database."""
+    async def main():
+        db = AsyncMongoMockClient()["niwi_test"]
+        monkeypatch.setattr(admin, "get_database", lambda: db)
+        await db.leads.create_indexes(INDEXES["leads"])
+        await db.customer_requests.insert_many([dict(request) for request in requests])
+        professional_ids = {pro for _, pros in calls for pro in pros}
+        await db.business_profiles.insert_many([make_profile(pro) for pro in sorted(professional_ids)])
+        responses = []
+        for request_ids, pros in calls:
+            body = LeadBulkCreate(customer_request_ids=request_ids, professional_ids=pros)
+            responses.append(await admin.bulk_assign_leads(body, {"user_id": "admin-1"}))
+        stored = {doc["id"]: doc["status"] for doc in await db.customer_requests.find().to_list(None)}
+        return responses, stored, await db.leads.count_documents({})
+    return asyncio.run(main())
+
+
+def statuses(response):
+    return [result["status"] for result in response["results"]]
+
+
+def test_consecutive_bulk_calls_fan_a_request_out(monkeypatch):
+    request = make_request()
+    (first, second), stored, leads = bulk_assign(monkeypatch, [request], [
+        ([request["id"]], ["pro-1", "pro-2"]),
+        ([request["id"]], ["pro-2", "pro-3", "pro-4"]),
+    ])
+    assert statuses(first) == ["created", "created"]
+    assert statuses(second) == ["already_assigned", "created", "created"]
+    assert second["created"] == 2
+    assert leads == 4
+    assert stored[request["id"]] == LeadStatus.ASSIGNED
+
+
+def test_in_progress_requests_keep_their_status(monkeypatch):
+    request = make_request(status=LeadStatus.IN_PROGRESS)
+    (response,), stored, _ = bulk_assign(monkeypatch, [request], [([request["id"]], ["pro-1"])])
+    assert statuses(response) == ["created"]
+    assert stored[request["id"]] == LeadStatus.IN_PROGRESS
+
+
+def test_closed_requests_are_not_assignable(monkeypatch):
+    completed = make_request(status=LeadStatus.COMPLETED)
+    cancelled = make_request(status=LeadStatus.CANCELLED)
+    (response,), _, leads = bulk_assign(monkeypatch, [completed, cancelled], [
+        ([completed["id"], cancelled["id"], "missing"], ["pro-1"]),
+    ])
+    assert statuses(response) == ["not_assignable", "not_assignable", "request_not_found"]
+    assert leads == 0
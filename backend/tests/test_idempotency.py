@@ -0,0 +1,150 @@
+import asyncio
+
+import pytest
+from fastapi import HTTPException
+from mongomock_motor import AsyncMongoMockClient
+
+from services.idempotency import IDEMPOTENCY_COLLECTION, MAX_KEY_LENGTH, STATUS_COMPLETED, run_idempotent
+
+SCOPE = "customers.quick_request:abc"
+
+
+class Handler:
+    """Counts calls and returns, or raises, what it was given."""
+
+    def __init__(self, result=None, error=None):
+        self.calls = 0
+        self.result = result if result is not None else {"id": "req-1"}
+        self.error = error
+
+    async def __call__(self):
+        self.calls += 1
+        if self.error is not None:
+            raise self.error
+        return self.result
+
+
+def run(coroutine_factory):
+    async def main():
+        db = AsyncMongoMockClient()["niwi_test"]
+        return await coroutine_factory(db)
+    return asyncio.run(main())
+
+
+def test_runs_once_and_replays():
+    handler = Handler()
+
+    async def scenario(db):
+        first = await run_idempotent(db, "key-1", SCOPE, {"title": "Tap"}, handler)
+        second = await run_idempotent(db, "key-1", SCOPE, {"title": "Tap"}, handler)
+        record = await db[IDEMPOTENCY_COLLECTION].find_one({"_id": f"{SCOPE}:key-1"})
+        return first, second, record
+
+    first, second, record = run(scenario)
+    assert first == {"id": "req-1"}
+    assert handler.calls == 1
+    assert second.status_code == 200
+    assert second.headers["Idempotent-Replayed"] == "true"
+    assert second.body == b'{"id":"req-1"}'
+    assert record["status"] == STATUS_COMPLETED
+
+
+def test_key_reuse_with_a_different_payload_conflicts():
+    handler = Handler()
+
+    async def scenario(db):
+        await run_idempotent(db, "key-1", SCOPE, {"title": "Tap"}, handler)
+        with pytest.raises(HTTPException) as caught:
+            await run_idempotent(db, "key-1", SCOPE, {"title": "Sink"}, handler)
+        return caught.value
+
+    error = run(scenario)
+    assert error.status_code == 422
+    assert handler.calls == 1
+
+
+def test_keys_are_scoped():
+    handler = Handler()
+
+    async def scenario(db):
+        await run_idempotent(db, "key-1", SCOPE, {"title": "Tap"}, handler)
+        return await run_idempotent(db, "key-1", "customers.quick_request:def", {"title": "Tap"}, handler)
+
+    assert run(scenario) == {"id": "req-1"}
+    assert handler.calls == 2
+
+
+def test_client_errors_are_replayed():
+    handler = Handler(error=HTTPException(status_code=404, detail="Not found"))
+
+    async def scenario(db):
+        with pytest.raises(HTTPException):
+            await run_idempotent(db, "key-1", SCOPE, {}, handler)
+        return await run_idempotent(db, "key-1", SCOPE, {}, handler)
+
+    replay = run(scenario)
+    assert handler.calls == 1
+    assert replay.status_code == 404
+    assert replay.body == b'{"detail":"Not found"}'
+
+
+@pytest.mark.parametrize("error", [HTTPException(status_code=503, detail="Down"), RuntimeError("boom")])
+def test_server_errors_release_the_key(error):
+    handler = Handler(error=error)
+
+    async def scenario(db):
+        with pytest.raises(type(error)):
+            await run_idempotent(db, "key-1", SCOPE, {}, handler)
+        assert await db[IDEMPOTENCY_COLLECTION].count_documents({}) == 0
+        handler.error = None
+        return await run_idempotent(db, "key-1", SCOPE, {}, handler)
+
+    assert run(scenario) == {"id": "req-1"}
+    assert handler.calls == 2
+
+
+def test_concurrent_duplicates_wait_for_the_first():
+    async def scenario(db):
+        gate = asyncio.Event()
+        calls = []
+
+        async def slow():
+            calls.append(1)
+            await gate.wait()
+            return {"id": "req-1"}
+
+        first = asyncio.create_task(run_idempotent(db, "key-1", SCOPE, {}, slow))
+        await asyncio.sleep(0)
+        second = asyncio.create_task(run_idempotent(db, "key-1", SCOPE, {}, slow))
+        await asyncio.sleep(0.01)
+        gate.set()
+        return await first, await second, len(calls)
+
+    first, second, calls = run(scenario)
+    assert first == {"id": "req-1"}
+    assert second.headers["Idempotent-Replayed"] == "true"
+    assert calls == 1
+
+
+def test_without_a_key_the_handler_always_runs():
+    handler = Handler()
+
+    async def scenario(db):
+        await run_idempotent(db, None, SCOPE, {}, handler)
+        await run_idempotent(db, "", SCOPE, {}, handler)
+        return await db[IDEMPOTENCY_COLLECTION].count_documents({})
+
+    assert run(scenario) == 0
+    assert handler.calls == 2
+
+
+def test_overlong_keys_are_rejected():
+    handler = Handler()
+
+    async def scenario(db):
+        with pytest.raises(HTTPException) as caught:
+            await run_idempotent(db, "k" * (MAX_KEY_LENGTH + 1), SCOPE, {}, handler)
+        return caught.value
+
+    assert run(scenario).status_code == 400
+    assert handler.calls == 0
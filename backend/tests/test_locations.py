@@ -0,0 +1,80 @@
+import random
+
+from services.locations import LocationTrie, location_key, location_prefix_filter
+
+
+def keys(entries):
+    return [entry.key for entry in entries]
+
+
+def test_location_key_folds_accents_case_and_punctuation():
+    assert location_key("Montréal") == location_key(" MONTREAL ") == "montreal"
+    assert location_key("St. John's") == "st john s"
+    assert location_key(None) == location_key("") == ""
+
+
+def test_prefix_filter_is_anchored_and_escaped():
+    assert location_prefix_filter("St. Cath") == {"$regex": "^st\\ cath"}
+    assert location_prefix_filter("  ") is None
+
+
+def test_top_k_by_count_then_key():
+    trie = LocationTrie("city", top_k=3)
+    for city, count in [("Toronto", 5), ("Torbay", 2), ("Tofino", 2), ("Thornhill", 4), ("Ottawa", 9)]:
+        trie.add(city, count)
+    assert keys(trie.suggest("to", 10)) == ["toronto", "tofino", "torbay"]
+    assert keys(trie.suggest("t", 10)) == ["toronto", "thornhill", "tofino"]
+    assert keys(trie.suggest("", 2)) == ["ottawa", "toronto"]
+    assert keys(trie.suggest("tor", 1)) == ["toronto"]
+    assert trie.suggest("x", 5) == []
+
+
+def test_exact_key_is_its_own_prefix():
+    trie = LocationTrie("city")
+    trie.add("Laval", 1)
+    trie.add("Lavaltrie", 3)
+    assert keys(trie.suggest("laval", 5)) == ["lavaltrie", "laval"]
+
+
+def test_decrement_and_removal():
+    trie = LocationTrie("city", top_k=2)
+    for city, count in [("Toronto", 5), ("Torbay", 3), ("Tofino", 1)]:
+        trie.add(city, count)
+    trie.add("Toronto", -5)
+    assert keys(trie.suggest("to", 5)) == ["torbay", "tofino"]
+    # Removing something never added is a no-op
+    trie.add("Timmins", -1)
+    assert keys(trie.suggest("t", 5)) == ["torbay", "tofino"]
+
+
+def test_label_is_most_common_spelling():
+    trie = LocationTrie("city")
+    trie.add("Montréal", 3)
+    trie.add("montreal", 1)
+    (entry,) = trie.suggest("mont", 5)
+    assert entry.as_suggestion() == {"key": "montreal", "label": "Montréal", "type": "city", "count": 4}
+
+
+def test_incremental_updates_match_bulk_build():
+    rng = random.Random(7)
+    names = ["Toronto", "Torbay", "Tofino", "Thornhill", "Thunder Bay", "Ottawa", "Oshawa", "Orillia", "Oakville"]
+    incremental = LocationTrie("city", top_k=4)
+    counts = {name: 0 for name in names}
+    for _ in range(500):
+        name = rng.choice(names)
+        delta = rng.choice([1, 1, 2, -1]) if counts[name] else 1
+        counts[name] += delta
+        incremental.add(name, delta)
+
+    bulk = LocationTrie("city", top_k=4)
+    for name, count in counts.items():
+        bulk.add(name, count, maintain=False)
+    bulk.finalize()
+
+    for prefix in ["", "t", "to", "tor", "th", "o", "os", "oa", "z"]:
+        expected = sorted(
+            (name for name in counts if counts[name] > 0 and location_key(name).startswith(prefix)),
+            key=lambda name: (-counts[name], location_key(name))
+        )[:4]
+        assert keys(incremental.suggest(prefix, 4)) == [location_key(name) for name in expected]
+        assert keys(bulk.suggest(prefix, 4)) == [location_key(name) for name in expected]
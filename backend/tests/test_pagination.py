@@ -0,0 +1,66 @@
+from datetime import datetime
+
+import pytest
+from fastapi import HTTPException
+
+from services.pagination import cursor_filter, encode_cursor
+
+
+def test_cursor_round_trip():
+    doc = {"id": "b7", "created_at": datetime(2026, 10, 16, 9, 30, 15, 123456)}
+    assert cursor_filter(encode_cursor(doc)) == {"$or": [
+        {"created_at": {"$lt": doc["created_at"]}},
+        {"created_at": doc["created_at"], "id": {"$lt": "b7"}},
+    ]}
+
+
+def test_cursor_is_url_safe_without_padding():
+    cursor = encode_cursor({"id": "x" * 7, "created_at": datetime(2026, 1, 1)})
+    assert "=" not in cursor and "+" not in cursor and "/" not in cursor
+
+
+def test_cursor_on_another_field():
+    doc = {"id": "a", "created_at": datetime(2026, 1, 1), "updated_at": datetime(2026, 2, 1)}
+    clause = cursor_filter(encode_cursor(doc, "updated_at"), "updated_at")
+    assert clause["$or"][0] == {"updated_at": {"$lt": datetime(2026, 2, 1)}}
+
+
+def test_no_cursor_means_no_filter():
+    assert cursor_filter(None) == {}
+    assert cursor_filter("") == {}
+
+
+@pytest.mark.parametrize("cursor", ["not-base64!", "e30", "eyJ2IjoieCIsImlkIjoiYSJ9", "bnVsbA"])
+def test_malformed_cursor_is_a_400(cursor):
+    # e30 = {}, the third one has an unparseable date, bnVsbA = null
+    with pytest.raises(HTTPException) as raised:
+        cursor_filter(cursor)
+    assert raised.value.status_code == 400
+
+
+def _page(docs, cursor, size):
+    """Apply cursor_filter's clause in Python, the way Mongo would, newest first."""
+    selected = docs
+    if cursor:
+        older, tie = cursor_filter(cursor)["$or"]
+        selected = [
+            doc for doc in docs
+            if doc["created_at"] < older["created_at"]["$lt"]
+            or (doc["created_at"] == tie["created_at"] and doc["id"] < tie["id"]["$lt"])
+        ]
+    ordered = sorted(selected, key=lambda doc: (doc["created_at"], doc["id"]), reverse=True)
+    return ordered[:size]
+
+
+def test_tie_break_pages_through_equal_timestamps_once():
+    same = datetime(2026, 10, 16, 12, 0)
+    docs = [{"id": f"{index:02d}", "created_at": same} for index in range(7)]
+    docs += [{"id": "zz", "created_at": datetime(2026, 10, 16, 13, 0)}]
+    seen, cursor = [], None
+    while True:
+        page = _page(docs, cursor, 3)
+        if not page:
+            break
+        seen.extend(doc["id"] for doc in page)
+        cursor = encode_cursor(page[-1])
+    assert seen == ["zz", "06", "05", "04", "03", "02", "01", "00"]
@@ -0,0 +1,97 @@
+from datetime import datetime, timedelta
+
+from services.pending_leads import PendingLeadsIndex
+
+BASE = datetime(2026, 10, 16, 12, 0)
+
+
+def row(request_id, minutes=0, category="plumber", city="toronto", province="on", score=0.0):
+    return {
+        "id": request_id, "title": f"Request {request_id}", "service_category": category,
+        "snippet": "", "city": city.title(), "province": province.upper(),
+        "city_key": city, "province_key": province, "timeline": "ASAP", "urgency": "medium",
+        "budget_label": "", "created_at": BASE + timedelta(minutes=minutes), "score": score,
+    }
+
+
+def ids(rows):
+    return [item["id"] for item in rows]
+
+
+def loaded(*rows, version=1, max_leads=100):
+    index = PendingLeadsIndex(max_leads=max_leads)
+    index.replace_all(rows, version)
+    return index
+
+
+def test_not_serving_until_loaded():
+    index = PendingLeadsIndex()
+    assert index.query() is None
+    index.upsert(row("a"))
+    assert len(index) == 0
+
+
+def test_newest_first_with_id_tie_break():
+    index = loaded(row("a", 1), row("b", 3), row("c", 2), row("d", 2))
+    assert ids(index.query()) == ["b", "c", "d", "a"]
+    assert ids(index.query(skip=1, limit=2)) == ["c", "d"]
+
+
+def test_upsert_inserts_in_order_and_replaces():
+    index = loaded(row("a", 1), row("b", 3))
+    index.upsert(row("c", 2))
+    assert ids(index.query()) == ["b", "c", "a"]
+    index.upsert(row("a", 5, city="ottawa"))
+    assert ids(index.query()) == ["a", "b", "c"]
+    assert ids(index.query(city_prefix="tor")) == ["b", "c"]
+    assert len(index) == 3
+
+
+def test_remove_drops_from_every_bucket():
+    index = loaded(row("a", 1), row("b", 2, city="ottawa"))
+    index.remove("b")
+    index.remove("missing")
+    assert ids(index.query()) == ["a"]
+    assert index.query(city_prefix="ott") == []
+    assert index.query(service_category="plumber", city_prefix="ottawa") == []
+
+
+def test_filters():
+    index = loaded(
+        row("a", 1, category="plumber", city="toronto"),
+        row("b", 2, category="hvac", city="toronto"),
+        row("c", 3, category="plumber", city="torbay", province="nl"),
+        row("d", 4, category="plumber", city="ottawa"),
+    )
+    assert ids(index.query(service_category="plumber")) == ["d", "c", "a"]
+    # Prefix matches several city buckets, merged newest first
+    assert ids(index.query(city_prefix="tor")) == ["c", "b", "a"]
+    assert ids(index.query(city_prefix="tor", province_prefix="on")) == ["b", "a"]
+    assert ids(index.query(service_category="plumber", city_prefix="tor")) == ["c", "a"]
+    assert ids(index.query(exclude={"d", "c"})) == ["b", "a"]
+
+
+def test_score_sort():
+    index = loaded(row("a", 1, score=5), row("b", 2, score=9), row("c", 3, score=5))
+    assert ids(index.query(sort="score")) == ["b", "c", "a"]
+    assert ids(index.query(sort="score", skip=1, limit=1)) == ["c"]
+
+
+def test_version_advances_only_on_consecutive_writes():
+    index = loaded(row("a"), version=4)
+    index.upsert(row("b"), version=5)
+    assert index.version == 5
+    # Another worker wrote version 6; this one stays behind so a resync reloads
+    index.remove("a", version=7)
+    assert index.version == 5
+    index.upsert(row("c"))
+    assert index.version == 5
+
+
+def test_memory_cap_disables_serving():
+    index = loaded(row("a"), row("b"), row("c"), max_leads=2)
+    assert not index.serving and index.query() is None and index.version == 1
+
+    index = loaded(row("a"), row("b"), max_leads=2)
+    index.upsert(row("c"))
+    assert not index.serving and len(index) == 0
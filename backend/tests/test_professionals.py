@@ -0,0 +1,99 @@
+import asyncio
+from datetime import datetime
+
+import pytest
+from fastapi import HTTPException
+from mongomock_motor import AsyncMongoMockClient
+from pydantic import ValidationError
+
+from models import BusinessProfile, Lead, LeadStatus, LeadStatusUpdate, ServiceCategory
+from routes import professionals
+from services.ranking import rank_fields
+
+
+def make_profile(**overrides):
+    profile = BusinessProfile(
+        user_id="pro-1",
+        business_name="Dry Basements Inc",
+        service_categories=[ServiceCategory.PLUMBER],
+        description="Sump pumps and waterproofing",
+        service_areas=["Toronto"],
+        years_experience=8,
+        city="Toronto",
+        province="ON",
+        postal_code="M5V 2T6",
+        **overrides
+    ).dict()
+    return {**profile, **rank_fields(profile)}
+
+
+def update_profile(monkeypatch, profile, body):
+    async def main():
+        db = AsyncMongoMockClient()["niwi_test"]
+        monkeypatch.setattr(professionals, "get_database", lambda: db)
+        await db.business_profiles.insert_one(dict(profile))
+        await professionals.update_my_profile(body, {"user_id": profile["user_id"]})
+        return await db.business_profiles.find_one({"id": profile["id"]}, {"_id": 0})
+    return asyncio.run(main())
+
+
+def test_self_update_cannot_raise_rank(monkeypatch):
+    profile = make_profile()
+    stored = update_profile(monkeypatch, profile, {
+        "is_featured": True,
+        "is_verified": True,
+        "rating": 5.0,
+        "review_count": 500,
+        "avg_rating": 5.0,
+        "total_reviews": 500,
+        "rank_score": 1000.0,
+    })
+    assert stored["is_featured"] is False
+    assert stored["is_verified"] is False
+    assert stored["rating"] == 0.0 and stored["review_count"] == 0
+    assert "avg_rating" not in stored and "total_reviews" not in stored
+    assert stored["rank_score"] == profile["rank_score"]
+
+
+def test_self_update_keeps_admin_flags(monkeypatch):
+    profile = make_profile(is_featured=True, is_verified=True)
+    stored = update_profile(monkeypatch, profile, {"is_featured": False, "is_verified": False, "description": "Updated"})
+    assert stored["is_featured"] is True and stored["is_verified"] is True
+    assert stored["description"] == "Updated"
+    assert stored["rank_score"] == rank_fields(stored)["rank_score"]
+
+
+def update_lead(monkeypatch, lead, body):
+    """Run the handler; returns its response, or the HTTPException it raised, and the stored lead."""
+    async def main():
+        db = AsyncMongoMockClient()["niwi_test"]
+        monkeypatch.setattr(professionals, "get_database", lambda: db)
+        await db.leads.insert_one(dict(lead))
+        try:
+            result = await professionals.update_lead_status(lead["id"], body, {"user_id": lead["professional_id"]})
+        except HTTPException as e:
+            result = e
+        return result, await db.leads.find_one({"id": lead["id"]}, {"_id": 0})
+    return asyncio.run(main())
+
+
+def test_lead_status_must_be_a_lead_status():
+    with pytest.raises(ValidationError):
+        LeadStatusUpdate(status="won-it")
+
+
+def test_lead_status_update(monkeypatch):
+    lead = Lead(customer_request_id="req-1", professional_id="pro-1", viewed_at=datetime.utcnow()).dict()
+    body = LeadStatusUpdate(status=LeadStatus.CONTACTED, quote_amount=250.0, notes=None)
+    response, stored = update_lead(monkeypatch, lead, body)
+    assert response.status == LeadStatus.CONTACTED
+    assert response.quote_amount == 250.0
+    assert stored["contacted_at"] is not None
+    assert stored["notes"] == ""
+
+
+def test_locked_auto_assigned_lead_cannot_be_worked(monkeypatch):
+    lead = Lead(customer_request_id="req-1", professional_id="pro-1", auto_assigned=True).dict()
+    error, stored = update_lead(monkeypatch, lead, LeadStatusUpdate(status=LeadStatus.COMPLETED))
+    assert error.status_code == 403
+    assert stored["status"] == LeadStatus.ASSIGNED
@@ -0,0 +1,84 @@
+from datetime import datetime
+
+import pytest
+
+from services.scheduler import Cron, Interval, parse_schedule
+
+
+def test_step_minutes():
+    cron = Cron("*/15 * * * *")
+    assert cron.next_after(datetime(2026, 10, 16, 10, 7)) == datetime(2026, 10, 16, 10, 15)
+    # Strictly after: a run at a fire time schedules the next one
+    assert cron.next_after(datetime(2026, 10, 16, 10, 15)) == datetime(2026, 10, 16, 10, 30)
+
+
+def test_seconds_are_ignored():
+    cron = Cron("* * * * *")
+    assert cron.next_after(datetime(2026, 10, 16, 10, 7, 59, 999)) == datetime(2026, 10, 16, 10, 8)
+
+
+def test_daily_rolls_to_next_day():
+    cron = Cron("30 2 * * *")
+    assert cron.next_after(datetime(2026, 10, 16, 3, 0)) == datetime(2026, 10, 17, 2, 30)
+    assert cron.next_after(datetime(2026, 10, 16, 1, 0)) == datetime(2026, 10, 16, 2, 30)
+
+
+def test_weekday_range_skips_weekend():
+    cron = Cron("0 9 * * 1-5")
+    # 2026-10-16 is a Friday
+    assert cron.next_after(datetime(2026, 10, 16, 9, 0)) == datetime(2026, 10, 19, 9, 0)
+
+
+def test_sunday_as_seven():
+    assert Cron("0 0 * * 7").next_after(datetime(2026, 10, 16)) == datetime(2026, 10, 18)
+    assert Cron("0 0 * * 0").next_after(datetime(2026, 10, 16)) == datetime(2026, 10, 18)
+
+
+def test_restricted_day_fields_match_either():
+    # The 13th or any Friday; 2026-10-16 is a Friday, 2026-11-13 both
+    cron = Cron("0 0 13 * 5")
+    assert cron.next_after(datetime(2026, 10, 14)) == datetime(2026, 10, 16)
+    assert cron.next_after(datetime(2026, 10, 31)) == datetime(2026, 11, 6)
+
+
+def test_month_and_year_rollover():
+    assert Cron("0 0 1 1 *").next_after(datetime(2026, 3, 5, 12, 0)) == datetime(2027, 1, 1)
+    assert Cron("15 6 29 2 *").next_after(datetime(2026, 3, 1)) == datetime(2028, 2, 29, 6, 15)
+
+
+def test_lists_and_ranges():
+    cron = Cron("0,30 8-9 * * *")
+    fires = []
+    when = datetime(2026, 10, 16, 7, 0)
+    for _ in range(5):
+        when = cron.next_after(when)
+        fires.append((when.day, when.hour, when.minute))
+    assert fires == [(16, 8, 0), (16, 8, 30), (16, 9, 0), (16, 9, 30), (17, 8, 0)]
+
+
+@pytest.mark.parametrize("expression", [
+    "* * * *",
+    "60 * * * *",
+    "* 24 * * *",
+    "* * 0 * *",
+    "* * * 13 *",
+    "* * * * 8",
+    "5-1 * * * *",
+])
+def test_invalid_expressions(expression):
+    with pytest.raises(ValueError):
+        Cron(expression)
+
+
+def test_expression_that_never_fires():
+    with pytest.raises(ValueError):
+        Cron("0 0 31 2 *").next_after(datetime(2026, 1, 1))
+
+
+def test_parse_schedule():
+    interval = parse_schedule("300")
+    assert isinstance(interval, Interval)
+    assert interval.next_after(datetime(2026, 1, 1)) == datetime(2026, 1, 1, 0, 5)
+    assert isinstance(parse_schedule("0 * * * *"), Cron)
+    with pytest.raises(ValueError):
+        parse_schedule("0")
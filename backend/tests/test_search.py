@@ -0,0 +1,106 @@
+import math
+
+import pytest
+
+from services.search import BM25_B, BM25_K1, InvertedIndex, highlight, tokenize
+
+WEIGHTS = {"title": 3, "description": 1}
+
+
+def build(*docs):
+    index = InvertedIndex(WEIGHTS)
+    for doc_id, title, description, categories in docs:
+        index.add(doc_id, {"title": title, "description": description}, categories)
+    return index
+
+
+def ranked(index, query, **kwargs):
+    return [doc_id for doc_id, _ in index.search(query, **kwargs)[1]]
+
+
+def test_tokenize_folds_and_drops_stopwords():
+    assert tokenize("The Café's HVAC-repair, in Montréal!") == ["cafe", "hvac", "repair", "montreal"]
+    assert tokenize(None) == [] and tokenize("a I of") == []
+
+
+def test_title_matches_outrank_description_matches():
+    index = build(
+        ("body", "Kitchen work", "we also fix leaking pipes", ["plumber"]),
+        ("title", "Leaking pipes", "kitchen work too", ["plumber"]),
+    )
+    assert ranked(index, "leaking") == ["title", "body"]
+
+
+def test_rare_terms_weigh_more():
+    index = build(
+        ("common", "roof repair", "", ["contractor"]),
+        ("rare", "chimney repair", "", ["contractor"]),
+        ("other", "roof paint", "", ["contractor"]),
+    )
+    # "roof" is in two documents, "chimney" in one; equal scores fall back to doc_id, descending
+    assert ranked(index, "roof chimney") == ["rare", "other", "common"]
+
+
+def test_shorter_documents_win_on_equal_frequency():
+    index = build(
+        ("short", "deck", "", []),
+        ("long", "deck", "stain seal sand boards rails posts stairs", []),
+    )
+    assert ranked(index, "deck") == ["short", "long"]
+
+
+def test_score_matches_bm25():
+    index = build(("a", "furnace", "", []), ("b", "boiler", "boiler service", []))
+    total, page, _ = index.search("boiler")
+    lengths = {"a": 3.0, "b": 3.0 * 1 + 1 + 1}
+    average = sum(lengths.values()) / 2
+    frequency = 3 + 1
+    idf = math.log(1 + (2 - 1 + 0.5) / (1 + 0.5))
+    norm = BM25_K1 * (1 - BM25_B + BM25_B * lengths["b"] / average)
+    assert total == 1
+    assert page[0][0] == "b"
+    assert page[0][1] == pytest.approx(idf * (BM25_K1 + 1) * frequency / (frequency + norm))
+
+
+def test_category_filter_and_facets():
+    index = build(
+        ("p1", "water heater", "", ["plumber"]),
+        ("p2", "heater install", "", ["plumber", "hvac"]),
+        ("h1", "heater tune up", "", ["hvac"]),
+        ("e1", "panel upgrade", "", ["electrician"]),
+    )
+    total, page, facets = index.search("heater", category="hvac")
+    assert total == 2
+    assert {doc_id for doc_id, _ in page} == {"p2", "h1"}
+    # Facets count every match, before the category filter
+    assert facets == {"plumber": 2, "hvac": 2}
+
+
+def test_paging():
+    index = build(*[(f"d{n}", "gutter " * (n + 1), "x " * 10, []) for n in range(5)])
+    everything = ranked(index, "gutter", limit=5)
+    assert ranked(index, "gutter", skip=2, limit=2) == everything[2:4]
+    assert index.search("gutter", skip=1, limit=2)[0] == 5
+
+
+def test_remove_and_replace():
+    index = build(("a", "fence", "", ["contractor"]), ("b", "fence gate", "", ["contractor"]))
+    index.remove("a")
+    index.remove("missing")
+    assert ranked(index, "fence") == ["b"]
+    index.add("b", {"title": "patio"}, ["landscaping"])
+    assert ranked(index, "fence") == [] and ranked(index, "patio") == ["b"]
+    assert "fence" not in index.postings and len(index) == 1
+    assert index.total_length == 3.0
+
+
+def test_empty_queries():
+    index = build(("a", "fence", "", []))
+    assert index.search("the of") == (0, [], {})
+    assert InvertedIndex(WEIGHTS).search("fence") == (0, [], {})
+
+
+def test_highlight_escapes_and_marks():
+    snippet = highlight("Fix <b>leaking</b> pipe & Leaking tap", ["leaking"])
+    assert snippet == "Fix &lt;b&gt;<mark>leaking</mark>&lt;/b&gt; pipe &amp; <mark>Leaking</mark> tap"
+    assert highlight("nothing here", ["leaking"]) is None